@@ -6,10 +6,14 @@ and returns a predictor callable.
 """
 
 import numpy as np
-from scipy.optimize import minimize, curve_fit
 from scipy.interpolate import interp1d
 from typing import Dict, List, Any, Optional
 from data_model import N_PTS, s_curve, SAME_SIDE_CORNERS
+from sigmoid_fit import fit_s_curve
+
+
+def _stack(strokes, key):
+    return np.array([s[key] for s in strokes], dtype=float)
 
 
 # =============================================================================
@@ -33,25 +37,14 @@ def sigmoid_fit_factory(train_data: Dict, params) -> callable:
             ks.append(s['steep'])
 
         # Also fit s-curve to each training stroke to get empirical params
-        fitted_params = []
-        for s in strokes:
-            alpha = s['alpha']
-            values = s['values']
-            try:
-                D_init = values[-1] if values[-1] > 0 else s['total_di']
-                k_init = s['steep']
-                popt, _ = curve_fit(
-                    lambda a, D, k: s_curve(a, D, k),
-                    alpha, values,
-                    p0=[D_init, k_init],
-                    bounds=([0, 1], [500, 50]),
-                    maxfev=2000
-                )
-                fitted_params.append(popt)
-            except Exception:
-                fitted_params.append([np.mean(Ds), np.mean(ks)])
-
-        fitted_params = np.array(fitted_params)
+        values = _stack(strokes, 'values')
+        D_init = np.where(values[:, -1] > 0, values[:, -1], Ds)
+        D_fit, k_fit, ok = fit_s_curve(_stack(strokes, 'alpha'), values,
+                                       D_init, ks, bounds=([0, 1], [500, 50]))
+        fitted_params = np.column_stack([
+            np.where(ok, D_fit, np.mean(Ds)),
+            np.where(ok, k_fit, np.mean(ks)),
+        ])
 
         sensor_models[ms_name] = {
             'D_mean': np.mean(fitted_params[:, 0]),
@@ -75,20 +68,12 @@ def sigmoid_fit_factory(train_data: Dict, params) -> callable:
         D_prior = model['D_mean']
         k_prior = model['k_mean']
 
-        # Fit D and k to observed portion with regularization toward prior
-        def objective(x):
-            D, k = x
-            pred = s_curve(alpha_observed, D, k)
-            data_fit = np.sum((pred - values_observed) ** 2)
-            # Regularization toward prior
-            reg_D = ((D - D_prior) / model['D_std']) ** 2
-            reg_k = ((k - k_prior) / model['k_std']) ** 2
-            return data_fit + 0.1 * reg_D + 0.5 * reg_k
-
-        result = minimize(objective, [D_prior, k_prior],
-                         bounds=[(1, 500), (1, 50)],
-                         method='L-BFGS-B')
-        D_fit, k_fit = result.x
+        # Fit D and k to observed portion with regularization toward prior:
+        # 0.1 * ((D - D_prior) / D_std)^2 + 0.5 * ((k - k_prior) / k_std)^2
+        D_fit, k_fit, _ = fit_s_curve(
+            alpha_observed, values_observed, D_prior, k_prior,
+            bounds=([1, 1], [500, 50]),
+            prior_weight=(0.1 / model['D_std'] ** 2, 0.5 / model['k_std'] ** 2))
 
         # Generate full prediction
         predicted = s_curve(alpha_full, D_fit, k_fit)
@@ -261,26 +246,17 @@ def bayesian_sigmoid_factory(train_data: Dict, params) -> callable:
         k_prior = model['k_mean']
         k_prior_std = model['k_std']
 
-        # Fit D and k with Bayesian regularization
-        def objective(x):
-            D, k = x
-            pred = s_curve(alpha_observed, D, k)
-            # Data likelihood (sum of squared errors)
-            data_fit = np.sum((pred - values_observed) ** 2)
-            # Prior regularization
-            reg_D = ((D - D_prior) / D_prior_std) ** 2
-            reg_k = ((k - k_prior) / k_prior_std) ** 2
-
-            # Weight regularization more when we have less data
-            # (early cutoff → more prior influence)
-            prior_weight = max(0.5, (N_PTS - cutoff_idx) / N_PTS * 5.0)
+        # Fit D and k with Bayesian regularization: sum of squared errors
+        # plus prior_weight * (((D - D_prior) / D_std)^2 + ((k - k_prior) / k_std)^2).
+        # Weight regularization more when we have less data
+        # (early cutoff → more prior influence)
+        prior_weight = max(0.5, (N_PTS - cutoff_idx) / N_PTS * 5.0)
 
-            return data_fit + prior_weight * (reg_D + reg_k)
-
-        result = minimize(objective, [D_prior, k_prior],
-                         bounds=[(D_prior * 0.5, D_prior * 2.0), (1, 50)],
-                         method='L-BFGS-B')
-        D_fit, k_fit = result.x
+        D_fit, k_fit, _ = fit_s_curve(
+            alpha_observed, values_observed, D_prior, k_prior,
+            bounds=([D_prior * 0.5, 1], [D_prior * 2.0, 50]),
+            prior_weight=(prior_weight / D_prior_std ** 2,
+                          prior_weight / k_prior_std ** 2))
 
         predicted = s_curve(alpha_full, D_fit, k_fit)
 
@@ -353,19 +329,12 @@ def multi_template_factory(train_data: Dict, params) -> callable:
             continue
 
         # For each training stroke, fit sigmoid to get clean D, k
-        fitted = []
-        for s in strokes:
-            try:
-                popt, _ = curve_fit(
-                    lambda a, D, k: s_curve(a, D, k),
-                    s['alpha'], s['values'],
-                    p0=[s['total_di'], s['steep']],
-                    bounds=([0, 1], [500, 50]),
-                    maxfev=2000
-                )
-                fitted.append({'D': popt[0], 'k': popt[1], 'stroke': s})
-            except Exception:
-                fitted.append({'D': s['total_di'], 'k': s['steep'], 'stroke': s})
+        D0, k0 = _stack(strokes, 'total_di'), _stack(strokes, 'steep')
+        D_fit, k_fit, ok = fit_s_curve(_stack(strokes, 'alpha'), _stack(strokes, 'values'),
+                                       D0, k0, bounds=([0, 1], [500, 50]))
+        D_fit, k_fit = np.where(ok, D_fit, D0), np.where(ok, k_fit, k0)
+        fitted = [{'D': D_fit[i], 'k': k_fit[i], 'stroke': s}
+                  for i, s in enumerate(strokes)]
 
         sensor_models[ms_name] = {'fitted': fitted, 'strokes': strokes}
 
@@ -451,35 +420,29 @@ def hierarchical_factory(train_data: Dict, params) -> callable:
         # - Corner DI ratio (actual/nominal)
         # - Middle DI ratio
         # - Effective steepness (from sigmoid fit)
+        # Fit unit sigmoid to the averaged normalized corners of every stroke
+        # to get their effective steepness
+        avg_corners = np.array([
+            np.mean([s['corner_curves'][c] / s['corner_dis'][c] for c in corners], axis=0)
+            for s in strokes
+        ])
+        steeps = _stack(strokes, 'steep')
+        _, corner_ks, ok = fit_s_curve(_stack(strokes, 'alpha'), avg_corners,
+                                       1.0, steeps, bounds=([1, 1], [1, 50]),
+                                       fit_D=False)
+        corner_ks = np.where(ok, corner_ks, steeps)
+
         training_features = []
-        for s in strokes:
+        for i, s in enumerate(strokes):
             # Corner features
             corner_di_ratio = np.mean([
                 s['corner_dis'][c] / max(np.max(s['corner_curves'][c]), 0.01)
                 for c in corners
             ])
 
-            # Fit sigmoid to corner to get effective steepness
-            avg_corner = np.mean([
-                s['corner_curves'][c] / s['corner_dis'][c]
-                for c in corners
-            ], axis=0)
-
-            try:
-                popt, _ = curve_fit(
-                    lambda a, k: s_curve(a, 1.0, k),
-                    s['alpha'], avg_corner,
-                    p0=[s['steep']],
-                    bounds=([1], [50]),
-                    maxfev=1000
-                )
-                corner_k = popt[0]
-            except Exception:
-                corner_k = s['steep']
-
             training_features.append({
                 'corner_di_ratio': corner_di_ratio,
-                'corner_k': corner_k,
+                'corner_k': corner_ks[i],
                 'middle_D': s['total_di'],
                 'middle_k': s['steep'],
                 'alpha': s['alpha'],
@@ -544,16 +507,10 @@ def hierarchical_factory(train_data: Dict, params) -> callable:
             for c in corners
         ], axis=0)
 
-        try:
-            popt, _ = curve_fit(
-                lambda a, k: s_curve(a, 1.0, k),
-                alpha_full, avg_corner_norm,
-                p0=[model['k_mean']],
-                bounds=([1], [50]),
-                maxfev=1000
-            )
-            test_corner_k = popt[0]
-        except Exception:
+        _, test_corner_k, ok = fit_s_curve(alpha_full, avg_corner_norm, 1.0,
+                                           model['k_mean'], bounds=([1, 1], [1, 50]),
+                                           fit_D=False)
+        if not ok:
             test_corner_k = model['k_mean']
 
         k_from_corner = model['k_coef'][0] * test_corner_k + model['k_coef'][1]
@@ -562,21 +519,16 @@ def hierarchical_factory(train_data: Dict, params) -> callable:
         D_prior = D_from_corner
         k_prior = k_from_corner
 
-        def objective(x):
-            D, k = x
-            pred = s_curve(alpha_observed, D, k)
-            data_fit = np.sum((pred - values_observed) ** 2)
-            reg_D = ((D - D_prior) / model['D_std']) ** 2
-            reg_k = ((k - k_prior) / model['k_std']) ** 2
-            # Scale regularization by fraction of curve seen
-            frac_seen = cutoff_idx / N_PTS
-            prior_weight = max(0.5, (1.0 - frac_seen) * 5.0)
-            return data_fit + prior_weight * (reg_D + 2.0 * reg_k)
-
-        result = minimize(objective, [D_prior, k_prior],
-                         bounds=[(D_prior * 0.3, D_prior * 3.0), (1, 50)],
-                         method='L-BFGS-B')
-        D_fit, k_fit = result.x
+        # Regularization prior_weight * (reg_D + 2 * reg_k), scaled by
+        # fraction of curve seen
+        frac_seen = cutoff_idx / N_PTS
+        prior_weight = max(0.5, (1.0 - frac_seen) * 5.0)
+
+        D_fit, k_fit, _ = fit_s_curve(
+            alpha_observed, values_observed, D_prior, k_prior,
+            bounds=([D_prior * 0.3, 1], [D_prior * 3.0, 50]),
+            prior_weight=(prior_weight / model['D_std'] ** 2,
+                          2.0 * prior_weight / model['k_std'] ** 2))
 
         predicted = s_curve(alpha_full, D_fit, k_fit)
 
@@ -745,19 +697,12 @@ def physics_residual_factory(train_data: Dict, params) -> callable:
         residuals = []
         fitted_params_list = []
 
-        for s in strokes:
-            try:
-                popt, _ = curve_fit(
-                    lambda a, D, k: s_curve(a, D, k),
-                    s['alpha'], s['values'],
-                    p0=[s['total_di'], s['steep']],
-                    bounds=([0, 1], [500, 50]),
-                    maxfev=2000
-                )
-                D_fit, k_fit = popt
-            except Exception:
-                D_fit, k_fit = s['total_di'], s['steep']
+        D0, k0 = _stack(strokes, 'total_di'), _stack(strokes, 'steep')
+        D_fits, k_fits, ok = fit_s_curve(_stack(strokes, 'alpha'), _stack(strokes, 'values'),
+                                         D0, k0, bounds=([0, 1], [500, 50]))
+        D_fits, k_fits = np.where(ok, D_fits, D0), np.where(ok, k_fits, k0)
 
+        for s, D_fit, k_fit in zip(strokes, D_fits, k_fits):
             fitted = s_curve(np.array(s['alpha']), D_fit, k_fit)
             residual = s['values'] - fitted
             # Normalize residual by D
@@ -809,22 +754,16 @@ def physics_residual_factory(train_data: Dict, params) -> callable:
         D_prior = model['d_coef'][0] * avg_corner_di + model['d_coef'][1]
         k_prior = model['k_mean']
 
-        def objective(x):
-            D, k = x
-            base = s_curve(alpha_observed, D, k)
-            # Add scaled residual correction
-            corrected = base + D * model['avg_residual'][:cutoff_idx]
-            data_fit = np.sum((corrected - values_observed) ** 2)
-            reg_D = ((D - D_prior) / model['D_std']) ** 2
-            reg_k = ((k - k_prior) / model['k_std']) ** 2
-            frac_seen = cutoff_idx / N_PTS
-            pw = max(0.5, (1.0 - frac_seen) * 5.0)
-            return data_fit + pw * (reg_D + 2.0 * reg_k)
-
-        result = minimize(objective, [D_prior, k_prior],
-                         bounds=[(D_prior * 0.3, D_prior * 3.0), (1, 50)],
-                         method='L-BFGS-B')
-        D_fit, k_fit = result.x
+        # Sigmoid plus scaled residual correction, D * (s_curve(1, k) + residual),
+        # regularized by pw * (reg_D + 2 * reg_k)
+        frac_seen = cutoff_idx / N_PTS
+        pw = max(0.5, (1.0 - frac_seen) * 5.0)
+
+        D_fit, k_fit, _ = fit_s_curve(
+            alpha_observed, values_observed, D_prior, k_prior,
+            bounds=([D_prior * 0.3, 1], [D_prior * 3.0, 50]),
+            prior_weight=(pw / model['D_std'] ** 2, 2.0 * pw / model['k_std'] ** 2),
+            offset=model['avg_residual'][:cutoff_idx])
 
         base = s_curve(alpha_full, D_fit, k_fit)
         predicted = base + D_fit * model['avg_residual']
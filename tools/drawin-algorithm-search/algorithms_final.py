@@ -6,25 +6,9 @@ The smoothing window adapts to estimated noise level.
 """
 
 import numpy as np
-from scipy.signal import savgol_filter
 from typing import Dict
 from data_model import N_PTS, SAME_SIDE_CORNERS
-
-
-def _smooth_alpha(alpha, window=31, polyorder=3):
-    """Smooth noisy alpha."""
-    n = len(alpha)
-    w = min(window, n // 2 * 2 - 1)
-    if w < 5:
-        w = 5
-    if w % 2 == 0:
-        w += 1
-    smoothed = savgol_filter(alpha, window_length=w, polyorder=polyorder)
-    smoothed = np.maximum.accumulate(smoothed)
-    smoothed = np.clip(smoothed, 0, 1)
-    if smoothed[-1] > smoothed[0] + 1e-10:
-        smoothed = (smoothed - smoothed[0]) / (smoothed[-1] - smoothed[0])
-    return smoothed
+from smoothing import smooth_alpha
 
 
 def _resample(alpha, values, grid):
@@ -75,7 +59,7 @@ def final_algorithm_factory(train_data: Dict, params) -> callable:
             if window % 2 == 0:
                 window += 1
 
-            alpha_s = _smooth_alpha(alpha, window=window, polyorder=3)
+            alpha_s = smooth_alpha(alpha, window=window, polyorder=3)
             values = np.array(s['values'])
             D = s['total_di']
 
@@ -121,7 +105,7 @@ def final_algorithm_factory(train_data: Dict, params) -> callable:
         window = max(11, min(71, int(noise_est * 2000) * 2 + 11))
         if window % 2 == 0:
             window += 1
-        alpha_smooth = _smooth_alpha(alpha_full, window=window, polyorder=3)
+        alpha_smooth = smooth_alpha(alpha_full, window=window, polyorder=3)
 
         # Shape at smooth alpha
         shape_full = np.interp(alpha_smooth, model['alpha_grid'], model['avg_shape'])
@@ -10,24 +10,11 @@ This algorithm minimizes worst-case RMSE across all sweep conditions.
 """
 
 import numpy as np
-from scipy.signal import savgol_filter
 from scipy.optimize import minimize_scalar
 from typing import Dict
 from data_model import N_PTS, SAME_SIDE_CORNERS, s_curve
-
-
-def _smooth_alpha(alpha, window=31):
-    n = len(alpha)
-    w = min(window, n // 2 * 2 - 1)
-    w = max(w, 5)
-    if w % 2 == 0:
-        w += 1
-    s = savgol_filter(alpha, w, 3)
-    s = np.maximum.accumulate(s)
-    s = np.clip(s, 0, 1)
-    if s[-1] > s[0] + 1e-10:
-        s = (s - s[0]) / (s[-1] - s[0])
-    return s
+from smoothing import savgol, smooth_alpha
+from stage_profile import count, stage
 
 
 def _resample(alpha, values, grid):
@@ -36,12 +23,7 @@ def _resample(alpha, values, grid):
 
 
 def _denoise(values, window=21):
-    n = len(values)
-    w = min(window, n // 2 * 2 - 1)
-    w = max(w, 5)
-    if w % 2 == 0:
-        w += 1
-    return savgol_filter(values, w, 3)
+    return savgol(values, window)
 
 
 def _estimate_k(values, D, n_pts):
@@ -77,22 +59,24 @@ def adaptive_hybrid_factory(train_data: Dict, params) -> callable:
         D_ratios = []
         corner_k_estimates = []
 
-        for s in strokes:
-            alpha = np.array(s['alpha'])
-            alpha_s = _smooth_alpha(alpha, window=31)
-            values = np.array(s['values'])
-            D = s['total_di']
-            shape = values / D
-            resampled = _resample(alpha_s, shape, alpha_grid)
-            all_shapes.append(resampled)
-            avg_di = np.mean([s['corner_dis'][c] for c in corners])
-            D_ratios.append(D / avg_di)
-
-            k_ests = []
-            for c in corners:
-                k_ests.append(_estimate_k(s['corner_curves'][c],
-                                          s['corner_dis'][c], N_PTS))
-            corner_k_estimates.append(np.mean(k_ests))
+        with stage('train_shapes'):
+            for s in strokes:
+                alpha = np.array(s['alpha'])
+                alpha_s = smooth_alpha(alpha, window=31)
+                values = np.array(s['values'])
+                D = s['total_di']
+                shape = values / D
+                resampled = _resample(alpha_s, shape, alpha_grid)
+                all_shapes.append(resampled)
+                avg_di = np.mean([s['corner_dis'][c] for c in corners])
+                D_ratios.append(D / avg_di)
+
+                with stage('corner_k'):
+                    k_ests = []
+                    for c in corners:
+                        k_ests.append(_estimate_k(s['corner_curves'][c],
+                                                  s['corner_dis'][c], N_PTS))
+                corner_k_estimates.append(np.mean(k_ests))
 
         all_shapes = np.array(all_shapes)
         D_ratios = np.array(D_ratios)
@@ -103,15 +87,16 @@ def adaptive_hybrid_factory(train_data: Dict, params) -> callable:
         mean_shape[0] = 0.0
 
         # PCA
-        deviations = all_shapes - mean_shape[np.newaxis, :]
-        n_pc = 0
-        pcs = np.zeros((1, N_PTS))
-        pc_stds = np.array([1.0])
-        if len(deviations) > 2:
-            U, S, Vt = np.linalg.svd(deviations, full_matrices=False)
-            n_pc = min(2, len(S))
-            pcs = Vt[:n_pc]
-            pc_stds = S[:n_pc] / np.sqrt(len(strokes) - 1)
+        with stage('train_pca'):
+            deviations = all_shapes - mean_shape[np.newaxis, :]
+            n_pc = 0
+            pcs = np.zeros((1, N_PTS))
+            pc_stds = np.array([1.0])
+            if len(deviations) > 2:
+                U, S, Vt = np.linalg.svd(deviations, full_matrices=False)
+                n_pc = min(2, len(S))
+                pcs = Vt[:n_pc]
+                pc_stds = S[:n_pc] / np.sqrt(len(strokes) - 1)
 
         mean_shape_clean = mean_shape.copy()
         mean_shape_clean[0] = 0.0
@@ -153,7 +138,8 @@ def adaptive_hybrid_factory(train_data: Dict, params) -> callable:
             return pred
 
         corners = SAME_SIDE_CORNERS[ms_name]
-        alpha_smooth = _smooth_alpha(alpha_full, window=31)
+        with stage('smooth_alpha'):
+            alpha_smooth = smooth_alpha(alpha_full, window=31)
 
         avg_di = np.mean([corner_dis[c] for c in corners])
         D_prior = model['D_ratio_mean'] * avg_di
@@ -163,121 +149,131 @@ def adaptive_hybrid_factory(train_data: Dict, params) -> callable:
         n_shapes = len(shapes)
 
         # === Shape Selection (V7-style) ===
+        count('predictions')
+        count('shapes_scored', n_shapes)
         D_fits = np.zeros(n_shapes)
         rss_values = np.zeros(n_shapes)
 
-        for i in range(n_shapes):
-            shape_at = np.interp(alpha_smooth, model['alpha_grid'], shapes[i])
-            so = shape_at[:cutoff_idx]
-            ss = np.sum(so ** 2)
-            if ss > 1e-10:
-                D_fits[i] = np.sum(values_observed * so) / ss
-                rss_values[i] = np.sum((values_observed - D_fits[i] * so) ** 2)
-            else:
-                D_fits[i] = D_prior
-                rss_values[i] = 1e10
-
-        # RSS weights
-        rss_min = np.min(rss_values)
-        temp = max(rss_min * 0.5, np.median(rss_values) * 0.1) + 1e-10
-        log_w = -(rss_values - rss_min) / temp
-        log_w = np.clip(log_w, -50, 0)
-        obs_weights = np.exp(log_w)
-        obs_weights /= obs_weights.sum()
+        with stage('rss_scoring'):
+            for i in range(n_shapes):
+                shape_at = np.interp(alpha_smooth, model['alpha_grid'], shapes[i])
+                so = shape_at[:cutoff_idx]
+                ss = np.sum(so ** 2)
+                if ss > 1e-10:
+                    D_fits[i] = np.sum(values_observed * so) / ss
+                    rss_values[i] = np.sum((values_observed - D_fits[i] * so) ** 2)
+                else:
+                    D_fits[i] = D_prior
+                    rss_values[i] = 1e10
+
+            # RSS weights
+            rss_min = np.min(rss_values)
+            temp = max(rss_min * 0.5, np.median(rss_values) * 0.1) + 1e-10
+            log_w = -(rss_values - rss_min) / temp
+            log_w = np.clip(log_w, -50, 0)
+            obs_weights = np.exp(log_w)
+            obs_weights /= obs_weights.sum()
 
         # === Noise Estimation ===
-        best_idx = np.argmin(rss_values)
-        best_shape_at = np.interp(alpha_smooth, model['alpha_grid'],
-                                  shapes[best_idx])
-        best_res = values_observed - D_fits[best_idx] * best_shape_at[:cutoff_idx]
-        noise_est = np.sqrt(np.mean(best_res ** 2))
-        signal_scale = max(D_fits[best_idx] * 0.5, 1.0)
-        noise_ratio = noise_est / signal_scale
+        with stage('blend'):
+            best_idx = np.argmin(rss_values)
+            best_shape_at = np.interp(alpha_smooth, model['alpha_grid'],
+                                      shapes[best_idx])
+            best_res = values_observed - D_fits[best_idx] * best_shape_at[:cutoff_idx]
+            noise_est = np.sqrt(np.mean(best_res ** 2))
+            signal_scale = max(D_fits[best_idx] * 0.5, 1.0)
+            noise_ratio = noise_est / signal_scale
 
         # === Corner-K Weights ===
-        test_k_ests = []
-        for c in corners:
-            test_k_ests.append(_estimate_k(corner_curves[c], corner_dis[c], N_PTS))
-        test_k = np.mean(test_k_ests)
+        with stage('corner_k'):
+            test_k_ests = []
+            for c in corners:
+                test_k_ests.append(_estimate_k(corner_curves[c], corner_dis[c], N_PTS))
+            test_k = np.mean(test_k_ests)
 
-        k_diffs = np.abs(model['corner_k'] - test_k)
-        k_std = max(np.std(model['corner_k']), 0.5)
-        k_weights = np.exp(-0.5 * (k_diffs / k_std) ** 2)
-        k_weights /= k_weights.sum()
+            k_diffs = np.abs(model['corner_k'] - test_k)
+            k_std = max(np.std(model['corner_k']), 0.5)
+            k_weights = np.exp(-0.5 * (k_diffs / k_std) ** 2)
+            k_weights /= k_weights.sum()
 
         # === Adaptive Blending ===
         # noise_ratio < 0.02 → pure observation-based (V7 regime)
         # noise_ratio 0.02-0.15 → blend obs + corner-k
         # noise_ratio > 0.15 → mostly corner-k + median fallback
-        k_blend = np.clip((noise_ratio - 0.02) / 0.13, 0.0, 0.6)
-        combined_weights = (1 - k_blend) * obs_weights + k_blend * k_weights
-        combined_weights /= combined_weights.sum()
+        with stage('blend'):
+            k_blend = np.clip((noise_ratio - 0.02) / 0.13, 0.0, 0.6)
+            combined_weights = (1 - k_blend) * obs_weights + k_blend * k_weights
+            combined_weights /= combined_weights.sum()
 
-        # Selected shape
-        selected_shape = np.average(shapes, weights=combined_weights, axis=0)
+            # Selected shape
+            selected_shape = np.average(shapes, weights=combined_weights, axis=0)
 
         # === PCA Refinement (low-to-medium noise only) ===
-        n_pc = model['n_pc']
-        if n_pc > 0 and cutoff_idx > 15 and noise_ratio < 0.10:
-            # Denoise for PCA fitting
-            if cutoff_idx > 20:
-                values_fit = _denoise(values_observed)
-            else:
-                values_fit = values_observed
-
-            sel_at_alpha = np.interp(alpha_smooth, model['alpha_grid'],
-                                     selected_shape)
-            D_est = np.average(D_fits, weights=combined_weights)
-            residual = values_fit[:cutoff_idx] - D_est * sel_at_alpha[:cutoff_idx]
-
-            pcs_at_alpha = np.array([
-                np.interp(alpha_smooth, model['alpha_grid'], pc)
-                for pc in model['pcs']
-            ])
-
-            for i in range(n_pc):
-                pc_obs = pcs_at_alpha[i, :cutoff_idx]
-                pc_ss = np.sum(pc_obs ** 2)
-                if pc_ss > 1e-10:
-                    c_i = np.sum(residual * pc_obs) / (D_est * pc_ss)
-                    # Regularize toward 0
-                    c_max = 2.0 * model['pc_stds'][i]
-                    c_i = np.clip(c_i, -c_max, c_max)
-                    # Shrink based on noise
-                    shrink = np.clip(1.0 - noise_ratio * 10, 0.0, 1.0)
-                    c_i *= shrink
-                    selected_shape = selected_shape + c_i * model['pcs'][i]
+        with stage('pca'):
+            n_pc = model['n_pc']
+            if n_pc > 0 and cutoff_idx > 15 and noise_ratio < 0.10:
+                count('pca_refinements')
+                # Denoise for PCA fitting
+                if cutoff_idx > 20:
+                    values_fit = _denoise(values_observed)
+                else:
+                    values_fit = values_observed
+
+                sel_at_alpha = np.interp(alpha_smooth, model['alpha_grid'],
+                                         selected_shape)
+                D_est = np.average(D_fits, weights=combined_weights)
+                residual = values_fit[:cutoff_idx] - D_est * sel_at_alpha[:cutoff_idx]
+
+                pcs_at_alpha = np.array([
+                    np.interp(alpha_smooth, model['alpha_grid'], pc)
+                    for pc in model['pcs']
+                ])
+
+                for i in range(n_pc):
+                    pc_obs = pcs_at_alpha[i, :cutoff_idx]
+                    pc_ss = np.sum(pc_obs ** 2)
+                    if pc_ss > 1e-10:
+                        c_i = np.sum(residual * pc_obs) / (D_est * pc_ss)
+                        # Regularize toward 0
+                        c_max = 2.0 * model['pc_stds'][i]
+                        c_i = np.clip(c_i, -c_max, c_max)
+                        # Shrink based on noise
+                        shrink = np.clip(1.0 - noise_ratio * 10, 0.0, 1.0)
+                        c_i *= shrink
+                        selected_shape = selected_shape + c_i * model['pcs'][i]
 
         # Blend with median for high noise
-        median_weight = np.clip((noise_ratio - 0.10) * 5.0, 0.0, 0.5)
-        blended_shape = (1 - median_weight) * selected_shape + \
-                        median_weight * model['med_shape']
-        shape_full = np.interp(alpha_smooth, model['alpha_grid'], blended_shape)
+        with stage('shape_interp'):
+            median_weight = np.clip((noise_ratio - 0.10) * 5.0, 0.0, 0.5)
+            blended_shape = (1 - median_weight) * selected_shape + \
+                            median_weight * model['med_shape']
+            shape_full = np.interp(alpha_smooth, model['alpha_grid'], blended_shape)
 
         # === D Estimation (IRLS) ===
-        shape_obs = shape_full[:cutoff_idx]
-        ss = np.sum(shape_obs ** 2)
-
-        if ss > 1e-10 and cutoff_idx > 5:
-            # Initial estimate
-            D_est = np.sum(values_observed * shape_obs) / ss
-            res = values_observed - D_est * shape_obs
-            mad = max(np.median(np.abs(res)), 0.1)
-            # IRLS weights
-            w = np.where(np.abs(res) < 2 * mad, 1.0,
-                         2 * mad / (np.abs(res) + 1e-10))
-            wss = np.sum(w * shape_obs ** 2)
-            if wss > 1e-10:
-                D_mle = np.sum(w * values_observed * shape_obs) / wss
-                res2 = values_observed - D_mle * shape_obs
-                nv = np.sum(w * res2 ** 2) / max(np.sum(w) - 1, 1)
-                D_mle_var = nv / max(wss, 1e-10)
+        with stage('irls'):
+            shape_obs = shape_full[:cutoff_idx]
+            ss = np.sum(shape_obs ** 2)
+
+            if ss > 1e-10 and cutoff_idx > 5:
+                # Initial estimate
+                D_est = np.sum(values_observed * shape_obs) / ss
+                res = values_observed - D_est * shape_obs
+                mad = max(np.median(np.abs(res)), 0.1)
+                # IRLS weights
+                w = np.where(np.abs(res) < 2 * mad, 1.0,
+                             2 * mad / (np.abs(res) + 1e-10))
+                wss = np.sum(w * shape_obs ** 2)
+                if wss > 1e-10:
+                    D_mle = np.sum(w * values_observed * shape_obs) / wss
+                    res2 = values_observed - D_mle * shape_obs
+                    nv = np.sum(w * res2 ** 2) / max(np.sum(w) - 1, 1)
+                    D_mle_var = nv / max(wss, 1e-10)
+                else:
+                    D_mle = D_prior
+                    D_mle_var = D_prior_std ** 2 * 10
             else:
                 D_mle = D_prior
-                D_mle_var = D_prior_std ** 2 * 10
-        else:
-            D_mle = D_prior
-            D_mle_var = D_prior_std ** 2 * 100
+                D_mle_var = D_prior_std ** 2 * 100
 
         # Bayesian D
         pp = 1.0 / max(D_prior_std ** 2, 1e-10)
@@ -8,23 +8,9 @@ Refines V7 shape selection with:
 """
 
 import numpy as np
-from scipy.signal import savgol_filter
 from typing import Dict
 from data_model import N_PTS, SAME_SIDE_CORNERS
-
-
-def _smooth_alpha(alpha, window=31):
-    n = len(alpha)
-    w = min(window, n // 2 * 2 - 1)
-    w = max(w, 5)
-    if w % 2 == 0:
-        w += 1
-    s = savgol_filter(alpha, w, 3)
-    s = np.maximum.accumulate(s)
-    s = np.clip(s, 0, 1)
-    if s[-1] > s[0] + 1e-10:
-        s = (s - s[0]) / (s[-1] - s[0])
-    return s
+from smoothing import savgol, smooth_alpha
 
 
 def _resample(alpha, values, grid):
@@ -33,12 +19,7 @@ def _resample(alpha, values, grid):
 
 
 def _denoise(values, window=21):
-    n = len(values)
-    w = min(window, n // 2 * 2 - 1)
-    w = max(w, 5)
-    if w % 2 == 0:
-        w += 1
-    return savgol_filter(values, w, min(3, w - 1))
+    return savgol(values, window)
 
 
 def refined_shape_selection_factory(train_data: Dict, params) -> callable:
@@ -54,7 +35,7 @@ def refined_shape_selection_factory(train_data: Dict, params) -> callable:
 
         for s in strokes:
             alpha = np.array(s['alpha'])
-            alpha_s = _smooth_alpha(alpha, window=31)
+            alpha_s = smooth_alpha(alpha, window=31)
             values = np.array(s['values'])
             D = s['total_di']
             shape = values / D
@@ -92,7 +73,7 @@ def refined_shape_selection_factory(train_data: Dict, params) -> callable:
             return pred
 
         corners = SAME_SIDE_CORNERS[ms_name]
-        alpha_smooth = _smooth_alpha(alpha_full, window=31)
+        alpha_smooth = smooth_alpha(alpha_full, window=31)
 
         avg_di = np.mean([corner_dis[c] for c in corners])
         D_prior = model['D_ratio_mean'] * avg_di
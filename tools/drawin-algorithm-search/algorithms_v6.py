@@ -7,10 +7,10 @@ Falls back to shape template when warp fit is unreliable.
 """
 
 import numpy as np
-from scipy.signal import savgol_filter
 from scipy.optimize import minimize
 from typing import Dict
 from data_model import N_PTS, SAME_SIDE_CORNERS
+from smoothing import smooth_alpha
 
 
 def _s_norm(x, k):
@@ -24,21 +24,6 @@ def _s_norm(x, k):
     return (sig(k * (x - 0.5)) - s0) / d
 
 
-def _smooth_alpha(alpha, window=31):
-    n = len(alpha)
-    w = min(window, n // 2 * 2 - 1)
-    if w < 5:
-        w = 5
-    if w % 2 == 0:
-        w += 1
-    s = savgol_filter(alpha, w, 3)
-    s = np.maximum.accumulate(s)
-    s = np.clip(s, 0, 1)
-    if s[-1] > s[0] + 1e-10:
-        s = (s - s[0]) / (s[-1] - s[0])
-    return s
-
-
 def _resample(alpha, values, grid):
     a = np.maximum.accumulate(alpha) + np.arange(len(alpha)) * 1e-12
     return np.interp(grid, a, values)
@@ -208,7 +193,7 @@ def hybrid_warp_template_factory(train_data: Dict, params) -> callable:
 
         for s in strokes:
             alpha = np.array(s['alpha'])
-            alpha_s = _smooth_alpha(alpha, window=31)
+            alpha_s = smooth_alpha(alpha, window=31)
             values = np.array(s['values'])
             D = s['total_di']
 
@@ -268,7 +253,7 @@ def hybrid_warp_template_factory(train_data: Dict, params) -> callable:
         D_prior_std = model['D_ratio_std'] * avg_di
 
         # --- Method A: Template shape + Bayesian D ---
-        alpha_smooth = _smooth_alpha(alpha_full, window=31)
+        alpha_smooth = smooth_alpha(alpha_full, window=31)
         shape_A = np.interp(alpha_smooth, model['alpha_grid'], model['avg_shape'])
         shape_obs_A = shape_A[:cutoff_idx]
         ss_A = np.sum(shape_obs_A ** 2)
@@ -10,24 +10,10 @@ Without noise, best-matching shape wins → eliminates shape error.
 """
 
 import numpy as np
-from scipy.signal import savgol_filter
 from typing import Dict
 from data_model import N_PTS, SAME_SIDE_CORNERS
-
-
-def _smooth_alpha(alpha, window=31):
-    n = len(alpha)
-    w = min(window, n // 2 * 2 - 1)
-    if w < 5:
-        w = 5
-    if w % 2 == 0:
-        w += 1
-    s = savgol_filter(alpha, w, 3)
-    s = np.maximum.accumulate(s)
-    s = np.clip(s, 0, 1)
-    if s[-1] > s[0] + 1e-10:
-        s = (s - s[0]) / (s[-1] - s[0])
-    return s
+from shape_index import ShapeIndex
+from smoothing import smooth_alpha
 
 
 def _resample(alpha, values, grid):
@@ -57,7 +43,7 @@ def shape_selection_factory(train_data: Dict, params) -> callable:
 
         for s in strokes:
             alpha = np.array(s['alpha'])
-            alpha_s = _smooth_alpha(alpha, window=31)
+            alpha_s = smooth_alpha(alpha, window=31)
             values = np.array(s['values'])
             D = s['total_di']
 
@@ -99,7 +85,7 @@ def shape_selection_factory(train_data: Dict, params) -> callable:
             return pred
 
         corners = SAME_SIDE_CORNERS[ms_name]
-        alpha_smooth = _smooth_alpha(alpha_full, window=31)
+        alpha_smooth = smooth_alpha(alpha_full, window=31)
 
         avg_di = np.mean([corner_dis[c] for c in corners])
         D_prior = model['D_ratio_mean'] * avg_di
@@ -188,7 +174,7 @@ def shape_selection_robust_factory(train_data: Dict, params) -> callable:
 
         for s in strokes:
             alpha = np.array(s['alpha'])
-            alpha_s = _smooth_alpha(alpha, window=31)
+            alpha_s = smooth_alpha(alpha, window=31)
             values = np.array(s['values'])
             D = s['total_di']
 
@@ -211,6 +197,7 @@ def shape_selection_robust_factory(train_data: Dict, params) -> callable:
 
         sensor_models[ms_name] = {
             'all_shapes': all_shapes,
+            'shape_index': ShapeIndex(all_shapes, alpha_grid),
             'med_shape': med_shape,
             'alpha_grid': alpha_grid,
             'D_ratio_mean': float(np.mean(D_ratios)),
@@ -228,7 +215,7 @@ def shape_selection_robust_factory(train_data: Dict, params) -> callable:
             return pred
 
         corners = SAME_SIDE_CORNERS[ms_name]
-        alpha_smooth = _smooth_alpha(alpha_full, window=31)
+        alpha_smooth = smooth_alpha(alpha_full, window=31)
 
         avg_di = np.mean([corner_dis[c] for c in corners])
         D_prior = model['D_ratio_mean'] * avg_di
@@ -236,14 +223,16 @@ def shape_selection_robust_factory(train_data: Dict, params) -> callable:
 
         shapes = model['all_shapes']
         n_shapes = len(shapes)
+        index = model['shape_index']
+        loc = index.locate(alpha_smooth)
+        shapes_at = index.evaluate(loc)
 
         # Score each training shape
         rss_values = np.zeros(n_shapes)
         D_fits = np.zeros(n_shapes)
 
         for i in range(n_shapes):
-            shape_at = np.interp(alpha_smooth, model['alpha_grid'], shapes[i])
-            so = shape_at[:cutoff_idx]
+            so = shapes_at[i, :cutoff_idx]
             ss = np.sum(so ** 2)
             if ss > 1e-10:
                 D_fits[i] = np.sum(values_observed * so) / ss
@@ -262,9 +251,7 @@ def shape_selection_robust_factory(train_data: Dict, params) -> callable:
 
         # Estimate noise level from best-fit residuals
         best_idx = np.argmin(rss_values)
-        best_shape_at = np.interp(alpha_smooth, model['alpha_grid'],
-                                  shapes[best_idx])
-        best_res = values_observed - D_fits[best_idx] * best_shape_at[:cutoff_idx]
+        best_res = values_observed - D_fits[best_idx] * shapes_at[best_idx, :cutoff_idx]
         noise_est = np.sqrt(np.mean(best_res ** 2))
 
         # Blend between selected shape and median based on noise
@@ -280,7 +267,7 @@ def shape_selection_robust_factory(train_data: Dict, params) -> callable:
         selected_shape = np.average(shapes, weights=weights, axis=0)
         blended_shape = (1 - median_weight) * selected_shape + \
                         median_weight * model['med_shape']
-        shape_full = np.interp(alpha_smooth, model['alpha_grid'], blended_shape)
+        shape_full = index.interp(blended_shape, loc)
 
         # D estimation with IRLS
         D_mle = np.average(D_fits, weights=weights)
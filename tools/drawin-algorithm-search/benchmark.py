@@ -4,19 +4,403 @@ Benchmark script for draw-in prediction algorithms.
 
 Runs the full multi-variable sweep evaluation and outputs results to
 sweep_results.json. Also prints a summary table to stdout.
+
+With --perf it instead profiles every algorithm in the ALGORITHMS_* registries
+(training time, per-prediction latency percentiles, throughput, peak memory)
+and writes perf_results.json next to sweep_results.json. --baseline compares
+that report against a stored one and exits non-zero on regressions.
+
+Sweep results are appended to the SQLite result store (results.db, see
+result_store.py) point by point; points already stored for the same
+algorithm code are not re-evaluated, so repeated or interrupted runs are
+incremental. --algorithms with a plain run sweeps every matching registry
+algorithm into the store; compare them with result_store.py report/compare.
+
+With --stages it runs the instrumented predictors (best_algorithm,
+v9/ultimate_v9, v10/adaptive_hybrid; see stage_profile.py) with stage
+profiling enabled and prints a flame-style per-stage table; --trace also
+writes the stage events as Chrome trace JSON.
+
+With --search it runs the adaptive worst-case search over the joint
+SimParams space (evaluation.search_worst_case) and writes search_results.json.
+
+With --float32 it checks the compact float32 mode (float32 strokes and
+shape banks, see StrokeBatch.astype) against float64: the full sweep in both
+modes for the float32-capable predictors, per-point metric differences,
+model memory and batched scoring time. It writes float32_results.json and
+exits non-zero if any sweep point moves by more than FLOAT32_TOLERANCE_MM.
+The same tolerance is asserted by tests/test_float32_parity.py (the ends of
+each sweep variable; every point with pytest --run-slow).
+
+Usage:
+    python benchmark.py [--workers N] [--store FILE | --no-store]
+    python benchmark.py --algorithms 'v9/*' 'best/*' [--workers N]
+    python benchmark.py --perf [--algorithms PATTERN ...] [--baseline FILE]
+    python benchmark.py --stages [--algorithms PATTERN ...] [--trace trace.json]
+    python benchmark.py --search [--objective rmse|max_error|di_error] [--workers N]
+    python benchmark.py --float32 [--algorithms PATTERN ...] [--workers N]
 """
+import argparse
+import fnmatch
+import importlib
 import sys
 import os
 import json
 import time
 
+import numpy as np
+
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from evaluation import run_sweep, quick_eval
+from evaluation import (run_sweep, quick_eval, profile_algorithm, search_worst_case,
+                        SEARCH_OBJECTIVES)
 from best_algorithm import build_predictor
+from result_store import DEFAULT_DB, ResultStore
+
+RESULTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (prefix, module, registry) for every algorithm generation
+ALGORITHM_REGISTRIES = [
+    ('v1', 'algorithms', 'ALGORITHMS'),
+    ('v2', 'algorithms_v2', 'ALGORITHMS_V2'),
+    ('v3', 'algorithms_v3', 'ALGORITHMS_V3'),
+    ('v4', 'algorithms_v4', 'ALGORITHMS_V4'),
+    ('v5', 'algorithms_v5', 'ALGORITHMS_V5'),
+    ('v6', 'algorithms_v6', 'ALGORITHMS_V6'),
+    ('v7', 'algorithms_v7', 'ALGORITHMS_V7'),
+    ('v8', 'algorithms_v8', 'ALGORITHMS_V8'),
+    ('v9', 'algorithms_v9', 'ALGORITHMS_V9'),
+    ('v10', 'algorithms_v10', 'ALGORITHMS_V10'),
+    ('v11', 'algorithms_v11', 'ALGORITHMS_V11'),
+    ('final', 'algorithms_final', 'ALGORITHMS_FINAL'),
+]
+
+# Predictors instrumented with stage_profile stages
+STAGED_ALGORITHMS = ['best/shape_selection_robust', 'v9/ultimate_v9', 'v10/adaptive_hybrid']
+
+# Predictors that keep float32 models when trained on float32 strokes, and
+# the largest per-point change (mm, any metric) the float32 mode may cause
+FLOAT32_ALGORITHMS = ['best/shape_selection_robust', 'v8/pca_shape', 'v9/denoised_pca']
+FLOAT32_TOLERANCE_MM = 0.01
+
+# Relative slack before a perf metric counts as a regression; latencies
+# below LATENCY_FLOOR_MS are timer noise and never flagged. p99 is reported
+# but not compared: with a few hundred samples it is too noisy to gate on
+DEFAULT_TOLERANCE = 0.25
+LATENCY_FLOOR_MS = 0.05
+# Accuracy is deterministic, so any real increase is flagged
+RMSE_TOLERANCE = 1e-6
+
+
+def load_algorithms(patterns=None):
+    """{'v9/ultimate_v9': factory, ...} over all registries, plus best_algorithm.
+
+    patterns are fnmatch globs on the qualified name (e.g. 'v9/*').
+    """
+    algos = {'best/shape_selection_robust': build_predictor}
+    for prefix, module, registry in ALGORITHM_REGISTRIES:
+        for name, factory in getattr(importlib.import_module(module), registry).items():
+            algos[f"{prefix}/{name}"] = factory
+    if patterns:
+        algos = {k: v for k, v in algos.items()
+                 if any(fnmatch.fnmatch(k, p) for p in patterns)}
+    return algos
+
+
+def compare_perf(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """List of regression messages of current vs baseline perf reports."""
+    regressions = []
+    for name, cur in current['algorithms'].items():
+        base = baseline['algorithms'].get(name)
+        if base is None or 'error' in cur or 'error' in base:
+            continue
+        checks = [
+            ('train_time_s', cur['train_time_s'], base['train_time_s'], True, 1e-3),
+            ('latency p50', cur['latency_ms']['p50'], base['latency_ms']['p50'], True,
+             LATENCY_FLOOR_MS),
+            ('latency p95', cur['latency_ms']['p95'], base['latency_ms']['p95'], True,
+             LATENCY_FLOOR_MS),
+            ('predictions/s', cur['predictions_per_s'], base['predictions_per_s'], False, 0),
+            ('peak_memory_mb', cur['peak_memory_mb'], base['peak_memory_mb'], True, 0.5),
+        ]
+        for label, c, b, higher_is_worse, floor in checks:
+            if higher_is_worse:
+                bad = c > b * (1 + tolerance) and c - b > floor
+            else:
+                bad = c < b / (1 + tolerance)
+            if bad:
+                regressions.append(f"{name}: {label} {b:.4g} -> {c:.4g}")
+        if cur['rmse'] > base['rmse'] + RMSE_TOLERANCE:
+            regressions.append(f"{name}: rmse {base['rmse']:.4f} -> {cur['rmse']:.4f}")
+    return regressions
+
+
+def run_perf(args):
+    """Profile the selected algorithms, save perf_results.json, compare to baseline."""
+    from dataclasses import asdict
+    from evaluation import evaluate_algorithm, aggregate_metrics
+    from data_model import SimParams
+
+    print("=" * 70)
+    print("Draw-in Prediction Performance Benchmark")
+    print("=" * 70)
+
+    params = SimParams()
+    report = {'params': asdict(params), 'passes': args.passes, 'algorithms': {}}
+    for name, factory in load_algorithms(args.algorithms).items():
+        try:
+            perf = profile_algorithm(factory, params, passes=args.passes)
+            perf['rmse'] = aggregate_metrics(evaluate_algorithm(factory, params))['rmse']
+        except Exception as e:  # keep profiling the other algorithms
+            print(f"  {name:<40} FAILED: {e}")
+            report['algorithms'][name] = {'error': str(e)}
+            continue
+        del perf['params']
+        report['algorithms'][name] = perf
+        lat = perf['latency_ms']
+        print(f"  {name:<40} train={perf['train_time_s'] * 1000:8.1f}ms "
+              f"p50={lat['p50']:7.2f}ms p95={lat['p95']:7.2f}ms p99={lat['p99']:7.2f}ms "
+              f"{perf['predictions_per_s']:8.0f}/s mem={perf['peak_memory_mb']:6.1f}MB "
+              f"RMSE={perf['rmse']:.3f}")
+
+    output_path = args.output or os.path.join(RESULTS_DIR, 'perf_results.json')
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to: {output_path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_perf(report, baseline, args.tolerance)
+        print(f"\n--- Comparison against {args.baseline} "
+              f"(tolerance {args.tolerance:.0%}) ---")
+        for r in regressions:
+            print(f"  REGRESSION {r}")
+        if regressions:
+            return 1
+        print("  No regressions")
+    return 0
+
+
+def run_stages(args):
+    """Per-stage time of training and prediction, as a table and optional trace."""
+    from dataclasses import asdict
+    import stage_profile
+    from evaluation import build_train_data, evaluate_predictor
+    from data_model import SimParams, generate_dataset_batch
+
+    print("=" * 70)
+    print("Draw-in Prediction Stage Profile")
+    print("=" * 70)
+
+    params = SimParams()
+    _, train_batch, test_batch = generate_dataset_batch(params)
+    train_data = build_train_data(train_batch)
+
+    stage_profile.enable(trace=bool(args.trace))
+    try:
+        for name, factory in load_algorithms(args.algorithms or STAGED_ALGORITHMS).items():
+            with stage_profile.stage(name):
+                with stage_profile.stage('train'):
+                    predictor = factory(train_data, params)
+                with stage_profile.stage('predict'):
+                    for _ in range(args.passes):
+                        evaluate_predictor(predictor, test_batch, params.det_range)
+        print(stage_profile.format_table())
+
+        output_path = args.output or os.path.join(RESULTS_DIR, 'stage_results.json')
+        with open(output_path, 'w') as f:
+            json.dump({'params': asdict(params), 'passes': args.passes,
+                       **stage_profile.snapshot()}, f, indent=2)
+        print(f"\nResults saved to: {output_path}")
+        if args.trace:
+            stage_profile.write_chrome_trace(args.trace)
+            print(f"Chrome trace saved to: {args.trace}")
+    finally:
+        stage_profile.disable()
+    return 0
+
+
+def _nbytes(obj, seen=None) -> int:
+    """Bytes of the numpy arrays reachable from obj (dicts, lists, attributes).
+
+    Views count once, as their base array.
+    """
+    seen = set() if seen is None else seen
+    if isinstance(obj, np.ndarray):
+        while isinstance(obj.base, np.ndarray):
+            obj = obj.base
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(_nbytes(v, seen) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes(v, seen) for v in obj)
+    if hasattr(obj, '__dict__'):
+        return _nbytes(vars(obj), seen)
+    return 0
+
+
+def run_float32(args, store):
+    """float32 vs float64 sweep parity, model memory and scoring time."""
+    from evaluation import build_train_data, evaluate_predictor
+    from data_model import SimParams, generate_dataset_batch
+
+    print("=" * 70)
+    print(f"Float32 Compact Mode Parity ({args.workers} worker(s))")
+    print("=" * 70)
+
+    params = SimParams()
+    report = {'tolerance_mm': FLOAT32_TOLERANCE_MM, 'algorithms': {}}
+    failures = []
+    for name, factory in load_algorithms(args.algorithms or FLOAT32_ALGORITHMS).items():
+        sweeps = {dt: run_sweep(factory, name, workers=args.workers, store=store,
+                                dtype=dt)
+                  for dt in (np.float64, np.float32)}
+        points = []
+        for p64, p32 in zip(sweeps[np.float64]['sweep_points'],
+                            sweeps[np.float32]['sweep_points']):
+            diff = max(abs(p32[k] - p64[k]) for k in ('rmse', 'max_error', 'di_error'))
+            points.append({'param': p64['param'], 'value': p64['value'],
+                           'rmse_float64': p64['rmse'], 'rmse_float32': p32['rmse'],
+                           'max_diff': diff})
+            if diff > FLOAT32_TOLERANCE_MM:
+                failures.append(f"{name}: {p64['param']}={p64['value']:g} "
+                                f"moved {diff:.4f}mm")
+
+        # Model memory and batched scoring time at the default configuration
+        entry = {}
+        for dt in (np.float64, np.float32):
+            _, train_batch, test_batch = generate_dataset_batch(params, dtype=dt)
+            predictor = factory(build_train_data(train_batch), params)
+            evaluate_predictor(predictor, test_batch, params.det_range)  # warm-up
+            t0 = time.perf_counter()
+            for _ in range(args.passes):
+                evaluate_predictor(predictor, test_batch, params.det_range)
+            entry[np.dtype(dt).name] = {
+                'worst_rmse': sweeps[dt]['summary']['worst_rmse'],
+                'model_bytes': _nbytes(getattr(predictor, 'sensor_models', None)),
+                'predict_s': (time.perf_counter() - t0) / args.passes,
+            }
+        entry['max_point_diff'] = max(pt['max_diff'] for pt in points)
+        entry['sweep_points'] = points
+        report['algorithms'][name] = entry
+
+        f64, f32 = entry['float64'], entry['float32']
+        print(f"  {name:<32} worst RMSE {f64['worst_rmse']:.4f} -> {f32['worst_rmse']:.4f} "
+              f"max diff {entry['max_point_diff']:.2e}mm  "
+              f"model {f64['model_bytes'] / 1024:.0f} -> {f32['model_bytes'] / 1024:.0f}KB  "
+              f"predict {f64['predict_s'] * 1000:.1f} -> {f32['predict_s'] * 1000:.1f}ms")
+
+    output_path = args.output or os.path.join(RESULTS_DIR, 'float32_results.json')
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to: {output_path}")
+
+    for msg in failures:
+        print(f"  PARITY FAILURE {msg}")
+    if failures:
+        return 1
+    print(f"  All sweep points within {FLOAT32_TOLERANCE_MM}mm of float64")
+    return 0
+
+
+def run_search(args):
+    """Worst-case search for best_algorithm, saved to search_results.json."""
+    print("=" * 70)
+    print(f"Draw-in Prediction Worst-Case Search ({args.workers} worker(s))")
+    print("=" * 70)
+
+    results = search_worst_case(build_predictor, "shape_selection_robust",
+                                objective=args.objective, n_initial=args.initial,
+                                seed=args.seed, verbose=True, workers=args.workers)
+
+    output_path = args.output or os.path.join(RESULTS_DIR, 'search_results.json')
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to: {output_path}")
+    return results
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Draw-in prediction benchmark")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Process-pool size for the full sweep (default: 1)")
+    parser.add_argument('--perf', action='store_true',
+                        help="Profile latency/throughput/memory instead of the sweep")
+    parser.add_argument('--algorithms', nargs='+', metavar='PATTERN',
+                        help="Glob(s) on qualified names, e.g. 'v9/*' (--perf, or "
+                             "sweep every match into the store)")
+    parser.add_argument('--store', default=DEFAULT_DB,
+                        help="Sweep result store (default: results.db)")
+    parser.add_argument('--no-store', action='store_true',
+                        help="Evaluate every sweep point, store nothing")
+    parser.add_argument('--passes', type=int, default=3,
+                        help="Repetitions of the test set per algorithm (default: 3)")
+    parser.add_argument('--stages', action='store_true',
+                        help="Per-stage profile of the instrumented predictors")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="With --stages, also write a Chrome trace JSON")
+    parser.add_argument('--search', action='store_true',
+                        help="Adaptive worst-case search over joint SimParams")
+    parser.add_argument('--objective', choices=SEARCH_OBJECTIVES, default='rmse',
+                        help="Metric the search maximizes (default: rmse)")
+    parser.add_argument('--initial', type=int, default=27,
+                        help="Latin-hypercube seed points for --search (default: 27)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Sampling seed for --search (default: 0)")
+    parser.add_argument('--float32', action='store_true',
+                        help="Sweep parity of the float32 compact mode against float64")
+    parser.add_argument('--output', help="Report path (default: perf_results.json, "
+                                         "stage_results.json, search_results.json "
+                                         "or float32_results.json)")
+    parser.add_argument('--baseline', help="Stored perf report to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative slack before flagging a regression (default: 0.25)")
+    args = parser.parse_args()
+
+    if args.perf:
+        sys.exit(run_perf(args))
+    if args.stages:
+        sys.exit(run_stages(args))
+    if args.search:
+        return run_search(args)
+    store = None if args.no_store else ResultStore(args.store)
+    try:
+        if args.float32:
+            sys.exit(run_float32(args, store))
+        if args.algorithms:
+            return run_sweeps(args, store)
+        return run_default(args, store)
+    finally:
+        if store is not None:
+            store.close()
+
+
+def run_sweeps(args, store):
+    """Full sweep of every matching registry algorithm, one summary line each."""
+    print("=" * 70)
+    print(f"Draw-in Prediction Sweeps ({args.workers} worker(s))")
+    print("=" * 70)
+    summaries = {}
+    for name, factory in load_algorithms(args.algorithms).items():
+        try:
+            s = run_sweep(factory, name, workers=args.workers, store=store)['summary']
+        except Exception as e:  # keep sweeping the other algorithms
+            print(f"  {name:<40} FAILED: {e}")
+            continue
+        summaries[name] = s
+        print(f"  {name:<40} RMSE={s['worst_rmse']:7.3f} MaxErr={s['worst_max_error']:7.3f} "
+              f"DI={s['worst_di_error']:7.3f} {s['total_time_s']:6.1f}s "
+              f"({s['cached_points']} stored)")
+    return summaries
+
+
+def run_default(args, store):
+
     print("=" * 70)
     print("Draw-in Prediction Algorithm Benchmark")
     print("=" * 70)
@@ -33,12 +417,12 @@ def main():
     print(f"\nQuick pass: {'YES' if passed_quick else 'NO'}")
 
     # Full sweep
-    print("\n--- Full Sweep Evaluation ---")
-    results = run_sweep(build_predictor, algo_name, verbose=True)
+    print(f"\n--- Full Sweep Evaluation ({args.workers} worker(s)) ---")
+    results = run_sweep(build_predictor, algo_name, verbose=True,
+                        workers=args.workers, store=store)
 
     # Save results
-    output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
-                               'sweep_results.json')
+    output_path = os.path.join(RESULTS_DIR, 'sweep_results.json')
     with open(output_path, 'w') as f:
         json.dump(results, f, indent=2)
     print(f"\nResults saved to: {output_path}")
@@ -0,0 +1,173 @@
+"""
+Shared reader for PAM-Stamp consolidado CSVs (RelatorioDrawIn_Consolidado.csv).
+
+Each row is one simulated stamp; every cell after the name packs a whole
+curve as comma-separated numbers:
+
+    Simulacao, Tempo_s, STEP, DP01, ..., DP12
+    Stamp_1, "0.15,0.21,...", "-220.0,-198.0,...", "0.0,0.16,...", ...
+
+read_consolidado converts each column for all stamps with one bulk NumPy
+conversion (instead of float() per number) into
+
+    time, step: (n_stamps, n_points)
+    curves:     (n_stamps, n_sensors, n_points)
+
+and keeps a sidecar cache next to the CSV (<csv>.npz, stored uncompressed).
+The cache is valid while the CSV's mtime and size match the ones recorded
+in it; its arrays are memory-mapped straight out of the .npz, so reloading a
+large export costs a header read.
+
+Usage:
+    data = read_consolidado(csv_path)
+    data.curves[:, data.sensor_index('DP02'), -1]     # final draw-in per stamp
+"""
+
+import csv
+import os
+import zipfile
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = '.npz'
+
+# PAM-Stamp sensor names -> data_model layout (sides A..D, 1/3 corners, 2 middle)
+SIM_SENSOR_NAMES = {
+    f'DP{3 * i + p:02d}': f'{side}{p}'
+    for i, side in enumerate('ABCD') for p in (1, 2, 3)
+}
+
+
+@dataclass
+class Consolidado:
+    """Curves of a consolidado CSV, one row per stamp."""
+    names: np.ndarray          # (n_stamps,) stamp names
+    sensor_names: List[str]    # DP01..DP12, in column order
+    time: np.ndarray           # (n_stamps, n_points)
+    step: np.ndarray           # (n_stamps, n_points)
+    curves: np.ndarray         # (n_stamps, n_sensors, n_points)
+
+    def __len__(self):
+        return len(self.names)
+
+    def sensor_index(self, name: str) -> int:
+        return self.sensor_names.index(name)
+
+
+def _parse_column(cells, n_stamps):
+    """Packed 'a,b,c' cells of one column -> (n_stamps, n_points) array.
+
+    Every cell must hold the same number of values: ragged curves raise
+    ValueError (a divisible total alone would re-cut them across rows).
+    """
+    counts = {c.count(',') + 1 for c in cells}
+    if len(counts) != 1 or len(cells) != n_stamps:
+        raise ValueError("consolidado CSV: curves of different lengths in one column "
+                         f"({sorted(counts)} values per cell)")
+    flat = np.array(','.join(cells).split(','), dtype=np.float64)
+    return flat.reshape(n_stamps, -1)
+
+
+def parse_consolidado(path: str) -> Consolidado:
+    """Parse the CSV (no cache)."""
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)  # Simulacao, Tempo_s, STEP, DP01..DP12
+        rows = [row for row in reader if row and row[0].startswith('Stamp_')]
+
+    if not rows:
+        raise ValueError(f"{path}: no Stamp_ rows")
+    n = len(rows)
+    columns = list(zip(*rows))
+    return Consolidado(
+        names=np.array(columns[0], dtype=str),
+        sensor_names=list(header[3:]),
+        time=_parse_column(columns[1], n),
+        step=_parse_column(columns[2], n),
+        curves=np.stack([_parse_column(columns[i], n)
+                         for i in range(3, len(header))], axis=1),
+    )
+
+
+def cache_path(path: str) -> str:
+    return path + CACHE_SUFFIX
+
+
+def _source_signature(path: str) -> np.ndarray:
+    st = os.stat(path)
+    return np.array([CACHE_VERSION, st.st_mtime_ns, st.st_size], dtype=np.int64)
+
+
+def _save_cache(path: str, data: Consolidado):
+    """Write the sidecar atomically; silently skipped if the directory is read-only."""
+    target = cache_path(path)
+    tmp = f'{target}.tmp{os.getpid()}.npz'
+    try:
+        np.savez(tmp, signature=_source_signature(path), names=data.names,
+                 sensor_names=np.array(data.sensor_names, dtype=str),
+                 time=data.time, step=data.step, curves=data.curves)
+        os.replace(tmp, target)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _mmap_npz(path: str) -> dict:
+    """Memory-map every member of an uncompressed .npz.
+
+    np.load ignores mmap_mode for archives, but stored (uncompressed)
+    members are plain .npy files at a fixed offset inside the zip.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: compressed member {info.filename}")
+            # Local file header: 30 fixed bytes, then name and extra field
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(f.read(4), dtype='<u2')
+            f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+            if np.lib.format.read_magic(f) == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"{path}: object array {info.filename}")
+            arrays[info.filename[:-len('.npy')]] = np.memmap(
+                path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                order='F' if fortran else 'C')
+    return arrays
+
+
+def _load_cache(path: str):
+    """Cached Consolidado, or None if missing, stale or unreadable."""
+    target = cache_path(path)
+    try:
+        arrays = _mmap_npz(target)
+        if not np.array_equal(arrays['signature'], _source_signature(path)):
+            return None
+        return Consolidado(
+            names=arrays['names'],
+            sensor_names=[str(s) for s in arrays['sensor_names']],
+            time=arrays['time'],
+            step=arrays['step'],
+            curves=arrays['curves'],
+        )
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+
+def read_consolidado(path: str, use_cache: bool = True) -> Consolidado:
+    """Read a consolidado CSV through its sidecar cache (arrays read-only)."""
+    path = str(path)
+    if use_cache:
+        data = _load_cache(path)
+        if data is not None:
+            return data
+    data = parse_consolidado(path)
+    if use_cache:
+        _save_cache(path, data)
+    return data
@@ -2,18 +2,26 @@
 """Convert PAM-Stamp CSV to P7 training model JSON.
 
 Reads RelatorioDrawIn_Consolidado.csv (11-point simulation curves) and produces
-a prediction model JSON with 200-point normalized shapes on a uniform α grid.
+a prediction model JSON with 200-point normalized shapes on a uniform α grid,
+plus the same model in the binary format of model_format.py (<die_id>.drawin),
+which best_algorithm.load_predictor memory-maps without re-parsing.
 
 Interpolation: Clamped cubic B-spline (zero derivative at both endpoints),
-ensuring curves approach start/end horizontally.
+ensuring curves approach start/end horizontally. The spline is linear in
+the data, so it is built once as an evaluation matrix and applied to every
+stamp and sensor in one product; --workers splits the stamps across processes.
 """
 
-import csv
+import argparse
 import json
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from scipy.interpolate import make_interp_spline
 from pathlib import Path
 
+from consolidado import read_consolidado
+from model_format import write_model
+
 # --- Configuration ---
 N_PTS = 200       # output α grid resolution
 N_FINE = 1001     # intermediate fine grid for interpolation
@@ -30,92 +38,118 @@ MIDDLES = ['DP02', 'DP05', 'DP08', 'DP11']
 
 def read_csv(path):
     """Read CSV and return list of stroke dicts."""
-    with open(path) as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        sensor_names = header[3:]  # DP01..DP12
-
-        strokes = []
-        for row in reader:
-            name = row[0]
-            step = np.array([float(x) for x in row[2].split(',')])
-            sensors = {}
-            for i, sname in enumerate(sensor_names, 3):
-                vals = np.array([float(x) for x in row[i].split(',')])
-                # Offset to ensure curve starts from zero
-                vals = vals - vals[0]
-                sensors[sname] = vals
-            strokes.append({'name': name, 'step': step, 'sensors': sensors})
-    return strokes, sensor_names
-
-
-def bspline_interpolate(x, y, x_new):
-    """Clamped cubic B-spline: zero first derivative at both endpoints."""
-    spline = make_interp_spline(
-        x, y, k=3,
-        bc_type=([(1, 0.0)], [(1, 0.0)])
-    )
-    result = spline(x_new)
-    # Clamp to non-negative (B-spline can oscillate slightly near zero)
-    return np.maximum(result, 0.0)
-
-
-def process_strokes(strokes):
-    """Interpolate all strokes, compute α, build normalized shapes."""
+    data = read_consolidado(path)
+    # Offset to ensure curves start from zero
+    curves = data.curves - data.curves[:, :, :1]
+    strokes = []
+    for i, name in enumerate(data.names):
+        sensors = {sname: curves[i, j] for j, sname in enumerate(data.sensor_names)}
+        strokes.append({'name': str(name), 'step': np.array(data.step[i]),
+                        'sensors': sensors})
+    return strokes, data.sensor_names
+
+
+def bspline_matrix(x, x_new):
+    """(len(x_new), len(x)) matrix M with M @ y == clamped spline of y at x_new.
+
+    The clamped spline is linear in the data, so interpolating the identity
+    gives the collocation solve and the evaluation at x_new in one matrix;
+    every curve sampled on x is then interpolated by a single product.
+    """
+    x = np.array(x, dtype=float)
+    n = len(x)
+    clamp = [(1, np.zeros(n))]
+    return make_interp_spline(x, np.eye(n), k=3, bc_type=(clamp, clamp))(x_new)
+
+
+def _middle_shapes(fine_ms, fine_corners, alpha_grid):
+    """Normalized middle shapes for a chunk of stamps.
+
+    fine_ms: (n, N_FINE) middle curves; fine_corners: (n, n_corners, N_FINE).
+    Returns (shapes (n_kept, N_PTS), D_ratios (n_kept,)) of the usable stamps.
+    """
+    n_fine = fine_ms.shape[1]
+    corner_dis = fine_corners[:, :, -1]
+    avg_corner_di = corner_dis.mean(axis=1)
+
+    # α = mean of normalized same-side corner curves (corners with DI > 0)
+    pos = corner_dis > 0
+    safe_dis = np.where(pos, corner_dis, 1.0)[:, :, np.newaxis]
+    norm_sum = np.sum(np.where(pos[:, :, np.newaxis], fine_corners / safe_dis, 0.0), axis=1)
+    alpha = norm_sum / np.maximum(pos.sum(axis=1), 1)[:, np.newaxis]
+
+    # Make α strictly monotonic for resampling
+    alpha = np.maximum.accumulate(alpha, axis=1)
+    alpha += np.arange(n_fine) * 1e-12
+
+    D = fine_ms[:, -1]
+    keep = (avg_corner_di > 0) & pos.any(axis=1) & (alpha[:, -1] > alpha[:, 0]) & (D > 0)
+    rows = np.flatnonzero(keep)
+
+    span = alpha[rows, -1:] - alpha[rows, :1]
+    alpha_norm = (alpha[rows] - alpha[rows, :1]) / span
+    # Middle sensor: normalize by total draw-in → shape
+    shape = fine_ms[rows] / D[rows, np.newaxis]
+
+    # Resample shape onto uniform α grid (each stamp has its own α axis)
+    shapes = np.array([np.interp(alpha_grid, a, s) for a, s in zip(alpha_norm, shape)])
+    shapes = shapes.reshape(len(rows), len(alpha_grid))
+    shapes[:, 0] = 0.0
+    shapes[:, -1] = 1.0
+    return shapes, D[rows] / avg_corner_di[rows]
+
+
+def _process_chunk(args):
+    """Spline-interpolate a chunk of stamps and build their middle shapes."""
+    curves, sensor_names, M, alpha_grid = args
+    # 1. Interpolate all sensors of all stamps 11 → 1001 points in one product
+    fine = np.maximum(curves @ M.T, 0.0)
+    result = {}
+    # 2. Per-middle processing
+    for ms, corners in SAME_SIDE_CORNERS.items():
+        cols = [sensor_names.index(c) for c in corners]
+        result[ms] = _middle_shapes(fine[:, sensor_names.index(ms)], fine[:, cols],
+                                    alpha_grid)
+    return result
+
+
+def process_curves(step_coarse, curves, sensor_names, workers=1):
+    """Interpolate all stamps, compute α, build normalized shapes.
+
+    step_coarse: (n_points,) STEP grid shared by all stamps
+    curves: (n_stamps, n_sensors, n_points), offset to start from zero
+    With workers > 1 the stamps are split into chunks across processes.
+    """
     alpha_grid = np.linspace(0, 1, N_PTS)
-
-    # All stamps share the same STEP grid
-    step_coarse = strokes[0]['step']  # 11 points, -220 to 0
     step_fine = np.linspace(step_coarse[0], step_coarse[-1], N_FINE)
+    M = bspline_matrix(step_coarse, step_fine)
+
+    curves = np.asarray(curves, dtype=float)
+    sensor_names = list(sensor_names)
+    n_chunks = max(1, min(workers, len(curves)))
+    chunks = np.array_split(np.arange(len(curves)), n_chunks)
+    jobs = [(curves[idx], sensor_names, M, alpha_grid) for idx in chunks]
+    if n_chunks > 1:
+        with ProcessPoolExecutor(max_workers=n_chunks) as pool:
+            results = list(pool.map(_process_chunk, jobs))
+    else:
+        results = [_process_chunk(jobs[0])]
+
+    sensor_data = {}
+    for ms in SAME_SIDE_CORNERS:
+        shapes = np.concatenate([r[ms][0] for r in results])
+        ratios = np.concatenate([r[ms][1] for r in results])
+        sensor_data[ms] = {'shapes': shapes.tolist(), 'D_ratios': ratios.tolist()}
+    return sensor_data, alpha_grid
 
-    sensor_data = {ms: {'shapes': [], 'D_ratios': []} for ms in MIDDLES}
-
-    for stroke in strokes:
-        # 1. Interpolate all 12 sensors from 11 → 1001 points
-        fine = {}
-        for sname, vals in stroke['sensors'].items():
-            fine[sname] = bspline_interpolate(step_coarse, vals, step_fine)
-
-        # 2. Per-middle processing
-        for ms, corners in SAME_SIDE_CORNERS.items():
-            corner_dis = [fine[c][-1] for c in corners]
-            avg_corner_di = np.mean(corner_dis)
-
-            if avg_corner_di <= 0:
-                continue
-
-            # α = mean of normalized same-side corner curves
-            norm_corners = []
-            for c in corners:
-                di = fine[c][-1]
-                if di > 0:
-                    norm_corners.append(fine[c] / di)
-            if not norm_corners:
-                continue
-            alpha = np.mean(norm_corners, axis=0)
-
-            # Make α strictly monotonic for resampling
-            alpha = np.maximum.accumulate(alpha)
-            alpha += np.arange(N_FINE) * 1e-12
-            if alpha[-1] <= alpha[0]:
-                continue
-            alpha_norm = (alpha - alpha[0]) / (alpha[-1] - alpha[0])
-
-            # Middle sensor: normalize by total draw-in → shape
-            D = fine[ms][-1]
-            if D <= 0:
-                continue
-            shape = fine[ms] / D
-
-            # Resample shape onto uniform α grid
-            shape_resampled = np.interp(alpha_grid, alpha_norm, shape)
-            shape_resampled[0] = 0.0
-            shape_resampled[-1] = 1.0
-
-            sensor_data[ms]['shapes'].append(shape_resampled.tolist())
-            sensor_data[ms]['D_ratios'].append(D / avg_corner_di)
 
-    return sensor_data, alpha_grid
+def process_strokes(strokes, workers=1):
+    """Interpolate all strokes, compute α, build normalized shapes."""
+    # All stamps share the same STEP grid
+    step_coarse = strokes[0]['step']  # 11 points, -220 to 0
+    sensor_names = list(strokes[0]['sensors'])
+    curves = np.array([[s['sensors'][name] for name in sensor_names] for s in strokes])
+    return process_curves(step_coarse, curves, sensor_names, workers)
 
 
 def build_model_json(sensor_data, alpha_grid, die_id="93309290"):
@@ -156,17 +190,43 @@ def build_model_json(sensor_data, alpha_grid, die_id="93309290"):
     return model
 
 
+def build_model_records(model):
+    """Per-sensor records of a model JSON dict, for model_format.write_model."""
+    alpha_grid = np.array(model["alpha_grid"])
+    records = {}
+    for ms, data in model["sensors"].items():
+        records[ms] = {
+            "all_shapes": np.array(data["shapes"]),
+            "med_shape": np.array(data["med_shape"]),
+            "alpha_grid": alpha_grid,
+            "corners": SAME_SIDE_CORNERS[ms],
+            "D_ratio_mean": data["D_ratio_mean"],
+            "D_ratio_std": data["D_ratio_std"],
+            "n_training_strokes": data["n_training_strokes"],
+        }
+    return records
+
+
 def main():
-    csv_path = Path(__file__).parent / "sample-data" / "RelatorioDrawIn_Consolidado.csv"
+    parser = argparse.ArgumentParser(description="Convert PAM-Stamp CSV to a P7 model")
+    parser.add_argument("--csv", default=str(Path(__file__).parent / "sample-data"
+                                             / "RelatorioDrawIn_Consolidado.csv"))
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for the per-stamp work (default: 1)")
+    args = parser.parse_args()
+
+    csv_path = Path(args.csv)
     out_dir = Path(__file__).parent.parent.parent / "config" / "prediction-models"
     out_path = out_dir / "93309290.json"
 
     print(f"Reading {csv_path}")
-    strokes, sensor_names = read_csv(csv_path)
-    print(f"  {len(strokes)} strokes, {len(sensor_names)} sensors")
+    data = read_consolidado(csv_path)
+    print(f"  {len(data)} strokes, {len(data.sensor_names)} sensors")
 
     print("Processing strokes (clamped B-spline 11→1001, then α-resample to 200)...")
-    sensor_data, alpha_grid = process_strokes(strokes)
+    curves = data.curves - data.curves[:, :, :1]   # curves start from zero
+    sensor_data, alpha_grid = process_curves(data.step[0], curves, data.sensor_names,
+                                             args.workers)
 
     print("Building model JSON...")
     model = build_model_json(sensor_data, alpha_grid)
@@ -184,6 +244,11 @@ def main():
         json.dump(model, f, indent=2)
     print(f"\nWritten to {out_path}")
 
+    bin_path = out_path.with_suffix(".drawin")
+    meta = {k: model[k] for k in ("die_id", "source", "date", "n_pts")}
+    write_model(str(bin_path), build_model_records(model), meta)
+    print(f"Written to {bin_path}")
+
 
 if __name__ == '__main__':
     main()
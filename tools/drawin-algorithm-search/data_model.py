@@ -5,8 +5,14 @@ Generates synthetic stamping press sensor data with configurable parameters
 for algorithm testing and evaluation.
 """
 
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
 import numpy as np
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict
 from typing import Dict, List, Optional
 
 N_PTS = 200
@@ -58,6 +64,81 @@ class StrokeData:
     warp: np.ndarray      # time warp array, shape (N_PTS,)
 
 
+@dataclass
+class StrokeBatch:
+    """Columnar storage for many strokes: one contiguous array per field.
+
+    Sensor axis follows sensor_names (ALL_SENSORS by default); use
+    sensor_index / idx() to map names to columns.
+    """
+    values: np.ndarray        # shape (n_strokes, n_sensors, N_PTS) - noisy
+    clean_values: np.ndarray  # shape (n_strokes, n_sensors, N_PTS) - noise-free
+    total_di: np.ndarray      # shape (n_strokes, n_sensors)
+    steep: np.ndarray         # shape (n_strokes, n_sensors)
+    warp: np.ndarray          # shape (n_strokes, N_PTS)
+    sensor_names: List[str] = field(default_factory=lambda: list(ALL_SENSORS))
+
+    def __post_init__(self):
+        self.sensor_index = {name: j for j, name in enumerate(self.sensor_names)}
+
+    def __len__(self) -> int:
+        return len(self.warp)
+
+    def idx(self, names: List[str]) -> List[int]:
+        """Column indices for a list of sensor names."""
+        return [self.sensor_index[name] for name in names]
+
+    def astype(self, dtype) -> 'StrokeBatch':
+        """Batch with every array cast to dtype (no copy if already dtype).
+
+        float32 is the compact mode: half the memory, and predictors trained
+        on float32 strokes keep their shape banks in float32 too (see
+        stroke_dtype).
+        """
+        return StrokeBatch(
+            **{fname: np.asarray(getattr(self, fname), dtype=dtype)
+               for fname in _STROKE_FIELDS},
+            sensor_names=list(self.sensor_names),
+        )
+
+    @classmethod
+    def from_strokes(cls, strokes: List[StrokeData]) -> 'StrokeBatch':
+        """Pack a list of StrokeData into columnar arrays."""
+        n, n_sensors = len(strokes), len(ALL_SENSORS)
+        batch = cls(
+            values=np.zeros((n, n_sensors, N_PTS)),
+            clean_values=np.zeros((n, n_sensors, N_PTS)),
+            total_di=np.zeros((n, n_sensors)),
+            steep=np.zeros((n, n_sensors)),
+            warp=np.zeros((n, N_PTS)),
+        )
+        for i, stroke in enumerate(strokes):
+            batch.warp[i] = stroke.warp
+            for j, name in enumerate(ALL_SENSORS):
+                sd = stroke.sensors[name]
+                batch.values[i, j] = sd.values
+                batch.clean_values[i, j] = sd.clean_values
+                batch.total_di[i, j] = sd.total_di
+                batch.steep[i, j] = sd.steep
+        return batch
+
+    def to_strokes(self) -> List[StrokeData]:
+        """Unpack into StrokeData objects (arrays are views, not copies)."""
+        strokes = []
+        for i in range(len(self)):
+            sensors = {
+                name: SensorData(
+                    values=self.values[i, j],
+                    clean_values=self.clean_values[i, j],
+                    total_di=float(self.total_di[i, j]),
+                    steep=float(self.steep[i, j]),
+                )
+                for j, name in enumerate(self.sensor_names)
+            }
+            strokes.append(StrokeData(sensors=sensors, warp=self.warp[i]))
+        return strokes
+
+
 def s_curve(alpha: np.ndarray, D: float, k: float) -> np.ndarray:
     """Sigmoid-based S-curve. D=total draw-in, k=steepness."""
     def sigmoid(x):
@@ -126,6 +207,67 @@ def gen_stroke(rng: np.random.Generator, sensor_di: Dict[str, float],
     return StrokeData(sensors=sensors, warp=warp)
 
 
+def _warp_interp_matrix(n_cp: int = 5) -> np.ndarray:
+    """(N_PTS, n_cp) matrix W with spd = W @ cp == np.interp over N_PTS (see gen_time_warp)."""
+    return np.stack([
+        np.interp(np.arange(N_PTS), np.linspace(0, N_PTS - 1, n_cp), np.eye(n_cp)[j])
+        for j in range(n_cp)
+    ], axis=1)
+
+
+_WARP_W = _warp_interp_matrix()
+
+
+def generate_strokes(rng: np.random.Generator, sensor_di: Dict[str, float],
+                     params: SimParams, n: int, seed_compat: bool = False) -> StrokeBatch:
+    """Generate n press strokes directly into a StrokeBatch.
+
+    Same model as gen_stroke, but with every random draw made for all n
+    strokes at once, in this order:
+        rng.random((n, 5))             speed control points (gen_time_warp)
+        rng.random(n)                  stroke-level steepness jitter
+        rng.random((n, 12, 2))         per-sensor steepness / DI jitter
+        rng.standard_normal((n, 12, N_PTS))   measurement noise (if noise > 0)
+
+    The stream therefore differs from n successive gen_stroke calls. Pass
+    seed_compat=True to instead consume the rng exactly as gen_stroke does
+    (one stroke at a time, scalar draws), reproducing the strokes of
+    generate_dataset for the same seed bit for bit - at gen_stroke speed.
+
+    Memory is ~40 KB per stroke; generate millions of strokes in chunks of
+    n. The stream depends on the chunk size, so keep it fixed for
+    reproducible runs.
+    """
+    if seed_compat:
+        return StrokeBatch.from_strokes([gen_stroke(rng, sensor_di, params)
+                                         for _ in range(n)])
+
+    # Time warp: piecewise-linear speed -> clamp -> normalized cumulative sum
+    cp = 1.0 + (rng.random((n, 5)) - 0.5) * 2.0 * params.speed_var
+    spd = np.maximum(cp @ _WARP_W.T, 0.01)
+    warp = np.cumsum(spd, axis=1)
+    warp /= warp[:, -1:]
+
+    # Stroke-level steepness (8%), then per-sensor steepness (8%) and DI (4%)
+    stroke_k = params.steep * (1.0 + (rng.random(n) - 0.5) * 0.08)
+    u = rng.random((n, len(ALL_SENSORS), 2))
+    k = stroke_k[:, np.newaxis] * (1.0 + (u[:, :, 0] - 0.5) * 0.08)
+    nominal = np.array([sensor_di[name] for name in ALL_SENSORS])
+    di_var = nominal * (1.0 + (u[:, :, 1] - 0.5) * 0.04)
+
+    clean_values = s_curve(warp[:, np.newaxis, :], di_var[:, :, np.newaxis],
+                           k[:, :, np.newaxis])
+    noise_std = di_var * params.noise / 1000.0
+    if params.noise > 0:
+        noise_vals = rng.standard_normal(clean_values.shape) * noise_std[:, :, np.newaxis]
+        values = np.maximum(0, clean_values + noise_vals)
+    else:
+        values = np.maximum(0, clean_values)
+
+    return StrokeBatch(values=values, clean_values=clean_values,
+                       total_di=di_var, steep=k, warp=warp)
+
+
 def compute_alpha(stroke: StrokeData, ref_corners: List[str]) -> np.ndarray:
     """Compute stroke progress alpha from corner sensors (normalized by their totalDI)."""
     normalized = np.zeros((len(ref_corners), N_PTS))
@@ -143,14 +285,51 @@ def get_cutoff_index(values: np.ndarray, det_range: float) -> int:
     return int(exceeds[0])
 
 
-def generate_dataset(params: SimParams):
+def compute_alpha_batch(batch: StrokeBatch, ref_corners: List[str]) -> np.ndarray:
+    """compute_alpha for every stroke in a batch -> shape (n_strokes, N_PTS)."""
+    cols = batch.idx(ref_corners)
+    normalized = batch.values[:, cols, :] / batch.total_di[:, cols, np.newaxis]
+    return np.mean(normalized, axis=1)
+
+
+def get_cutoff_index_batch(values: np.ndarray, det_range: float) -> np.ndarray:
+    """get_cutoff_index for each row of a (n_strokes, N_PTS) array."""
+    exceeds = values > det_range
+    return np.where(exceeds.any(axis=1), np.argmax(exceeds, axis=1), values.shape[1])
+
+
+def stroke_dtype(train_data: Dict[str, List[Dict]]) -> np.dtype:
+    """Storage dtype for models fitted on train_data.
+
+    float32 when every training stroke's values are float32 (strokes built
+    from a StrokeBatch.astype(np.float32) batch), float64 otherwise.
+    """
+    strokes = [s for ms_strokes in train_data.values() for s in ms_strokes]
+    if strokes and all(getattr(s['values'], 'dtype', None) == np.float32
+                       for s in strokes):
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+def generate_dataset(params: SimParams, cache_dir: Optional[str] = None):
     """Generate complete train+test dataset for a parameter configuration.
 
+    If cache_dir is given (or the DRAWIN_DATASET_CACHE environment variable
+    is set), the dataset is looked up in / stored to the content-addressed
+    cache there instead of being regenerated; see load_dataset.
+
     Returns:
         sensor_di: nominal DI values for all sensors
         train_strokes: list of StrokeData for training
         test_strokes: list of StrokeData for testing
     """
+    if cache_dir is None:
+        cache_dir = os.environ.get('DRAWIN_DATASET_CACHE')
+    if cache_dir:
+        cached = load_dataset(params, cache_dir)
+        if cached is not None:
+            return cached
+
     rng = np.random.default_rng(params.seed)
 
     # Generate nominal DI values (fixed for all strokes)
@@ -162,4 +341,144 @@ def generate_dataset(params: SimParams):
     # Generate test strokes
     test = [gen_stroke(rng, sensor_di, params) for _ in range(params.test_strokes)]
 
+    if cache_dir:
+        save_dataset(params, cache_dir, sensor_di,
+                     StrokeBatch.from_strokes(train), StrokeBatch.from_strokes(test))
+
+    return sensor_di, train, test
+
+
+def generate_dataset_batch(params: SimParams, cache_dir: Optional[str] = None,
+                           seed_compat: bool = True, dtype=None):
+    """Like generate_dataset, but returns train/test as StrokeBatch.
+
+    With seed_compat=True (default) the strokes are exactly those of
+    generate_dataset for the same params. seed_compat=False uses the
+    vectorized generate_strokes stream instead: statistically equivalent,
+    much faster for large datasets, but different draws for a given seed.
+
+    Cache hits are loaded straight into the batch arrays without building
+    per-sensor objects.
+
+    dtype (e.g. np.float32 for the compact mode) casts the returned
+    batches; strokes are always generated and cached in float64, so the
+    draws for a seed do not depend on it.
+    """
+    if dtype is not None:
+        sensor_di, train, test = generate_dataset_batch(params, cache_dir, seed_compat)
+        return sensor_di, train.astype(dtype), test.astype(dtype)
+    if cache_dir is None:
+        cache_dir = os.environ.get('DRAWIN_DATASET_CACHE')
+    generator = 'compat' if seed_compat else 'vectorized'
+    if cache_dir:
+        cached = load_dataset_batch(params, cache_dir, generator=generator)
+        if cached is not None:
+            return cached
+
+    if seed_compat:
+        sensor_di, train, test = generate_dataset(params, cache_dir=cache_dir)
+        return sensor_di, StrokeBatch.from_strokes(train), StrokeBatch.from_strokes(test)
+
+    rng = np.random.default_rng(params.seed)
+    sensor_di = gen_sensor_di(rng, params)
+    train = generate_strokes(rng, sensor_di, params, params.train_strokes)
+    test = generate_strokes(rng, sensor_di, params, params.test_strokes)
+    if cache_dir:
+        save_dataset(params, cache_dir, sensor_di, train, test, generator=generator)
     return sensor_di, train, test
+
+
+# ── Dataset cache ────────────────────────────────────────────────────────────
+#
+# One directory per dataset, named by dataset_key(params), holding plain .npy
+# blocks so they can be memory-mapped (and shared between worker processes):
+#   sensor_di.npy            (12,)
+#   {split}_values.npy       (n_strokes, 12, N_PTS)
+#   {split}_clean_values.npy (n_strokes, 12, N_PTS)
+#   {split}_total_di.npy     (n_strokes, 12)
+#   {split}_steep.npy        (n_strokes, 12)
+#   {split}_warp.npy         (n_strokes, N_PTS)
+# with split in {train, test} and sensors in ALL_SENSORS order.
+
+# Bump whenever gen_stroke / gen_sensor_di change what a seed produces.
+DATASET_CACHE_VERSION = 1
+
+_STROKE_FIELDS = ('values', 'clean_values', 'total_di', 'steep', 'warp')
+
+
+def dataset_key(params: SimParams, generator: str = 'compat') -> str:
+    """Content hash identifying the dataset generated from params.
+
+    generator is 'compat' (gen_stroke stream) or 'vectorized'
+    (generate_strokes stream); see generate_dataset_batch.
+    """
+    payload = {
+        'version': DATASET_CACHE_VERSION,
+        'generator': generator,
+        'n_pts': N_PTS,
+        'sensors': ALL_SENSORS,
+        'params': asdict(params),
+    }
+    blob = json.dumps(payload, sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest()[:32]
+
+
+def save_dataset(params: SimParams, cache_dir: str, sensor_di: Dict[str, float],
+                 train: StrokeBatch, test: StrokeBatch,
+                 generator: str = 'compat') -> str:
+    """Store a generated dataset in the cache; returns its directory.
+
+    Written to a temporary directory and renamed into place, so concurrent
+    writers of the same key are harmless and readers never see partial data.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    final = os.path.join(cache_dir, dataset_key(params, generator))
+    if os.path.isdir(final):
+        return final
+
+    tmp = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-')
+    try:
+        np.save(os.path.join(tmp, 'sensor_di.npy'),
+                np.array([sensor_di[name] for name in ALL_SENSORS]))
+        for split, batch in (('train', train), ('test', test)):
+            for fname in _STROKE_FIELDS:
+                np.save(os.path.join(tmp, f'{split}_{fname}.npy'),
+                        getattr(batch, fname))
+        os.rename(tmp, final)
+    except OSError:
+        # Lost the race to another writer (or the disk is unhappy)
+        shutil.rmtree(tmp, ignore_errors=True)
+    return final
+
+
+def load_dataset_batch(params: SimParams, cache_dir: str,
+                       mmap_mode: Optional[str] = 'c', generator: str = 'compat'):
+    """Load a cached dataset as (sensor_di, train, test) StrokeBatches.
+
+    Returns None on a cache miss. Arrays are memory-mapped copy-on-write by
+    default: pages are shared between processes reading the same dataset,
+    and callers that modify arrays in place only touch their private copy.
+    """
+    path = os.path.join(cache_dir, dataset_key(params, generator))
+    if not os.path.isdir(path):
+        return None
+
+    sensor_di_arr = np.load(os.path.join(path, 'sensor_di.npy'))
+    sensor_di = {name: float(v) for name, v in zip(ALL_SENSORS, sensor_di_arr)}
+    splits = []
+    for split in ('train', 'test'):
+        splits.append(StrokeBatch(**{
+            fname: np.load(os.path.join(path, f'{split}_{fname}.npy'),
+                           mmap_mode=mmap_mode)
+            for fname in _STROKE_FIELDS
+        }))
+    return sensor_di, splits[0], splits[1]
+
+
+def load_dataset(params: SimParams, cache_dir: str, mmap_mode: Optional[str] = 'c'):
+    """Load a cached dataset as StrokeData lists, or None on a cache miss."""
+    cached = load_dataset_batch(params, cache_dir, mmap_mode)
+    if cached is None:
+        return None
+    sensor_di, train, test = cached
+    return sensor_di, train.to_strokes(), test.to_strokes()
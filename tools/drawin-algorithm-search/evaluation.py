@@ -7,15 +7,19 @@ since the noise floor would otherwise make sub-mm RMSE impossible.
 """
 
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import Dict, List, Callable, Any
+import itertools
 import json
 import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
 
+from consolidado import read_consolidado, SIM_SENSOR_NAMES
 from data_model import (
-    SimParams, StrokeData, SensorData,
-    MIDDLE_SENSORS, SAME_SIDE_CORNERS, N_PTS,
-    generate_dataset, compute_alpha, get_cutoff_index
+    SimParams, StrokeData, SensorData, StrokeBatch,
+    MIDDLE_SENSORS, SAME_SIDE_CORNERS, ALL_SENSORS, N_PTS,
+    generate_dataset_batch, compute_alpha_batch, get_cutoff_index_batch
 )
 
 
@@ -68,79 +72,200 @@ def compute_metrics(actual_clean: np.ndarray, predicted: np.ndarray,
     return PredictionMetrics(rmse=rmse, max_error=max_err, r2=r2, di_error=di_err)
 
 
+def compute_metrics_batch(actual_clean: np.ndarray, predicted: np.ndarray,
+                          cutoff_idx: np.ndarray) -> List[PredictionMetrics]:
+    """compute_metrics for each row of (n, N_PTS) arrays with per-row cutoffs."""
+    actual_clean = np.asarray(actual_clean, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+    n, n_pts = actual_clean.shape
+    cutoff_idx = np.asarray(cutoff_idx)
+    ext = np.arange(n_pts)[np.newaxis, :] >= cutoff_idx[:, np.newaxis]
+    n_ext = np.maximum(ext.sum(axis=1), 1)
+
+    errors = np.where(ext, predicted - actual_clean, 0.0)
+    ss_res = np.sum(errors ** 2, axis=1)
+    rmse = np.sqrt(ss_res / n_ext)
+    max_err = np.max(np.abs(errors), axis=1)
+
+    act_mean = np.sum(np.where(ext, actual_clean, 0.0), axis=1) / n_ext
+    ss_tot = np.sum(np.where(ext, actual_clean - act_mean[:, np.newaxis], 0.0) ** 2,
+                    axis=1)
+    r2 = np.where(ss_tot > 1e-12, 1.0 - ss_res / np.where(ss_tot > 1e-12, ss_tot, 1.0),
+                  1.0)
+    di_err = np.abs(predicted[:, -1] - actual_clean[:, -1])
+
+    full = cutoff_idx >= n_pts
+    return [
+        PredictionMetrics(rmse=0.0, max_error=0.0, r2=1.0, di_error=0.0) if full[i]
+        else PredictionMetrics(rmse=float(rmse[i]), max_error=float(max_err[i]),
+                               r2=float(r2[i]), di_error=float(di_err[i]))
+        for i in range(n)
+    ]
+
+
 AlgorithmFactory = Callable
 
 
+def build_train_data(batch: StrokeBatch,
+                     corner_map: Dict[str, List[str]] = SAME_SIDE_CORNERS
+                     ) -> Dict[str, List[Dict]]:
+    """Adapter: per-middle-sensor training dicts expected by algorithm factories."""
+    train_data = {}
+    for ms in MIDDLE_SENSORS:
+        corners = corner_map[ms]
+        cols = batch.idx(corners)
+        m = batch.sensor_index[ms]
+        alpha = compute_alpha_batch(batch, corners)
+        train_data[ms] = [
+            {
+                'alpha': alpha[i],
+                'values': batch.values[i, m],
+                'total_di': float(batch.total_di[i, m]),
+                'corner_curves': {c: batch.values[i, j] for c, j in zip(corners, cols)},
+                'corner_dis': {c: float(batch.total_di[i, j]) for c, j in zip(corners, cols)},
+                'steep': float(batch.steep[i, m]),
+            }
+            for i in range(len(batch))
+        ]
+    return train_data
+
+
+def predict_batch(predictor: Callable, ms: str, batch: StrokeBatch,
+                  alpha: np.ndarray, cutoff_idx: np.ndarray,
+                  corners: List[str]) -> np.ndarray:
+    """Adapter: run a predictor over every stroke of a batch for one middle sensor.
+
+    Uses predictor.predict_batch when the predictor provides one; otherwise
+    calls the dict-based signature stroke by stroke. Rows whose cutoff is
+    N_PTS (fully observed) are returned unchanged.
+    """
+    cols = batch.idx(corners)
+    values = batch.values[:, batch.sensor_index[ms], :]
+    corner_dis = {c: batch.total_di[:, j] for c, j in zip(corners, cols)}
+
+    if hasattr(predictor, 'predict_batch'):
+        return predictor.predict_batch(ms, alpha, values, cutoff_idx, corner_dis)
+
+    predicted = np.array(values)
+    for i in np.flatnonzero(cutoff_idx < N_PTS):
+        predicted[i] = predict_stroke(predictor, ms, batch, i, alpha[i],
+                                      int(cutoff_idx[i]), corners)
+    return predicted
+
+
+def predict_stroke(predictor: Callable, ms: str, batch: StrokeBatch, i: int,
+                   alpha: np.ndarray, cutoff_idx: int,
+                   corners: List[str]) -> np.ndarray:
+    """Adapter: one dict-signature predictor call for stroke i of a batch."""
+    m = batch.sensor_index[ms]
+    cols = batch.idx(corners)
+    return predictor(
+        ms_name=ms,
+        alpha_observed=alpha[:cutoff_idx],
+        values_observed=batch.values[i, m, :cutoff_idx],
+        cutoff_idx=cutoff_idx,
+        alpha_full=alpha,
+        corner_curves={name: batch.values[i, j] for name, j in zip(corners, cols)},
+        corner_dis={name: float(batch.total_di[i, j]) for name, j in zip(corners, cols)},
+    )
+
+
 def evaluate_algorithm(algo_factory: AlgorithmFactory,
                        params: SimParams,
-                       verbose: bool = False) -> List[PredictionMetrics]:
-    """Evaluate an algorithm on a single parameter configuration."""
-    sensor_di, train_strokes, test_strokes = generate_dataset(params)
+                       verbose: bool = False,
+                       dtype=None) -> List[PredictionMetrics]:
+    """Evaluate an algorithm on a single parameter configuration.
 
-    # Build training data
-    train_data = {}
+    dtype=np.float32 runs the compact mode: train and test strokes are cast
+    to float32 (predictors that support it then keep float32 models).
+    Metrics are always computed in float64.
+    """
+    sensor_di, train_batch, test_batch = generate_dataset_batch(params, dtype=dtype)
+
+    predictor = algo_factory(build_train_data(train_batch), params)
+    return evaluate_predictor(predictor, test_batch, params.det_range, verbose)
+
+
+def evaluate_predictor(predictor: Callable, test_batch: StrokeBatch,
+                       det_range: float,
+                       verbose: bool = False) -> List[PredictionMetrics]:
+    """Metrics of a trained predictor on every (stroke, middle sensor) of a batch."""
+    per_ms = {}
     for ms in MIDDLE_SENSORS:
         corners = SAME_SIDE_CORNERS[ms]
-        ms_train = []
-        for stroke in train_strokes:
-            alpha = compute_alpha(stroke, corners)
-            ms_values = stroke.sensors[ms].values
-            ms_total_di = stroke.sensors[ms].total_di
-
-            corner_curves = {c: stroke.sensors[c].values for c in corners}
-            corner_dis = {c: stroke.sensors[c].total_di for c in corners}
-
-            ms_train.append({
-                'alpha': alpha,
-                'values': ms_values,
-                'total_di': ms_total_di,
-                'corner_curves': corner_curves,
-                'corner_dis': corner_dis,
-                'steep': stroke.sensors[ms].steep,
-            })
-        train_data[ms] = ms_train
+        m = test_batch.sensor_index[ms]
+        alpha = compute_alpha_batch(test_batch, corners)
+        actual_noisy = test_batch.values[:, m, :]
+        actual_clean = test_batch.clean_values[:, m, :]
 
-    predictor = algo_factory(train_data, params)
+        # Cutoff based on noisy values (what sensors actually see)
+        cutoff_idx = get_cutoff_index_batch(actual_noisy, det_range)
+        predicted = predict_batch(predictor, ms, test_batch, alpha, cutoff_idx, corners)
+
+        # Compare prediction against CLEAN ground truth
+        per_ms[ms] = (cutoff_idx, compute_metrics_batch(actual_clean, predicted, cutoff_idx))
 
     all_metrics = []
-    for stroke in test_strokes:
+    for i in range(len(test_batch)):
         for ms in MIDDLE_SENSORS:
-            corners = SAME_SIDE_CORNERS[ms]
-            alpha = compute_alpha(stroke, corners)
-            actual_noisy = stroke.sensors[ms].values
-            actual_clean = stroke.sensors[ms].clean_values
-
-            # Cutoff based on noisy values (what sensors actually see)
-            cutoff_idx = get_cutoff_index(actual_noisy, params.det_range)
-
-            if cutoff_idx >= N_PTS:
+            cutoff_idx, metrics = per_ms[ms]
+            if cutoff_idx[i] >= N_PTS:
                 continue
+            all_metrics.append(metrics[i])
 
-            alpha_observed = alpha[:cutoff_idx]
-            values_observed = actual_noisy[:cutoff_idx]
+            if verbose:
+                m = metrics[i]
+                print(f"  {ms} cutoff@{cutoff_idx[i]}: RMSE={m.rmse:.3f}mm "
+                      f"MaxErr={m.max_error:.3f}mm DI_err={m.di_error:.3f}mm")
 
-            corner_curves = {c: stroke.sensors[c].values for c in corners}
-            corner_dis = {c: stroke.sensors[c].total_di for c in corners}
+    return all_metrics
 
-            predicted = predictor(
-                ms_name=ms,
-                alpha_observed=alpha_observed,
-                values_observed=values_observed,
-                cutoff_idx=cutoff_idx,
-                alpha_full=alpha,
-                corner_curves=corner_curves,
-                corner_dis=corner_dis,
-            )
 
-            # Compare prediction against CLEAN ground truth
-            metrics = compute_metrics(actual_clean, predicted, cutoff_idx)
-            all_metrics.append(metrics)
+def simulation_batch(csv_path: str) -> StrokeBatch:
+    """PAM-Stamp consolidado stamps as a noise-free StrokeBatch.
 
-            if verbose:
-                print(f"  {ms} cutoff@{cutoff_idx}: RMSE={metrics.rmse:.3f}mm "
-                      f"MaxErr={metrics.max_error:.3f}mm DI_err={metrics.di_error:.3f}mm")
-
-    return all_metrics
+    Curves are offset to start at zero and resampled linearly from the STEP
+    axis onto N_PTS points; DPxx sensors are mapped to the A1..D3 layout.
+    The steepness of a simulated stamp is unknown, so steep holds the
+    SimParams default as the nominal value.
+    """
+    data = read_consolidado(csv_path)
+    step = data.step[0]
+    grid = np.linspace(step[0], step[-1], N_PTS)
+    # (n_points, N_PTS) linear-interpolation weights, shared by every curve
+    W = np.array([np.interp(grid, step, e) for e in np.eye(len(step))])
+
+    cols = [data.sensor_names.index(dp)
+            for name in ALL_SENSORS
+            for dp, mapped in SIM_SENSOR_NAMES.items() if mapped == name]
+    curves = data.curves[:, cols, :]
+    values = (curves - curves[:, :, :1]) @ W
+    n = len(data)
+    return StrokeBatch(
+        values=values,
+        clean_values=values.copy(),
+        total_di=values[:, :, -1].copy(),
+        steep=np.full((n, len(ALL_SENSORS)), SimParams().steep),
+        warp=np.tile(np.linspace(0, 1, N_PTS), (n, 1)),
+    )
+
+
+def evaluate_on_simulation(algo_factory: AlgorithmFactory, csv_path: str,
+                           n_train: int = None, det_range: float = 40.0,
+                           verbose: bool = False) -> List[PredictionMetrics]:
+    """Train on the first n_train simulated stamps (default half), test on the rest."""
+    batch = simulation_batch(csv_path)
+    n_train = n_train or len(batch) // 2
+    train = StrokeBatch(batch.values[:n_train], batch.clean_values[:n_train],
+                        batch.total_di[:n_train], batch.steep[:n_train],
+                        batch.warp[:n_train])
+    test = StrokeBatch(batch.values[n_train:], batch.clean_values[n_train:],
+                       batch.total_di[n_train:], batch.steep[n_train:],
+                       batch.warp[n_train:])
+    params = SimParams(train_strokes=n_train, test_strokes=len(test),
+                       det_range=det_range, noise=0.0)
+    predictor = algo_factory(build_train_data(train), params)
+    return evaluate_predictor(predictor, test, det_range, verbose)
 
 
 def aggregate_metrics(metrics_list: List[PredictionMetrics]) -> Dict[str, float]:
@@ -174,11 +299,64 @@ def get_sweep_configs() -> List[tuple]:
     ]
 
 
+def sweep_params(param_name: str, value: float) -> SimParams:
+    """SimParams for one sweep point: defaults with a single parameter overridden."""
+    params = SimParams()
+    if param_name == 'train_strokes':
+        value = int(value)
+    setattr(params, param_name, value)
+    return params
+
+
+def evaluate_sweep_point(algo_factory: AlgorithmFactory,
+                         param_name: str, value: float,
+                         dtype=None) -> SweepResult:
+    """Evaluate one (param_name, value) sweep point.
+
+    Module-level so it can be shipped to worker processes; algo_factory
+    must therefore be picklable (a module-level function, not a closure).
+    """
+    metrics = evaluate_algorithm(algo_factory, sweep_params(param_name, value),
+                                 verbose=False, dtype=dtype)
+    agg = aggregate_metrics(metrics)
+    return SweepResult(
+        param_name=param_name,
+        param_value=float(value),
+        rmse=agg['rmse'],
+        max_error=agg['max_error'],
+        r2=agg['r2'],
+        di_error=agg['di_error'],
+        n_predictions=agg['n'],
+    )
+
+
 def run_sweep(algo_factory: AlgorithmFactory,
               algo_name: str = "unknown",
-              verbose: bool = False) -> Dict[str, Any]:
-    """Run the full multi-variable sweep."""
-    sweep_configs = get_sweep_configs()
+              verbose: bool = False,
+              workers: int = 1,
+              store=None,
+              dtype=None) -> Dict[str, Any]:
+    """Run the full multi-variable sweep.
+
+    With workers > 1 the sweep points are fanned out over a process pool.
+    Every point seeds its own dataset from SimParams, so results are
+    identical to a serial run and come back in sweep order.
+
+    With a result_store.ResultStore, points already stored for this
+    algorithm name and code version are read back instead of evaluated, and
+    every new point is appended as soon as it finishes, so an interrupted
+    sweep resumes where it stopped.
+
+    dtype=np.float32 evaluates the compact mode (see evaluate_algorithm);
+    its results are stored under "<algo_name>:float32".
+    """
+    if dtype is not None and np.dtype(dtype) != np.float64:
+        store_name = f"{algo_name}:{np.dtype(dtype).name}"
+    else:
+        store_name = algo_name
+    jobs = [(param_name, val)
+            for param_name, values in get_sweep_configs()
+            for val in values]
     all_results = []
     worst_rmse = 0.0
     worst_max_error = 0.0
@@ -186,48 +364,65 @@ def run_sweep(algo_factory: AlgorithmFactory,
 
     t0 = time.time()
 
-    for param_name, values in sweep_configs:
-        if verbose:
-            print(f"\n=== Sweeping {param_name} ===")
-
-        for val in values:
-            params = SimParams()
-
-            if param_name == 'det_range':
-                params.det_range = val
-            elif param_name == 'noise':
-                params.noise = val
-            elif param_name == 'speed_var':
-                params.speed_var = val
-            elif param_name == 'steep':
-                params.steep = val
-            elif param_name == 'train_strokes':
-                params.train_strokes = int(val)
+    cached = {}
+    if store is not None:
+        from result_store import code_hash
+        code = code_hash(algo_factory)
+        for p, v in jobs:
+            metrics = store.get(store_name, code, sweep_params(p, v))
+            if metrics is not None:
+                cached[(p, v)] = SweepResult(
+                    param_name=p, param_value=float(v), rmse=metrics['rmse'],
+                    max_error=metrics['max_error'], r2=metrics['r2'],
+                    di_error=metrics['di_error'], n_predictions=metrics['n'])
+    todo = [(p, v) for p, v in jobs if (p, v) not in cached]
+
+    if workers > 1 and todo:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        computed = pool.map(evaluate_sweep_point,
+                            itertools.repeat(algo_factory),
+                            [p for p, _ in todo], [v for _, v in todo],
+                            itertools.repeat(dtype))
+    else:
+        pool = None
+        computed = (evaluate_sweep_point(algo_factory, p, v, dtype) for p, v in todo)
+
+    def in_sweep_order():
+        for p, v in jobs:
+            if (p, v) in cached:
+                yield cached[(p, v)]
+                continue
+            result = next(computed)
+            if store is not None:
+                store.add(store_name, code, sweep_params(p, v),
+                          {'rmse': result.rmse, 'max_error': result.max_error,
+                           'r2': result.r2, 'di_error': result.di_error,
+                           'n': result.n_predictions},
+                          sweep_param=p, sweep_value=float(v))
+            yield result
+
+    results_iter = in_sweep_order()
+
+    try:
+        current_param = None
+        for result in results_iter:
+            if verbose and result.param_name != current_param:
+                current_param = result.param_name
+                print(f"\n=== Sweeping {current_param} ===")
 
-            if verbose:
-                print(f"  {param_name}={val:.2f}...", end=" ", flush=True)
-
-            metrics = evaluate_algorithm(algo_factory, params, verbose=False)
-            agg = aggregate_metrics(metrics)
-
-            result = SweepResult(
-                param_name=param_name,
-                param_value=float(val),
-                rmse=agg['rmse'],
-                max_error=agg['max_error'],
-                r2=agg['r2'],
-                di_error=agg['di_error'],
-                n_predictions=agg['n'],
-            )
             all_results.append(result)
 
-            worst_rmse = max(worst_rmse, agg['rmse'])
-            worst_max_error = max(worst_max_error, agg['max_error'])
-            worst_di_error = max(worst_di_error, agg['di_error'])
+            worst_rmse = max(worst_rmse, result.rmse)
+            worst_max_error = max(worst_max_error, result.max_error)
+            worst_di_error = max(worst_di_error, result.di_error)
 
             if verbose:
-                print(f"RMSE={agg['rmse']:.3f}mm MaxErr={agg['max_error']:.3f}mm "
-                      f"DI_err={agg['di_error']:.3f}mm (n={agg['n']})")
+                print(f"  {result.param_name}={result.param_value:.2f}... "
+                      f"RMSE={result.rmse:.3f}mm MaxErr={result.max_error:.3f}mm "
+                      f"DI_err={result.di_error:.3f}mm (n={result.n_predictions})")
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
     elapsed = time.time() - t0
 
@@ -237,6 +432,7 @@ def run_sweep(algo_factory: AlgorithmFactory,
         'worst_max_error': worst_max_error,
         'worst_di_error': worst_di_error,
         'total_time_s': elapsed,
+        'cached_points': len(cached),
         'meets_criteria': (worst_rmse < 1.0 and worst_max_error < 3.0 and worst_di_error < 2.0),
     }
 
@@ -263,7 +459,199 @@ def run_sweep(algo_factory: AlgorithmFactory,
         print(f"Worst Max Error: {worst_max_error:.4f}mm (target < 3.0)")
         print(f"Worst DI Error: {worst_di_error:.4f}mm (target < 2.0)")
         print(f"Meets criteria: {summary['meets_criteria']}")
-        print(f"Time: {elapsed:.1f}s")
+        print(f"Time: {elapsed:.1f}s ({len(cached)}/{len(jobs)} points from the store)")
+        print(f"{'='*60}")
+
+    return results_data
+
+
+# Worst-case search over the joint SimParams space. Bounds are the extremes
+# of the 1-D sweeps; integer parameters are rounded after scaling
+SEARCH_INT_PARAMS = ('train_strokes',)
+SEARCH_OBJECTIVES = ('rmse', 'max_error', 'di_error')
+
+
+def search_space() -> Dict[str, tuple]:
+    """{param: (low, high)} searched by search_worst_case."""
+    return {name: (float(min(values)), float(max(values)))
+            for name, values in get_sweep_configs()}
+
+
+def latin_hypercube(rng: np.random.Generator, n: int, dims: int) -> np.ndarray:
+    """(n, dims) Latin hypercube sample of the unit cube.
+
+    Every dimension is cut into n equal strata with exactly one point in each,
+    so even a small sample covers the range of every parameter.
+    """
+    strata = np.argsort(rng.random((dims, n)), axis=1).T
+    return (strata + rng.random((n, dims))) / n
+
+
+def search_params(point: np.ndarray, seed: int) -> SimParams:
+    """SimParams for a unit-cube point of search_space()."""
+    params = SimParams(seed=seed)
+    for x, (name, (lo, hi)) in zip(point, search_space().items()):
+        value = lo + float(x) * (hi - lo)
+        if name in SEARCH_INT_PARAMS:
+            value = int(round(value))
+        setattr(params, name, value)
+    return params
+
+
+def evaluate_search_point(algo_factory: AlgorithmFactory,
+                          params: SimParams) -> Dict[str, float]:
+    """aggregate_metrics of one SimParams (module-level for worker processes)."""
+    return aggregate_metrics(evaluate_algorithm(algo_factory, params, verbose=False))
+
+
+def search_worst_case(algo_factory: AlgorithmFactory,
+                      algo_name: str = "unknown",
+                      objective: str = 'rmse',
+                      n_initial: int = 27,
+                      eta: int = 3,
+                      max_seeds: int = 3,
+                      refine_rounds: int = 3,
+                      refine_samples: int = 4,
+                      top_k: int = 5,
+                      seed: int = 0,
+                      verbose: bool = False,
+                      workers: int = 1) -> Dict[str, Any]:
+    """Search the joint SimParams space for the configurations that hurt most.
+
+    get_sweep_configs varies one parameter at a time, so it never sees
+    interactions (high noise with an early cutoff and few training strokes).
+    This search:
+
+    1. seeds n_initial Latin-hypercube points over search_space(), each
+       evaluated on one dataset seed;
+    2. successive halving: keeps the worst 1/eta by objective and evaluates
+       the survivors on eta times as many seeds (up to max_seeds), so noisy
+       one-seed maxima are confirmed before they are reported;
+    3. refines locally: refine_samples Gaussian perturbations around each of
+       the top_k configurations, at full fidelity, with a radius halving
+       every round.
+
+    An evaluation is one evaluate_algorithm call (one SimParams, one seed).
+    Metrics of a configuration are averaged over its seeds (max_error is
+    the max). With workers > 1 each batch of evaluations runs on a process
+    pool; the result does not depend on the worker count.
+    """
+    if objective not in SEARCH_OBJECTIVES:
+        raise ValueError(f"objective must be one of {SEARCH_OBJECTIVES}, got {objective!r}")
+    names = list(search_space())
+    base_seed = SimParams().seed
+    rng = np.random.default_rng(seed)
+    points = []        # unit-cube coordinates
+    runs = []          # per point: {dataset seed: aggregate metrics}
+    n_evaluations = 0
+
+    def params_dict(i):
+        p = search_params(points[i], base_seed)
+        return {name: getattr(p, name) for name in names}
+
+    def combined(i):
+        aggs = list(runs[i].values())
+        return {
+            'rmse': float(np.mean([a['rmse'] for a in aggs])),
+            'max_error': float(np.max([a['max_error'] for a in aggs])),
+            'di_error': float(np.mean([a['di_error'] for a in aggs])),
+            'r2': float(np.mean([a['r2'] for a in aggs])),
+            'n': int(sum(a['n'] for a in aggs)),
+            'n_seeds': len(aggs),
+        }
+
+    def score(i):
+        return combined(i)[objective]
+
+    def evaluate(indices, n_seeds):
+        """Bring every point in indices up to n_seeds dataset seeds."""
+        nonlocal n_evaluations
+        jobs = [(i, base_seed + s) for i in indices
+                for s in range(n_seeds) if base_seed + s not in runs[i]]
+        params = [search_params(points[i], s) for i, s in jobs]
+        if pool is not None:
+            results = pool.map(evaluate_search_point,
+                               itertools.repeat(algo_factory), params)
+        else:
+            results = (evaluate_search_point(algo_factory, p) for p in params)
+        for (i, s), agg in zip(jobs, results):
+            runs[i][s] = agg
+        n_evaluations += len(jobs)
+
+    def add_points(new_points):
+        start = len(points)
+        for x in new_points:
+            points.append(np.clip(x, 0.0, 1.0))
+            runs.append({})
+        return list(range(start, len(points)))
+
+    def report(stage, indices):
+        if verbose:
+            worst = max(indices, key=score)
+            shown = ', '.join(f"{k}={v:.3g}" for k, v in params_dict(worst).items())
+            print(f"  {stage}: {len(indices)} configs, {n_evaluations} evals so far, "
+                  f"worst {objective}={score(worst):.3f}mm ({shown})")
+
+    t0 = time.time()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        # 1. Latin-hypercube seeding
+        survivors = add_points(latin_hypercube(rng, n_initial, len(names)))
+        n_seeds = 1
+        evaluate(survivors, n_seeds)
+        report("LHS seeding", survivors)
+
+        # 2. Successive halving on the number of dataset seeds
+        while n_seeds < max_seeds and len(survivors) > top_k:
+            keep = max(top_k, int(np.ceil(len(survivors) / eta)))
+            survivors = sorted(survivors, key=score, reverse=True)[:keep]
+            n_seeds = min(n_seeds * eta, max_seeds)
+            evaluate(survivors, n_seeds)
+            report(f"halving to {n_seeds} seed(s)", survivors)
+        evaluate(survivors, max_seeds)
+
+        # 3. Local refinement around the current worst configurations
+        radius = 0.1
+        for r in range(refine_rounds):
+            full = [i for i in range(len(points)) if len(runs[i]) >= max_seeds]
+            top = sorted(full, key=score, reverse=True)[:top_k]
+            new = add_points([points[i] + rng.normal(0.0, radius, len(names))
+                              for i in top for _ in range(refine_samples)])
+            evaluate(new, max_seeds)
+            report(f"refinement {r + 1} (radius {radius:.3f})", new)
+            radius /= 2
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed = time.time() - t0
+    full = [i for i in range(len(points)) if len(runs[i]) >= max_seeds]
+    ranked = sorted(full, key=score, reverse=True)
+    worst_configs = [{'params': params_dict(i), **combined(i)} for i in ranked[:top_k]]
+
+    results_data = {
+        'summary': {
+            'algorithm': algo_name,
+            'objective': objective,
+            'n_evaluations': n_evaluations,
+            'n_configs': len(points),
+            'seeds_per_config': max_seeds,
+            f'worst_{objective}': worst_configs[0][objective] if worst_configs else 0.0,
+            'total_time_s': elapsed,
+        },
+        'worst_configs': worst_configs,
+        'configs': [{'params': params_dict(i), **combined(i)} for i in range(len(points))],
+    }
+
+    if verbose:
+        print(f"\n{'='*60}")
+        print(f"Algorithm: {algo_name}  ({n_evaluations} evaluations, "
+              f"{len(points)} configs, {elapsed:.1f}s)")
+        print(f"Worst configurations by {objective} (mean of {max_seeds} seed(s)):")
+        for c in worst_configs:
+            shown = ', '.join(f"{k}={v:.3g}" for k, v in c['params'].items())
+            print(f"  RMSE={c['rmse']:.3f}mm MaxErr={c['max_error']:.3f}mm "
+                  f"DI_err={c['di_error']:.3f}mm  {shown}")
         print(f"{'='*60}")
 
     return results_data
@@ -302,3 +690,79 @@ def quick_eval(algo_factory: AlgorithmFactory,
               f"MaxErr={worst['max_error']:.3f}mm DI={worst['di_error']:.3f}mm")
 
     return worst
+
+
+def profile_algorithm(algo_factory: AlgorithmFactory,
+                      params: SimParams = None,
+                      passes: int = 3) -> Dict[str, Any]:
+    """Time training and per-prediction latency of one algorithm.
+
+    Training is the factory call on the training set. Latency is measured per
+    single-stroke predictor call (the dict signature the press-side code
+    uses), over `passes` repetitions of the test set; predictors that also
+    provide predict_batch get a separate batched throughput figure. Peak
+    memory (tracemalloc, which includes numpy buffers) is taken in a separate
+    untimed run so tracing does not distort the latencies.
+    """
+    params = params or SimParams()
+    _, train_batch, test_batch = generate_dataset_batch(params)
+    train_data = build_train_data(train_batch)
+
+    t0 = time.perf_counter()
+    predictor = algo_factory(train_data, params)
+    train_time = time.perf_counter() - t0
+
+    cases = []
+    for ms in MIDDLE_SENSORS:
+        corners = SAME_SIDE_CORNERS[ms]
+        alpha = compute_alpha_batch(test_batch, corners)
+        cutoff_idx = get_cutoff_index_batch(test_batch.values[:, test_batch.sensor_index[ms]],
+                                            params.det_range)
+        cases.append((ms, corners, alpha, cutoff_idx))
+
+    def run_strokes(timed):
+        for ms, corners, alpha, cutoff_idx in cases:
+            for i in np.flatnonzero(cutoff_idx < N_PTS):
+                t = time.perf_counter()
+                predict_stroke(predictor, ms, test_batch, i, alpha[i],
+                               int(cutoff_idx[i]), corners)
+                timed.append(time.perf_counter() - t)
+
+    latencies = []
+    for _ in range(passes):
+        run_strokes(latencies)
+    lat_ms = np.array(latencies) * 1000.0
+
+    result = {
+        'params': asdict(params),
+        'train_time_s': train_time,
+        'n_predictions': len(latencies),
+        'latency_ms': {
+            'mean': float(np.mean(lat_ms)) if len(lat_ms) else 0.0,
+            'p50': float(np.percentile(lat_ms, 50)) if len(lat_ms) else 0.0,
+            'p95': float(np.percentile(lat_ms, 95)) if len(lat_ms) else 0.0,
+            'p99': float(np.percentile(lat_ms, 99)) if len(lat_ms) else 0.0,
+            'max': float(np.max(lat_ms)) if len(lat_ms) else 0.0,
+        },
+        'predictions_per_s': len(latencies) / max(float(np.sum(latencies)), 1e-12),
+        'batch_predictions_per_s': None,
+    }
+
+    if hasattr(predictor, 'predict_batch'):
+        n = 0
+        t0 = time.perf_counter()
+        for _ in range(passes):
+            for ms, corners, alpha, cutoff_idx in cases:
+                predict_batch(predictor, ms, test_batch, alpha, cutoff_idx, corners)
+                n += int(np.sum(cutoff_idx < N_PTS))
+        result['batch_predictions_per_s'] = n / max(time.perf_counter() - t0, 1e-12)
+
+    tracemalloc.start()
+    try:
+        predictor = algo_factory(train_data, params)
+        run_strokes([])
+        result['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+    return result
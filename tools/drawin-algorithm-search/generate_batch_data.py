@@ -9,15 +9,29 @@ Creates:
 - Missing sensor data (~3% random failures)
 - Middle sensors with incomplete curves + predicted completion
 - Realistic GAP sensor mock data
+
+Output is a psql script, streamed to disk as rows are generated (memory stays
+flat in the panel count). Two formats:
+- insert: INSERT ... VALUES statements (default)
+- copy:   COPY ... FROM STDIN blocks in PostgreSQL text format, one block per
+          table per batch; much faster to bulk-load
+
+Usage:
+    python generate_batch_data.py [--format insert|copy] [--gzip] [--output FILE]
+    psql -h HOST -p PORT -U USER -d DB -f batch_data.sql     # or: zcat ... | psql
 """
 
-import csv
+import argparse
+import gzip
 import random
 import json
 import os
 import sys
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 
+from consolidado import read_consolidado
+
 # ── Config ──────────────────────────────────────────────────────────────────
 DB_HOST = "192.168.15.2"
 DB_PORT = 2345
@@ -75,25 +89,43 @@ FIELD_IDS = {
 }
 
 
+@dataclass
+class BatchConfig:
+    """Knobs of the batch/panel/acquisition generator for one die.
+
+    Defaults reproduce the die 1 scenario configured above; the fleet
+    generator (generate_fleet_data.py) builds one per die.
+    """
+    die_id: int = DIE_ID
+    press_id: int = PRESS_ID
+    panels_per_batch: int = PANELS_PER_BATCH
+    spm: float = SPM
+    pauses_per_batch: tuple = PAUSES_PER_BATCH
+    pause_duration_min: tuple = PAUSE_DURATION_MIN
+    sensor_failure_rate: float = SENSOR_FAILURE_RATE
+    middle_incomplete_rate: float = MIDDLE_INCOMPLETE_RATE
+    drawin_sensor_ids: dict = field(default_factory=lambda: dict(DRAWIN_SENSOR_IDS))
+    gap_sensor_ids: dict = field(default_factory=lambda: dict(GAP_SENSOR_IDS))
+
+    @property
+    def interval_s(self):
+        return 60.0 / self.spm
+
+
 def parse_csv(filepath):
     """Parse the consolidado CSV and extract all curve data."""
+    data = read_consolidado(filepath)
+    time_arr = data.time.tolist()
+    step_arr = data.step.tolist()
+    curves = data.curves.tolist()
     stamps = []
-    with open(filepath, "r") as f:
-        reader = csv.reader(f)
-        header = next(reader)  # Simulacao, Tempo_s, STEP, DP01..DP12
-
-        for row in reader:
-            if not row or not row[0].startswith("Stamp_"):
-                continue
-            stamp = {"name": row[0]}
-            # Parse time array (same for all)
-            stamp["time"] = [float(x) for x in row[1].split(",")]
-            stamp["step"] = [float(x) for x in row[2].split(",")]
-            # Parse each sensor curve
-            for i, sensor_name in enumerate(header[3:], start=3):
-                stamp[sensor_name] = [float(x) for x in row[i].split(",")]
-            stamps.append(stamp)
-    return stamps, header[3:]  # stamps list, sensor names
+    for i, name in enumerate(data.names):
+        stamp = {"name": str(name), "time": time_arr[i], "step": step_arr[i]}
+        # Each sensor curve
+        for j, sensor_name in enumerate(data.sensor_names):
+            stamp[sensor_name] = curves[i][j]
+        stamps.append(stamp)
+    return stamps, data.sensor_names  # stamps list, sensor names
 
 
 def compute_sensor_stats(stamps, sensor_names):
@@ -118,41 +150,48 @@ def compute_sensor_stats(stamps, sensor_names):
     return stats
 
 
-def generate_panel_timestamps(start_time, num_panels, pauses_range, pause_duration_range):
-    """Generate timestamps with random pauses inserted."""
+def generate_panel_timestamps(start_time, num_panels, pauses_range, pause_duration_range,
+                              interval_s=INTERVAL_S, rng=random):
+    """Generate timestamps with random pauses inserted.
+
+    rng is anything with the random module's API (the module itself, or a
+    seeded random.Random for reproducible shards); the same holds for the
+    other generators below.
+    """
     timestamps = []
-    num_pauses = random.randint(*pauses_range)
+    num_pauses = rng.randint(*pauses_range)
     # Choose random panel indices where pauses occur (not at start/end)
-    pause_at = sorted(random.sample(range(20, num_panels - 20), num_pauses))
+    candidates = range(20, num_panels - 20)
+    pause_at = set(rng.sample(candidates, min(num_pauses, len(candidates))))
 
     current_time = start_time
     for i in range(num_panels):
         timestamps.append(current_time)
         # Normal interval + small jitter (±0.5s)
-        interval = INTERVAL_S + random.uniform(-0.5, 0.5)
+        interval = interval_s + rng.uniform(-0.5, 0.5)
         current_time += timedelta(seconds=interval)
 
         # Check for pause
         if i in pause_at:
-            pause_min = random.uniform(*pause_duration_range)
+            pause_min = rng.uniform(*pause_duration_range)
             current_time += timedelta(minutes=pause_min)
 
     return timestamps
 
 
-def sample_curve(stamps, sensor_name):
+def sample_curve(stamps, sensor_name, rng=random):
     """Sample a random curve from simulation data with small perturbation."""
-    base = random.choice(stamps)
+    base = rng.choice(stamps)
     curve = list(base[sensor_name])
     # Add small noise (proportional to value)
     perturbed = []
     for v in curve:
-        noise = random.gauss(0, max(abs(v) * 0.005, 0.01))
+        noise = rng.gauss(0, max(abs(v) * 0.005, 0.01))
         perturbed.append(round(v + noise, 4))
     return perturbed
 
 
-def make_incomplete_curve(curve, predicted_from_idx=None):
+def make_incomplete_curve(curve, predicted_from_idx=None, rng=random):
     """
     Make a curve incomplete — truncate actual data, add predicted completion.
     Returns (actual_curve, predicted_curve) where predicted_curve completes it.
@@ -160,20 +199,20 @@ def make_incomplete_curve(curve, predicted_from_idx=None):
     n = len(curve)
     if predicted_from_idx is None:
         # Truncate somewhere between 40-70% of the curve
-        predicted_from_idx = random.randint(int(n * 0.4), int(n * 0.7))
+        predicted_from_idx = rng.randint(int(n * 0.4), int(n * 0.7))
 
     actual = curve[:predicted_from_idx]
     # Predicted: extrapolate from last 2 actual points with some drift
     predicted = list(curve)  # full curve as "prediction"
     # Add slight bias to predicted portion to make it visibly different
     for i in range(predicted_from_idx, n):
-        bias = random.gauss(0, abs(curve[i]) * 0.02)
+        bias = rng.gauss(0, abs(curve[i]) * 0.02)
         predicted[i] = round(curve[i] + bias, 4)
 
     return actual, predicted
 
 
-def generate_gap_data(sensor_name, panel_idx):
+def generate_gap_data(sensor_name, panel_idx, rng=random):
     """Generate mock GAP sensor data (vibration magnitude)."""
     # Base vibration levels per GAP sensor (realistic range: 0.3-1.2g)
     base_levels = {
@@ -190,17 +229,17 @@ def generate_gap_data(sensor_name, panel_idx):
     for j in range(n_points):
         # Peak in the middle of the stroke
         peak_factor = 1.0 + 2.0 * (1.0 - abs(j - n_points / 2) / (n_points / 2))
-        x_arr.append(round(random.gauss(0, base * 0.3) * peak_factor, 4))
-        y_arr.append(round(random.gauss(0, base * 0.25) * peak_factor, 4))
-        z_arr.append(round(random.gauss(0, base * 0.15) * peak_factor, 4))
+        x_arr.append(round(rng.gauss(0, base * 0.3) * peak_factor, 4))
+        y_arr.append(round(rng.gauss(0, base * 0.25) * peak_factor, 4))
+        z_arr.append(round(rng.gauss(0, base * 0.15) * peak_factor, 4))
 
     abs_arr = [round((x**2 + y**2 + z**2) ** 0.5, 4)
                for x, y, z in zip(x_arr, y_arr, z_arr)]
     abs_max = round(max(abs_arr), 4)
 
     # Temperature (slowly varying, ~25-35°C)
-    temp_base = random.gauss(30, 2)
-    temp_arr = [round(temp_base + j * 0.05 + random.gauss(0, 0.1), 1)
+    temp_base = rng.gauss(30, 2)
+    temp_arr = [round(temp_base + j * 0.05 + rng.gauss(0, 0.1), 1)
                 for j in range(n_points)]
 
     return {
@@ -217,209 +256,318 @@ def generate_gap_data(sensor_name, panel_idx):
     }
 
 
-def main():
-    csv_path = "/home/teruel/JARVIS/tools/drawin-algorithm-search/sample-data/RelatorioDrawIn_Consolidado.csv"
+ACQUISITION_COLUMNS = "panel_id, sensor_id, field_id, die_id, value"
+BATCH_COLUMNS = ("id, press_id, die_id, start_timestamp, end_timestamp, "
+                 "created_at, updated_at")
+PANEL_COLUMNS = "id, stroke_timestamp, die_id, batch_id, created_at, updated_at"
+
+INSERT_CHUNK_ROWS = 500  # acquisition rows per INSERT statement
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(SCRIPT_DIR, "sample-data", "RelatorioDrawIn_Consolidado.csv")
+
+
+def preamble_lines(stats, configs=None, header=None):
+    """Control-limit updates, clean slate and trigger disable (before any data)."""
+    configs = configs or [BatchConfig()]
+    lines = list(header or [
+        "-- Generated batch data for die 1 (52182584)",
+        "-- 3 batches x 400 panels, with pauses, failures, incomplete curves",
+    ])
+    lines += ["BEGIN;",
+              "",
+              "-- Update control limits based on simulation statistics"]
+    for cfg in configs:
+        for sname, sid in cfg.drawin_sensor_ids.items():
+            s = stats[sname]
+            lines.append(
+                f"UPDATE sensor SET cl={s['cl']}, uwl={s['uwl']}, lwl={s['lwl']}, "
+                f"ucl={s['ucl']}, lcl={s['lcl']} WHERE id={sid};"
+            )
+        # GAP sensors: set plausible limits
+        for gname, gid in cfg.gap_sensor_ids.items():
+            base = {"GP01": 0.65, "GP02": 0.58, "GP03": 0.72, "GP04": 0.85}[gname]
+            lines.append(
+                f"UPDATE sensor SET cl={base:.2f}, uwl={base + 0.15:.2f}, lwl={base - 0.15:.2f}, "
+                f"ucl={base + 0.25:.2f}, lcl={base - 0.25:.2f} WHERE id={gid};"
+            )
+    lines.append("")
+
+    # Delete existing panels/acquisitions/batches (clean slate)
+    for cfg in configs:
+        lines += [
+            f"-- Clean existing die {cfg.die_id} data",
+            f"DELETE FROM acquisition WHERE die_id = {cfg.die_id};",
+            f"DELETE FROM panel WHERE die_id = {cfg.die_id};",
+            f"DELETE FROM batch WHERE die_id = {cfg.die_id};",
+            "",
+        ]
+    lines += [
+        # Disable trigger for bulk insert
+        "ALTER TABLE panel DISABLE TRIGGER panel_after_insert_determine_batch_trigger;",
+        "",
+    ]
+    return lines
+
+
+def postamble_lines():
+    """Trigger re-enable, sequence reset and commit (after all data)."""
+    return [
+        "ALTER TABLE panel ENABLE TRIGGER panel_after_insert_determine_batch_trigger;",
+        "",
+        "SELECT setval('panel_id_seq', (SELECT MAX(id) FROM panel));",
+        "SELECT setval('batch_id_seq', (SELECT MAX(id) FROM batch));",
+        "",
+        "COMMIT;",
+    ]
+
+
+def generate_acquisitions(stamps, sensor_names, panel_ids, totals,
+                          cfg=None, rng=random):
+    """Yield (panel_id, sensor_id, field_id, die_id, value) rows for one batch."""
+    cfg = cfg or BatchConfig()
+    die_id = cfg.die_id
+    time_arr = stamps[0]["time"]
+    time_json = json.dumps(time_arr)
+
+    for p_idx, pid in enumerate(panel_ids):
+        # ── DRAWIN sensors ──
+        for sname in sensor_names:
+            sid = cfg.drawin_sensor_ids[sname]
+
+            # Random sensor failure
+            if rng.random() < cfg.sensor_failure_rate:
+                totals["skipped"] += 1
+                continue
 
-    print("Parsing simulation data...")
-    stamps, sensor_names = parse_csv(csv_path)
-    print(f"  Loaded {len(stamps)} stamps with {len(sensor_names)} sensors")
+            curve = sample_curve(stamps, sname, rng)
+            di = curve[-1]
+
+            # Check if middle sensor should be incomplete
+            is_incomplete = False
+            predicted_curve = None
+            if sname in MIDDLE_SENSORS and rng.random() < cfg.middle_incomplete_rate:
+                actual_curve, predicted_curve = make_incomplete_curve(curve, rng=rng)
+                is_incomplete = True
+                totals["incomplete"] += 1
+
+            # X_cal (calibrated displacement = the curve itself)
+            x_cal = json.dumps(curve if not is_incomplete else actual_curve)
+            yield (pid, sid, FIELD_IDS['X_cal'], die_id, x_cal)
+
+            # di (final displacement)
+            yield (pid, sid, FIELD_IDS['di'], die_id, f"{di:.4f}")
+
+            # di_x and di_y components
+            angle = rng.uniform(0.1, 1.4)  # flow angle
+            di_x = round(di * abs(rng.gauss(0.85, 0.1)), 4)
+            di_y = round(di * abs(rng.gauss(0.3, 0.08)), 4)
+            yield (pid, sid, FIELD_IDS['di_x'], die_id, str(di_x))
+            yield (pid, sid, FIELD_IDS['di_y'], die_id, str(di_y))
+
+            # time array
+            yield (pid, sid, FIELD_IDS['time'], die_id, time_json)
+
+            totals["acquisitions"] += 5
+
+            # If incomplete, also store the predicted curve
+            if is_incomplete and predicted_curve:
+                # Store predicted as Y_cal (field 4) — represents the predicted completion
+                yield (pid, sid, FIELD_IDS['Y_cal'], die_id, json.dumps(predicted_curve))
+                totals["acquisitions"] += 1
+
+        # ── GAP sensors ──
+        for gname, gid in cfg.gap_sensor_ids.items():
+            # Random sensor failure
+            if rng.random() < cfg.sensor_failure_rate:
+                totals["skipped"] += 1
+                continue
 
-    print("\nComputing sensor statistics...")
-    stats = compute_sensor_stats(stamps, sensor_names)
-    for sn in sorted(stats.keys()):
-        s = stats[sn]
-        print(f"  {sn}: mean={s['mean']:.2f} std={s['std']:.2f} "
-              f"CL={s['cl']} UWL={s['uwl']} LWL={s['lwl']} UCL={s['ucl']} LCL={s['lcl']}")
+            gap = generate_gap_data(gname, p_idx, rng)
 
-    # ── Generate SQL ────────────────────────────────────────────────────
-    sql_lines = []
-    sql_lines.append("-- Generated batch data for die 1 (52182584)")
-    sql_lines.append("-- 3 batches x 400 panels, with pauses, failures, incomplete curves")
-    sql_lines.append("BEGIN;")
-    sql_lines.append("")
-
-    # 1. Update sensor control limits
-    sql_lines.append("-- Update control limits based on simulation statistics")
-    for sname, sid in DRAWIN_SENSOR_IDS.items():
-        s = stats[sname]
-        sql_lines.append(
-            f"UPDATE sensor SET cl={s['cl']}, uwl={s['uwl']}, lwl={s['lwl']}, "
-            f"ucl={s['ucl']}, lcl={s['lcl']} WHERE id={sid};"
-        )
-    # GAP sensors: set plausible limits
-    for gname, gid in GAP_SENSOR_IDS.items():
-        base = {"GP01": 0.65, "GP02": 0.58, "GP03": 0.72, "GP04": 0.85}[gname]
-        sql_lines.append(
-            f"UPDATE sensor SET cl={base:.2f}, uwl={base + 0.15:.2f}, lwl={base - 0.15:.2f}, "
-            f"ucl={base + 0.25:.2f}, lcl={base - 0.25:.2f} WHERE id={gid};"
-        )
-    sql_lines.append("")
+            for field_name, value in gap.items():
+                yield (pid, gid, FIELD_IDS[field_name], die_id, value)
+                totals["acquisitions"] += 1
 
-    # 2. Delete existing panels/acquisitions/batches for die 1 (clean slate)
-    sql_lines.append("-- Clean existing die 1 data")
-    sql_lines.append("DELETE FROM acquisition WHERE die_id = 1;")
-    sql_lines.append("DELETE FROM panel WHERE die_id = 1;")
-    sql_lines.append("DELETE FROM batch WHERE die_id = 1;")
-    sql_lines.append("")
 
-    # Disable trigger for bulk insert
-    sql_lines.append("ALTER TABLE panel DISABLE TRIGGER panel_after_insert_determine_batch_trigger;")
-    sql_lines.append("")
+def generate_batch(stamps, sensor_names, batch_id, first_panel_id, start_time,
+                   totals, cfg=None, rng=random):
+    """One batch -> (batch_row, panel_rows, acquisition_rows).
 
+    batch_row is (id, press_id, die_id, start, end), panel_rows a list of
+    (id, stroke_timestamp, die_id, batch_id) and acquisition_rows a lazy
+    generator, so only one batch of panels is ever held in memory.
+    """
+    cfg = cfg or BatchConfig()
+    timestamps = generate_panel_timestamps(
+        start_time, cfg.panels_per_batch, cfg.pauses_per_batch, cfg.pause_duration_min,
+        cfg.interval_s, rng
+    )
+    end_time = timestamps[-1]
+
+    panel_ids = list(range(first_panel_id, first_panel_id + cfg.panels_per_batch))
+    panel_rows = [(pid, ts.isoformat(), cfg.die_id, batch_id)
+                  for pid, ts in zip(panel_ids, timestamps)]
+    totals["panels"] += len(panel_rows)
+
+    return ((batch_id, cfg.press_id, cfg.die_id, start_time.isoformat(), end_time.isoformat()),
+            panel_rows,
+            generate_acquisitions(stamps, sensor_names, panel_ids, totals, cfg, rng))
+
+
+def generate_batches(stamps, sensor_names, totals):
+    """Yield generate_batch() results for the configured die 1 batches."""
     panel_id_counter = 100  # start from 100 to avoid conflicts
     batch_id_counter = 10
 
-    total_acquisitions = 0
-    total_skipped = 0
-    total_incomplete = 0
-
     for batch_idx in range(NUM_BATCHES):
         batch_id = batch_id_counter + batch_idx
         start_time = BATCH_STARTS[batch_idx]
 
         print(f"\nGenerating batch {batch_idx + 1} (id={batch_id}, start={start_time.isoformat()})...")
 
-        timestamps = generate_panel_timestamps(
-            start_time, PANELS_PER_BATCH, PAUSES_PER_BATCH, PAUSE_DURATION_MIN
-        )
-        end_time = timestamps[-1]
+        yield generate_batch(stamps, sensor_names, batch_id, panel_id_counter,
+                             start_time, totals)
+        panel_id_counter += PANELS_PER_BATCH
+
 
-        sql_lines.append(f"-- Batch {batch_idx + 1}: {PANELS_PER_BATCH} panels")
-        sql_lines.append(
-            f"INSERT INTO batch (id, press_id, die_id, start_timestamp, end_timestamp, "
-            f"created_at, updated_at) VALUES ({batch_id}, {PRESS_ID}, {DIE_ID}, "
-            f"'{start_time.isoformat()}', '{end_time.isoformat()}', NOW(), NOW());"
+def _sql_quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def write_batch_inserts(f, label, batch):
+    """One generate_batch() result as INSERT ... VALUES statements."""
+    (batch_id, press_id, die_id, start, end), panel_rows, acquisitions = batch
+    f.write(f"-- Batch {label}: {len(panel_rows)} panels\n")
+    f.write(
+        f"INSERT INTO batch ({BATCH_COLUMNS}) VALUES ({batch_id}, {press_id}, "
+        f"{die_id}, '{start}', '{end}', NOW(), NOW());\n\n"
+    )
+    for pid, ts, die_id, batch_id in panel_rows:
+        f.write(
+            f"INSERT INTO panel ({PANEL_COLUMNS}) VALUES "
+            f"({pid}, '{ts}', {die_id}, {batch_id}, NOW(), NOW());\n"
         )
-        sql_lines.append("")
-
-        # Generate panels
-        panel_ids = []
-        for p_idx in range(PANELS_PER_BATCH):
-            pid = panel_id_counter
-            panel_id_counter += 1
-            panel_ids.append(pid)
-            ts = timestamps[p_idx].isoformat()
-            sql_lines.append(
-                f"INSERT INTO panel (id, stroke_timestamp, die_id, batch_id, "
-                f"created_at, updated_at) VALUES ({pid}, '{ts}', {DIE_ID}, {batch_id}, NOW(), NOW());"
-            )
 
-        sql_lines.append("")
-        sql_lines.append(f"-- Acquisitions for batch {batch_idx + 1}")
-
-        # Generate acquisitions
-        acq_values = []
-
-        for p_idx, pid in enumerate(panel_ids):
-            # ── DRAWIN sensors ──
-            for sname in sensor_names:
-                sid = DRAWIN_SENSOR_IDS[sname]
-
-                # Random sensor failure
-                if random.random() < SENSOR_FAILURE_RATE:
-                    total_skipped += 1
-                    continue
-
-                curve = sample_curve(stamps, sname)
-                di = curve[-1]
-
-                # Check if middle sensor should be incomplete
-                is_incomplete = False
-                predicted_curve = None
-                if sname in MIDDLE_SENSORS and random.random() < MIDDLE_INCOMPLETE_RATE:
-                    actual_curve, predicted_curve = make_incomplete_curve(curve)
-                    is_incomplete = True
-                    total_incomplete += 1
-
-                # Store curve fields
-                time_arr = stamps[0]["time"]
-                step_arr = stamps[0]["step"]
-
-                # X_cal (calibrated displacement = the curve itself)
-                x_cal = json.dumps(curve if not is_incomplete else actual_curve)
-                acq_values.append(f"({pid},{sid},{FIELD_IDS['X_cal']},{DIE_ID},'{x_cal}')")
-
-                # di (final displacement)
-                acq_values.append(f"({pid},{sid},{FIELD_IDS['di']},{DIE_ID},'{di:.4f}')")
-
-                # di_x and di_y components
-                angle = random.uniform(0.1, 1.4)  # flow angle
-                di_x = round(di * abs(random.gauss(0.85, 0.1)), 4)
-                di_y = round(di * abs(random.gauss(0.3, 0.08)), 4)
-                acq_values.append(f"({pid},{sid},{FIELD_IDS['di_x']},{DIE_ID},'{di_x}')")
-                acq_values.append(f"({pid},{sid},{FIELD_IDS['di_y']},{DIE_ID},'{di_y}')")
-
-                # time array
-                time_json = json.dumps(time_arr)
-                acq_values.append(f"({pid},{sid},{FIELD_IDS['time']},{DIE_ID},'{time_json}')")
-
-                total_acquisitions += 5
-
-                # If incomplete, also store the predicted curve
-                if is_incomplete and predicted_curve:
-                    pred_json = json.dumps(predicted_curve)
-                    # Store predicted as Y_cal (field 4) — represents the predicted completion
-                    acq_values.append(f"({pid},{sid},{FIELD_IDS['Y_cal']},{DIE_ID},'{pred_json}')")
-                    total_acquisitions += 1
-
-            # ── GAP sensors ──
-            for gname, gid in GAP_SENSOR_IDS.items():
-                # Random sensor failure
-                if random.random() < SENSOR_FAILURE_RATE:
-                    total_skipped += 1
-                    continue
-
-                gap = generate_gap_data(gname, p_idx)
-
-                for field_name, value in gap.items():
-                    fid = FIELD_IDS[field_name]
-                    # Escape single quotes in JSON
-                    v = value.replace("'", "''")
-                    acq_values.append(f"({pid},{gid},{fid},{DIE_ID},'{v}')")
-                    total_acquisitions += 1
-
-            # Flush in batches of 500 to avoid huge statements
-            if len(acq_values) >= 500:
-                sql_lines.append(
-                    "INSERT INTO acquisition (panel_id, sensor_id, field_id, die_id, value) VALUES"
-                )
-                sql_lines.append(",\n".join(acq_values) + ";")
-                sql_lines.append("")
-                acq_values = []
-
-        # Flush remaining
-        if acq_values:
-            sql_lines.append(
-                "INSERT INTO acquisition (panel_id, sensor_id, field_id, die_id, value) VALUES"
-            )
-            sql_lines.append(",\n".join(acq_values) + ";")
-            sql_lines.append("")
+    f.write(f"\n-- Acquisitions for batch {label}\n")
+    # Flush in chunks to avoid huge statements
+    chunk = []
+    for pid, sid, fid, die_id, value in acquisitions:
+        chunk.append(f"({pid},{sid},{fid},{die_id},{_sql_quote(value)})")
+        if len(chunk) >= INSERT_CHUNK_ROWS:
+            f.write(f"INSERT INTO acquisition ({ACQUISITION_COLUMNS}) VALUES\n"
+                    + ",\n".join(chunk) + ";\n\n")
+            chunk = []
+    if chunk:
+        f.write(f"INSERT INTO acquisition ({ACQUISITION_COLUMNS}) VALUES\n"
+                + ",\n".join(chunk) + ";\n\n")
+
+
+# COPY text format: backslash escapes for the characters that delimit fields/rows
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(v):
+    if v is None:
+        return r"\N"
+    s = str(v)
+    if "\\" in s or "\t" in s or "\n" in s or "\r" in s:
+        s = s.translate(_COPY_ESCAPES)
+    return s
+
+
+def copy_row(values):
+    """One COPY text-format line (tab-separated, None as \\N)."""
+    return "\t".join(map(_copy_value, values)) + "\n"
+
+
+def write_batch_copy(f, label, batch, now):
+    """One generate_batch() result as COPY ... FROM STDIN blocks.
+
+    NOW() is not available inside COPY data, so created_at/updated_at get
+    the given timestamp (the generation time).
+    """
+    batch_row, panel_rows, acquisitions = batch
+    f.write(f"-- Batch {label}: {len(panel_rows)} panels\n")
+    f.write(f"COPY batch ({BATCH_COLUMNS}) FROM STDIN;\n")
+    f.write(copy_row(batch_row + (now, now)))
+    f.write("\\.\n")
+
+    f.write(f"COPY panel ({PANEL_COLUMNS}) FROM STDIN;\n")
+    for row in panel_rows:
+        f.write(copy_row(row + (now, now)))
+    f.write("\\.\n")
+
+    f.write(f"COPY acquisition ({ACQUISITION_COLUMNS}) FROM STDIN;\n")
+    f.writelines(copy_row(row) for row in acquisitions)
+    f.write("\\.\n\n")
+
 
-        print(f"  Generated {len(panel_ids)} panels")
+def write_insert_script(f, stats, batches):
+    """Stream the load script as INSERT ... VALUES statements."""
+    f.write("\n".join(preamble_lines(stats)) + "\n")
+    for batch_idx, batch in enumerate(batches):
+        write_batch_inserts(f, batch_idx + 1, batch)
+        print(f"  Generated {len(batch[1])} panels")
+    f.write("\n".join(postamble_lines()) + "\n")
 
-    # Re-enable trigger
-    sql_lines.append("ALTER TABLE panel ENABLE TRIGGER panel_after_insert_determine_batch_trigger;")
-    sql_lines.append("")
 
-    # Reset sequences
-    sql_lines.append("SELECT setval('panel_id_seq', (SELECT MAX(id) FROM panel));")
-    sql_lines.append("SELECT setval('batch_id_seq', (SELECT MAX(id) FROM batch));")
-    sql_lines.append("")
-    sql_lines.append("COMMIT;")
+def write_copy_script(f, stats, batches):
+    """Stream the load script as COPY ... FROM STDIN blocks, one set per batch."""
+    now = datetime.now(timezone.utc).isoformat()
+    f.write("\n".join(preamble_lines(stats)) + "\n")
+    for batch_idx, batch in enumerate(batches):
+        write_batch_copy(f, batch_idx + 1, batch, now)
+        print(f"  Generated {len(batch[1])} panels")
+    f.write("\n".join(postamble_lines()) + "\n")
+
+
+def open_output(path, compress):
+    """Text handle for the script, gzip-compressed when requested."""
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    return open(path, "w", encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate DieMaster batch data")
+    parser.add_argument("--csv", default=DEFAULT_CSV,
+                        help="Consolidado CSV with the simulated curves")
+    parser.add_argument("--format", choices=("insert", "copy"), default="insert",
+                        help="INSERT statements or COPY FROM STDIN blocks (default: insert)")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    parser.add_argument("--output", help="Output path (default: batch_data.sql[.gz])")
+    args = parser.parse_args()
+
+    out_path = args.output or os.path.join(
+        SCRIPT_DIR, "batch_data.sql" + (".gz" if args.gzip else ""))
+
+    print("Parsing simulation data...")
+    stamps, sensor_names = parse_csv(args.csv)
+    print(f"  Loaded {len(stamps)} stamps with {len(sensor_names)} sensors")
+
+    print("\nComputing sensor statistics...")
+    stats = compute_sensor_stats(stamps, sensor_names)
+    for sn in sorted(stats.keys()):
+        s = stats[sn]
+        print(f"  {sn}: mean={s['mean']:.2f} std={s['std']:.2f} "
+              f"CL={s['cl']} UWL={s['uwl']} LWL={s['lwl']} UCL={s['ucl']} LCL={s['lcl']}")
+
+    totals = {"panels": 0, "acquisitions": 0, "skipped": 0, "incomplete": 0}
+    batches = generate_batches(stamps, sensor_names, totals)
+    writer = write_copy_script if args.format == "copy" else write_insert_script
+    with open_output(out_path, args.gzip) as f:
+        writer(f, stats, batches)
 
     print(f"\n── Summary ─────────────────────────")
     print(f"  Batches: {NUM_BATCHES}")
-    print(f"  Total panels: {NUM_BATCHES * PANELS_PER_BATCH}")
-    print(f"  Total acquisitions: {total_acquisitions}")
-    print(f"  Sensor failures (skipped): {total_skipped}")
-    print(f"  Incomplete middle curves: {total_incomplete}")
-
-    # Write SQL file
-    out_path = "/home/teruel/JARVIS/tools/drawin-algorithm-search/batch_data.sql"
-    with open(out_path, "w") as f:
-        f.write("\n".join(sql_lines))
+    print(f"  Total panels: {totals['panels']}")
+    print(f"  Total acquisitions: {totals['acquisitions']}")
+    print(f"  Sensor failures (skipped): {totals['skipped']}")
+    print(f"  Incomplete middle curves: {totals['incomplete']}")
+
     print(f"\n  SQL written to: {out_path}")
-    print(f"  File size: {len('\n'.join(sql_lines)) / 1024 / 1024:.1f} MB")
+    print(f"  File size: {os.path.getsize(out_path) / 1024 / 1024:.1f} MB")
 
 
 if __name__ == "__main__":
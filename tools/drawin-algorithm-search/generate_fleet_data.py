@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Generate fleet-scale synthetic history for load-testing the DieMaster DB.
+
+Scales generate_batch_data.py (one die, three batches) to many dies and
+presses over a date range. Work is sharded by (die, batch): every shard has
+its own random.Random seeded from (seed, die_id, batch index), so output is
+reproducible regardless of worker count or scheduling, and writes one
+self-contained script (its own transaction) to shards/. Panel and batch ids
+are assigned per shard from fixed ranges, so shards never collide and can be
+loaded concurrently.
+
+Output directory:
+    pre.sql            control limits, clean slate for the dies, trigger off
+    shards/d0001_b00000.sql[.gz] ...
+    post.sql           trigger on, sequence reset
+    manifest.json      config, per-shard row counts
+
+Load (shards in parallel):
+    psql -f out/pre.sql
+    ls out/shards/*.sql | xargs -P 8 -n 1 psql -f
+    psql -f out/post.sql
+
+Die 1 keeps its real sensor ids; other dies get synthetic ids from
+FLEET_SENSOR_ID_BASE (dies/sensors rows must already exist for them).
+
+Usage:
+    python generate_fleet_data.py --dies 24 --presses 6 \\
+        --start 2026-01-01 --end 2026-04-01 --batches-per-day 2 \\
+        --workers 8 --format copy --gzip --output-dir fleet_data
+"""
+
+import argparse
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timedelta, timezone
+
+from generate_batch_data import (
+    BatchConfig, DEFAULT_CSV, DRAWIN_SENSOR_IDS, GAP_SENSOR_IDS,
+    compute_sensor_stats, generate_batch, open_output, parse_csv,
+    postamble_lines, preamble_lines, write_batch_copy, write_batch_inserts,
+)
+
+FLEET_SENSOR_ID_BASE = 10000
+SENSORS_PER_DIE = len(DRAWIN_SENSOR_IDS) + len(GAP_SENSOR_IDS)
+BATCH_ID_BASE = 10
+PANEL_ID_BASE = 100
+# Batch start jitter after the nominal shift slot
+BATCH_START_JITTER_MIN = 30
+
+
+@dataclass
+class FleetConfig:
+    """Fleet-wide generation parameters."""
+    dies: int = 12
+    first_die_id: int = 1
+    presses: int = 4
+    start: str = "2026-03-01"           # inclusive, UTC date
+    end: str = "2026-04-01"             # exclusive
+    batches_per_day: int = 2
+    shift_start_hour: float = 6.0
+    panels_per_batch: int = 400
+    spm: float = 12.0
+    pauses_per_batch: tuple = (3, 5)
+    pause_minutes: tuple = (5.0, 20.0)
+    failure_rate: float = 0.03
+    incomplete_rate: float = 0.15
+    seed: int = 0
+
+
+def fleet_sensor_ids(die_id):
+    """(drawin_sensor_ids, gap_sensor_ids) for a die."""
+    if die_id == 1:
+        return dict(DRAWIN_SENSOR_IDS), dict(GAP_SENSOR_IDS)
+    base = FLEET_SENSOR_ID_BASE + (die_id - 2) * SENSORS_PER_DIE
+    names = list(DRAWIN_SENSOR_IDS) + list(GAP_SENSOR_IDS)
+    ids = {name: base + i for i, name in enumerate(names)}
+    return ({n: ids[n] for n in DRAWIN_SENSOR_IDS},
+            {n: ids[n] for n in GAP_SENSOR_IDS})
+
+
+def die_configs(fleet):
+    """One BatchConfig per die."""
+    configs = []
+    for i in range(fleet.dies):
+        die_id = fleet.first_die_id + i
+        drawin_ids, gap_ids = fleet_sensor_ids(die_id)
+        configs.append(BatchConfig(
+            die_id=die_id,
+            press_id=i % fleet.presses + 1,
+            panels_per_batch=fleet.panels_per_batch,
+            spm=fleet.spm,
+            pauses_per_batch=tuple(fleet.pauses_per_batch),
+            pause_duration_min=tuple(fleet.pause_minutes),
+            sensor_failure_rate=fleet.failure_rate,
+            middle_incomplete_rate=fleet.incomplete_rate,
+            drawin_sensor_ids=drawin_ids,
+            gap_sensor_ids=gap_ids,
+        ))
+    return configs
+
+
+def plan_shards(fleet):
+    """Shard specs (die config, batch index, ids, nominal start) in load order."""
+    start = datetime.fromisoformat(fleet.start).replace(tzinfo=timezone.utc)
+    end = datetime.fromisoformat(fleet.end).replace(tzinfo=timezone.utc)
+    slot = timedelta(hours=24.0 / fleet.batches_per_day)
+    slots = []
+    day = start
+    while day < end:
+        for b in range(fleet.batches_per_day):
+            slots.append(day + timedelta(hours=fleet.shift_start_hour) + b * slot)
+        day += timedelta(days=1)
+
+    shards = []
+    for cfg in die_configs(fleet):
+        for batch_idx, nominal_start in enumerate(slots):
+            n = len(shards)
+            shards.append({
+                'cfg': cfg,
+                'batch_idx': batch_idx,
+                'batch_id': BATCH_ID_BASE + n,
+                'first_panel_id': PANEL_ID_BASE + n * fleet.panels_per_batch,
+                'nominal_start': nominal_start,
+            })
+    return shards
+
+
+# Per-worker simulation data, loaded once by _init_worker
+_STAMPS = None
+_SENSOR_NAMES = None
+
+
+def _init_worker(csv_path):
+    global _STAMPS, _SENSOR_NAMES
+    _STAMPS, _SENSOR_NAMES = parse_csv(csv_path)
+
+
+def generate_shard(shard, seed, out_dir, fmt, compress, now):
+    """Write one (die, batch) shard script; returns its manifest entry."""
+    cfg = shard['cfg']
+    # String seeds hash deterministically (unlike tuples), independent of PYTHONHASHSEED
+    rng = random.Random(f"{seed}:{cfg.die_id}:{shard['batch_idx']}")
+    jitter = timedelta(minutes=rng.uniform(0, BATCH_START_JITTER_MIN))
+    totals = {"panels": 0, "acquisitions": 0, "skipped": 0, "incomplete": 0}
+
+    name = f"d{cfg.die_id:04d}_b{shard['batch_idx']:05d}.sql" + (".gz" if compress else "")
+    path = os.path.join(out_dir, "shards", name)
+    batch = generate_batch(_STAMPS, _SENSOR_NAMES, shard['batch_id'],
+                           shard['first_panel_id'], shard['nominal_start'] + jitter,
+                           totals, cfg, rng)
+    label = f"{shard['batch_idx'] + 1} of die {cfg.die_id}"
+    with open_output(path, compress) as f:
+        f.write("BEGIN;\n")
+        if fmt == "copy":
+            write_batch_copy(f, label, batch, now)
+        else:
+            write_batch_inserts(f, label, batch)
+        f.write("COMMIT;\n")
+
+    return {
+        'file': os.path.relpath(path, out_dir),
+        'die_id': cfg.die_id,
+        'batch_id': shard['batch_id'],
+        'start': batch[0][3],
+        'end': batch[0][4],
+        **totals,
+        'bytes': os.path.getsize(path),
+    }
+
+
+def _run_shard(args):
+    return generate_shard(*args)
+
+
+def generate_fleet(fleet, out_dir, csv_path=DEFAULT_CSV, fmt="copy",
+                   compress=False, workers=1, verbose=True):
+    """Generate all shards plus pre/post scripts and manifest; returns the manifest."""
+    os.makedirs(os.path.join(out_dir, "shards"), exist_ok=True)
+    stamps, sensor_names = parse_csv(csv_path)
+    stats = compute_sensor_stats(stamps, sensor_names)
+    configs = die_configs(fleet)
+    shards = plan_shards(fleet)
+    now = datetime.now(timezone.utc).isoformat()
+
+    header = [f"-- Generated fleet data: {fleet.dies} dies, {len(shards)} batches, "
+              f"{fleet.start} .. {fleet.end}"]
+    with open(os.path.join(out_dir, "pre.sql"), "w") as f:
+        f.write("\n".join(preamble_lines(stats, configs, header)) + "\nCOMMIT;\n")
+    with open(os.path.join(out_dir, "post.sql"), "w") as f:
+        f.write("BEGIN;\n" + "\n".join(postamble_lines()) + "\n")
+
+    jobs = [(shard, fleet.seed, out_dir, fmt, compress, now) for shard in shards]
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(csv_path,))
+        results_iter = pool.map(_run_shard, jobs, chunksize=4)
+    else:
+        pool = None
+        _init_worker(csv_path)
+        results_iter = map(_run_shard, jobs)
+
+    entries = []
+    try:
+        for entry in results_iter:
+            entries.append(entry)
+            if verbose and (len(entries) % 50 == 0 or len(entries) == len(jobs)):
+                print(f"  {len(entries)}/{len(jobs)} shards")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    totals = {k: sum(e[k] for e in entries)
+              for k in ("panels", "acquisitions", "skipped", "incomplete", "bytes")}
+    manifest = {
+        'config': asdict(fleet),
+        'format': fmt,
+        'gzip': compress,
+        'totals': totals,
+        'shards': entries,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    d = FleetConfig()
+    parser = argparse.ArgumentParser(description="Generate fleet-scale DieMaster history")
+    parser.add_argument("--dies", type=int, default=d.dies)
+    parser.add_argument("--first-die-id", type=int, default=d.first_die_id)
+    parser.add_argument("--presses", type=int, default=d.presses)
+    parser.add_argument("--start", default=d.start, help="First day, YYYY-MM-DD (UTC)")
+    parser.add_argument("--end", default=d.end, help="Day after the last, YYYY-MM-DD")
+    parser.add_argument("--batches-per-day", type=int, default=d.batches_per_day)
+    parser.add_argument("--shift-start-hour", type=float, default=d.shift_start_hour)
+    parser.add_argument("--panels-per-batch", type=int, default=d.panels_per_batch)
+    parser.add_argument("--spm", type=float, default=d.spm, help="Strokes per minute")
+    parser.add_argument("--pauses", type=int, nargs=2, default=d.pauses_per_batch,
+                        metavar=("MIN", "MAX"), help="Pauses per batch")
+    parser.add_argument("--pause-minutes", type=float, nargs=2, default=d.pause_minutes,
+                        metavar=("MIN", "MAX"), help="Pause duration range")
+    parser.add_argument("--failure-rate", type=float, default=d.failure_rate,
+                        help="Per-sensor per-panel missing-data probability")
+    parser.add_argument("--incomplete-rate", type=float, default=d.incomplete_rate,
+                        help="Middle-sensor incomplete-curve probability")
+    parser.add_argument("--seed", type=int, default=d.seed)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--format", choices=("insert", "copy"), default="copy")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--output-dir", default="fleet_data")
+    args = parser.parse_args()
+
+    fleet = replace(
+        d, dies=args.dies, first_die_id=args.first_die_id, presses=args.presses,
+        start=args.start, end=args.end, batches_per_day=args.batches_per_day,
+        shift_start_hour=args.shift_start_hour, panels_per_batch=args.panels_per_batch,
+        spm=args.spm, pauses_per_batch=tuple(args.pauses),
+        pause_minutes=tuple(args.pause_minutes), failure_rate=args.failure_rate,
+        incomplete_rate=args.incomplete_rate, seed=args.seed,
+    )
+    print(f"Generating {fleet.dies} dies x {len(plan_shards(fleet)) // fleet.dies} batches "
+          f"with {args.workers} worker(s) -> {args.output_dir}")
+    manifest = generate_fleet(fleet, args.output_dir, args.csv, args.format,
+                              args.gzip, args.workers)
+
+    t = manifest['totals']
+    print("\n── Summary ─────────────────────────")
+    print(f"  Shards: {len(manifest['shards'])}")
+    print(f"  Total panels: {t['panels']}")
+    print(f"  Total acquisitions: {t['acquisitions']}")
+    print(f"  Sensor failures (skipped): {t['skipped']}")
+    print(f"  Incomplete middle curves: {t['incomplete']}")
+    print(f"  Output size: {t['bytes'] / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
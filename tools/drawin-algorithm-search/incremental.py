@@ -0,0 +1,188 @@
+"""
+Incremental updates of the best_algorithm shape-selection model.
+
+build_predictor / fit_sensor_models rebuild all_shapes, med_shape and the
+D-ratio statistics from the whole training set. On the press a new good
+stroke arrives every ~5 s and the model should follow die wear without full
+retrains, so IncrementalSensorModel keeps per middle sensor:
+
+- the shape bank in a bounded buffer (oldest shape evicted first when
+  full), together with its ShapeIndex segment slopes;
+- D-ratio mean and variance by Welford's algorithm, with the inverse update
+  on eviction so the statistics always describe the shapes in the buffer;
+- the median shape as a per-point streaming quantile sketch (sign-step
+  stochastic approximation seeded from the exact batch median), which
+  tracks drift without storing or sorting history.
+
+Each update is O(N_PTS); serving the model is O(N_PTS) (median cleanup) and
+the shape bank is used in place.
+
+Usage:
+    inc = IncrementalPredictor.from_predictor(build_predictor(train_data))
+    for stroke in good_strokes:              # training-dict format
+        inc.add_stroke('A2', stroke)
+    inc.predict(ms_name='A2', ...)           # same signature as predict
+"""
+
+import numpy as np
+from typing import Dict
+
+from best_algorithm import clean_median_shape, make_predictor, stroke_shape
+from shape_index import ShapeIndex
+
+DEFAULT_CAPACITY = 200
+# Median sketch step, as a fraction of the running mean absolute deviation
+DEFAULT_MEDIAN_RATE = 0.05
+
+
+class IncrementalSensorModel:
+    """Bounded, incrementally updated model for one middle sensor."""
+
+    def __init__(self, model: Dict, capacity: int = DEFAULT_CAPACITY,
+                 median_rate: float = DEFAULT_MEDIAN_RATE):
+        """
+        Args:
+            model: One entry of fit_sensor_models / predict.sensor_models
+            capacity: Maximum number of shapes kept
+            median_rate: Median sketch step relative to the running spread
+        """
+        shapes = np.asarray(model['all_shapes'], dtype=float)[-capacity:]
+        n_pts = shapes.shape[1]
+        self.alpha_grid = np.asarray(model['alpha_grid'])
+        self.corners = list(model['corners'])
+        self.capacity = capacity
+        self.median_rate = median_rate
+
+        # Live shapes occupy slots [0, count); age orders them for eviction
+        self.shapes = np.zeros((capacity, n_pts))
+        self.slopes = np.zeros((capacity, n_pts - 1))
+        self.ratios = np.zeros(capacity)
+        self.age = np.zeros(capacity, dtype=np.int64)
+        self.count = len(shapes)
+        self.age[:self.count] = np.arange(self.count)
+        self.tick = self.count
+        self.shapes[:self.count] = shapes
+        self.slopes[:self.count] = np.diff(shapes, axis=1)
+
+        if 'D_ratios' in model:
+            ratios = np.asarray(model['D_ratios'], dtype=float)[-capacity:]
+        else:
+            # Stats-only models (e.g. converted PAM-Stamp banks): assume every
+            # stored shape sat at the mean; the variance decays as they evict
+            ratios = np.full(self.count, model['D_ratio_mean'])
+        self.ratios[:self.count] = ratios
+        self.ratio_n = self.count
+        self.ratio_mean = float(np.mean(ratios))
+        self.ratio_m2 = float(np.sum((ratios - self.ratio_mean) ** 2))
+        if 'D_ratios' not in model:
+            self.ratio_m2 = model['D_ratio_std'] ** 2 * self.count
+
+        self.median = np.median(shapes, axis=0)
+        self.spread = np.maximum(np.mean(np.abs(shapes - self.median), axis=0), 1e-4)
+
+    # -- Welford -------------------------------------------------------------
+
+    def _ratio_add(self, x: float):
+        self.ratio_n += 1
+        delta = x - self.ratio_mean
+        self.ratio_mean += delta / self.ratio_n
+        self.ratio_m2 += delta * (x - self.ratio_mean)
+
+    def _ratio_remove(self, x: float):
+        if self.ratio_n <= 1:
+            self.ratio_n, self.ratio_mean, self.ratio_m2 = 0, 0.0, 0.0
+            return
+        delta = x - self.ratio_mean
+        self.ratio_n -= 1
+        self.ratio_mean -= delta / self.ratio_n
+        self.ratio_m2 = max(self.ratio_m2 - delta * (x - self.ratio_mean), 0.0)
+
+    # -- Updates ---------------------------------------------------------------
+
+    def add_shape(self, shape: np.ndarray, D_ratio: float):
+        """Append one normalized shape; evicts the oldest when full."""
+        if self.count == self.capacity:
+            slot = int(np.argmin(self.age))
+            self._ratio_remove(self.ratios[slot])
+        else:
+            slot = self.count
+            self.count += 1
+        self.shapes[slot] = shape
+        self.slopes[slot] = np.diff(shape)
+        self.ratios[slot] = D_ratio
+        self.age[slot] = self.tick
+        self.tick += 1
+        self._ratio_add(D_ratio)
+
+        # Median sketch: step toward the sample by a fraction of the spread
+        dev = shape - self.median
+        self.median += self.median_rate * self.spread * np.sign(dev)
+        self.spread += self.median_rate * (np.abs(dev) - self.spread)
+        np.maximum(self.spread, 1e-4, out=self.spread)
+
+    def add_stroke(self, stroke: Dict):
+        """Append one stroke in training-dict format (see build_predictor)."""
+        shape, ratio = stroke_shape(stroke, self.corners, self.alpha_grid)
+        self.add_shape(shape, ratio)
+
+    def evict_oldest(self, n: int = 1):
+        """Drop the n oldest shapes (e.g. after die maintenance); keeps at least one."""
+        for _ in range(min(n, self.count - 1)):
+            slot = int(np.argmin(self.age[:self.count]))
+            self._ratio_remove(self.ratios[slot])
+            # Move the last live slot into the hole to keep [0, count) dense
+            last = self.count - 1
+            for arr in (self.shapes, self.slopes, self.ratios, self.age):
+                arr[slot] = arr[last]
+            self.count -= 1
+
+    def model(self) -> Dict:
+        """Current model dict, in the format make_predictor expects."""
+        live = slice(0, self.count)
+        shapes = self.shapes[live]
+        std = np.sqrt(self.ratio_m2 / self.ratio_n) if self.ratio_n else 0.0
+        return {
+            'all_shapes': shapes,
+            'shape_index': ShapeIndex.from_tables(self.alpha_grid, shapes,
+                                                  self.slopes[live]),
+            'med_shape': clean_median_shape(self.median),
+            'alpha_grid': self.alpha_grid,
+            'corners': self.corners,
+            'D_ratios': self.ratios[live],
+            'D_ratio_mean': float(self.ratio_mean),
+            'D_ratio_std': float(max(std, 0.005)),
+            'n_training_strokes': self.count,
+        }
+
+
+class IncrementalPredictor:
+    """best_algorithm predictor whose sensor models update as strokes arrive."""
+
+    def __init__(self, sensor_models: Dict[str, Dict],
+                 capacity: int = DEFAULT_CAPACITY,
+                 median_rate: float = DEFAULT_MEDIAN_RATE):
+        self.sensors = {ms: IncrementalSensorModel(m, capacity, median_rate)
+                        for ms, m in sensor_models.items()}
+        # make_predictor looks models up per call, so refreshing entries of
+        # this dict is all it takes to serve the updated model
+        self.sensor_models = {ms: inc.model() for ms, inc in self.sensors.items()}
+        self.predict = make_predictor(self.sensor_models)
+
+    @classmethod
+    def from_predictor(cls, predictor, capacity: int = DEFAULT_CAPACITY,
+                       median_rate: float = DEFAULT_MEDIAN_RATE):
+        return cls(predictor.sensor_models, capacity, median_rate)
+
+    def add_stroke(self, ms_name: str, stroke: Dict):
+        """Fold one new good stroke (training-dict format) into ms_name's model."""
+        inc = self.sensors[ms_name]
+        inc.add_stroke(stroke)
+        self.sensor_models[ms_name] = inc.model()
+
+    def evict_oldest(self, ms_name: str, n: int = 1):
+        inc = self.sensors[ms_name]
+        inc.evict_oldest(n)
+        self.sensor_models[ms_name] = inc.model()
+
+    def __call__(self, **kwargs):
+        return self.predict(**kwargs)
@@ -0,0 +1,121 @@
+"""
+Binary, versioned on-disk format for draw-in predictor models.
+
+Layout (little-endian):
+    8 bytes   magic b'DRAWINM\\0'
+    4 bytes   uint32 format version
+    8 bytes   uint64 header length in bytes
+    header    UTF-8 JSON, padded with spaces to a 64-byte boundary
+    data      raw C-order arrays, each at a 64-byte aligned offset
+
+The JSON header holds model metadata and, per middle sensor, the scalar
+statistics plus a descriptor {offset, shape, dtype} for each array (offsets
+relative to the start of the data section):
+
+    {
+      "format_version": 1,
+      "meta": {...},                       # free-form (die_id, source, ...)
+      "sensors": {
+        "A2": {
+          "corners": ["A1", "A3"],
+          "D_ratio_mean": 1.23, "D_ratio_std": 0.01,
+          "arrays": {"all_shapes": {...}, "shape_slopes": {...},
+                     "med_shape": {...}, "alpha_grid": {...}}
+        }, ...
+      }
+    }
+
+read_model memory-maps the file read-only by default, so several worker
+processes loading the same model share one copy in the page cache and
+startup costs a header parse, not a retrain.
+"""
+
+import json
+import os
+import struct
+from typing import Dict, Tuple
+
+import numpy as np
+
+MAGIC = b'DRAWINM\0'
+FORMAT_VERSION = 1
+ALIGN = 64
+_PREFIX = struct.Struct('<8sIQ')
+
+# Arrays stored per sensor model (shape_slopes and D_ratios are optional:
+# readers recompute / do without them); everything else is scalar/JSON
+ARRAY_KEYS = ('all_shapes', 'shape_slopes', 'med_shape', 'alpha_grid', 'D_ratios')
+SCALAR_KEYS = ('corners', 'D_ratio_mean', 'D_ratio_std', 'n_training_strokes')
+
+
+def _pad(n: int) -> int:
+    return (-n) % ALIGN
+
+
+def write_model(path: str, sensor_models: Dict[str, Dict], meta: Dict = None):
+    """Write per-sensor models to path (atomically, via a temp file + rename)."""
+    blobs = []
+    offset = 0
+    sensors = {}
+    for ms_name, model in sensor_models.items():
+        entry = {k: model[k] for k in SCALAR_KEYS if k in model}
+        entry['arrays'] = {}
+        for key in ARRAY_KEYS:
+            if key not in model:
+                continue
+            arr = np.ascontiguousarray(model[key])
+            entry['arrays'][key] = {
+                'offset': offset,
+                'shape': list(arr.shape),
+                'dtype': arr.dtype.str,
+            }
+            blobs.append((offset, arr))
+            offset += arr.nbytes + _pad(arr.nbytes)
+        sensors[ms_name] = entry
+
+    header = json.dumps({
+        'format_version': FORMAT_VERSION,
+        'meta': meta or {},
+        'sensors': sensors,
+    }).encode()
+    header += b' ' * _pad(_PREFIX.size + len(header))
+
+    tmp = f'{path}.tmp{os.getpid()}'
+    with open(tmp, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for _, arr in blobs:
+            f.write(arr.tobytes())
+            f.write(b'\0' * _pad(arr.nbytes))
+    os.replace(tmp, path)
+
+
+def read_model(path: str, mmap: bool = True) -> Tuple[Dict, Dict[str, Dict]]:
+    """Read a model file -> (meta, sensor_models).
+
+    With mmap=True (default) the arrays are read-only views into a shared
+    memory map of the file; otherwise the file is read into private memory.
+    """
+    with open(path, 'rb') as f:
+        magic, version, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a draw-in model file")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path}: model format v{version} is newer than "
+                             f"supported v{FORMAT_VERSION}")
+        header = json.loads(f.read(header_len))
+
+    data_start = _PREFIX.size + header_len
+    if mmap:
+        buf = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        buf = np.fromfile(path, dtype=np.uint8)
+
+    sensor_models = {}
+    for ms_name, entry in header['sensors'].items():
+        model = {k: v for k, v in entry.items() if k != 'arrays'}
+        for key, desc in entry['arrays'].items():
+            model[key] = np.ndarray(tuple(desc['shape']), dtype=np.dtype(desc['dtype']),
+                                    buffer=buf, offset=data_start + desc['offset'])
+        sensor_models[ms_name] = model
+    return header['meta'], sensor_models
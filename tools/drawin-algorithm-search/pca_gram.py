@@ -0,0 +1,176 @@
+"""
+Batched Gram-matrix fits for the PCA shape predictors (algorithms_v8/v9).
+
+The PCA predictors fit y_obs ~ D * mean + (D c_1) * pc_1 + ... by ridge
+regression on the first cutoff_idx samples, with the mean shape and the
+principal components evaluated at the stroke's smoothed alpha. Done per
+prediction that was an np.interp per component, a fresh design matrix, a
+Python loop over components for the ridge weights and the clamp, and a
+solve.
+
+PCABasis keeps the basis rows [mean, pc_1, ..., pc_n] of one sensor as a
+ShapeIndex, together with the per-component prior scales, so the whole basis
+is evaluated at a batch of alpha vectors with one locate. The normal
+equations of all strokes then come from one masked batched product
+
+    G[i] = (B[i] * obs[i]) @ B[i].T,    r[i] = (B[i] * obs[i]) @ y[i]
+
+and each stroke's fit is a (1 + n_pc)-square solve, batched over strokes
+with different cutoffs.
+
+The basis is evaluated at each stroke's own alpha, so there is no per-sensor
+Gram matrix to precompute; cumulative (prefix-sum) Gram tables per stroke
+were measured at ~14x the cost of the masked product for a single cutoff.
+
+Usage:
+    basis = PCABasis(mean_shape, pcs, pc_stds, n_pc, alpha_grid)
+    loc = basis.index.locate(alpha_smooth)                # (n, N_PTS) alpha
+    curves = predict_pca(basis, loc, values, values_fit, cutoff_idx,
+                         D_prior, D_prior_std)
+"""
+
+import numpy as np
+
+from shape_index import ShapeIndex
+
+
+def gram(B: np.ndarray, y: np.ndarray, obs: np.ndarray):
+    """Gram matrices and projections over each row's observed samples.
+
+    Args:
+        B: (n, k, n_pts) basis rows per stroke
+        y: (n, n_pts) fit values per stroke
+        obs: (n, n_pts) observed-sample mask
+
+    Returns:
+        G: (n, k, k), G[i] = X_i.T @ X_i for the design X_i = B[i, :, obs[i]].T
+        r: (n, k), r[i] = X_i.T @ y[i, obs[i]]
+    """
+    Bo = B * obs[:, np.newaxis, :]
+    G = Bo @ B.transpose(0, 2, 1)
+    r = (Bo @ np.where(obs, y, 0.0)[:, :, np.newaxis])[:, :, 0]
+    return G, r
+
+
+class PCABasis:
+    """Mean shape and principal components of one sensor, tabulated for batched fits."""
+
+    def __init__(self, mean_shape: np.ndarray, pcs: np.ndarray, pc_stds: np.ndarray,
+                 n_pc: int, alpha_grid: np.ndarray, dtype=np.float64):
+        """
+        Args:
+            mean_shape: (N_PTS,) cleaned mean shape on alpha_grid
+            pcs: (>= n_pc, N_PTS) principal components on alpha_grid
+            pc_stds: (>= n_pc,) standard deviation of each component's score
+            n_pc: Components used in the fit (0 disables it)
+            alpha_grid: Uniform alpha grid of mean_shape and pcs
+            dtype: Table dtype (float32 for compact models)
+        """
+        self.n_pc = n_pc
+        self.pc_stds = np.asarray(pc_stds, dtype=float)[:n_pc]
+        # Prior scale of the D*c_i coefficients (the PCA predictors divide by
+        # sqrt of the number of stored components)
+        self.prior_scale = self.pc_stds / max(np.sqrt(len(pcs)), 1)
+        self.index = ShapeIndex(
+            np.vstack([mean_shape, np.asarray(pcs)[:n_pc]]).astype(dtype), alpha_grid)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.index.shapes.dtype
+
+    def evaluate(self, loc) -> np.ndarray:
+        """Basis at located alphas: (n, 1 + n_pc, N_PTS) for a 2-D loc."""
+        return np.moveaxis(self.index.evaluate(loc), 0, -2)
+
+    def fit(self, B: np.ndarray, y: np.ndarray, obs: np.ndarray,
+            D_prior: np.ndarray, D_prior_std: np.ndarray):
+        """Ridge fit of D and the PC coefficients on each row's observed samples.
+
+        Args:
+            B: (n, 1 + n_pc, N_PTS) basis from evaluate
+            y: (n, N_PTS) fit values; only observed samples are used
+            obs: (n, N_PTS) observed-sample mask
+            D_prior, D_prior_std: (n,) prior on D
+
+        Returns:
+            D_fit: (n,) fitted D
+            c_fits: (n, n_pc) PC coefficients, clamped to +-3 std
+        """
+        n = len(B)
+        G, r = gram(B, y, obs)
+
+        # Ridge toward D = D_prior, D*c_i = 0
+        reg = np.empty((n, 1 + self.n_pc))
+        reg[:, 0] = 1.0 / np.maximum(D_prior_std ** 2, 0.01)
+        reg[:, 1:] = 1.0 / np.maximum((D_prior[:, np.newaxis] * self.prior_scale) ** 2, 0.01)
+        target = np.zeros_like(reg)
+        target[:, 0] = D_prior
+        A = G + reg[:, :, np.newaxis] * np.eye(1 + self.n_pc)
+        b = r + reg * target
+
+        try:
+            coeffs = np.linalg.solve(A, b[:, :, np.newaxis])[:, :, 0]
+        except np.linalg.LinAlgError:
+            coeffs = target.copy()
+            for i in range(n):
+                try:
+                    coeffs[i] = np.linalg.solve(A[i], b[i])
+                except np.linalg.LinAlgError:
+                    pass
+
+        D_fit = coeffs[:, 0]
+        c_fits = coeffs[:, 1:] / np.maximum(D_fit, 1.0)[:, np.newaxis]
+        max_c = 3.0 * self.pc_stds
+        return D_fit, np.clip(c_fits, -max_c, max_c)
+
+
+def predict_pca(basis: PCABasis, loc, values: np.ndarray, values_fit: np.ndarray,
+                cutoff_idx: np.ndarray, D_prior: np.ndarray,
+                D_prior_std: np.ndarray) -> np.ndarray:
+    """Batched PCA shape prediction shared by the v8/v9 predictors.
+
+    Args:
+        basis: The sensor's PCABasis
+        loc: basis.index.locate of the (n, N_PTS) smoothed alpha (in
+            basis.dtype, so float32 bases are evaluated in float32)
+        values: (n, N_PTS) observed values (used before each row's cutoff)
+        values_fit: (n, N_PTS) values for the PCA fit (e.g. denoised)
+        cutoff_idx: (n,) observed samples per row
+        D_prior, D_prior_std: (n,) prior on D
+
+    Returns:
+        (n, N_PTS) observed values, then D_post * corrected shape
+    """
+    n, n_pts = values.shape
+    obs = np.arange(n_pts)[np.newaxis, :] < cutoff_idx[:, np.newaxis]
+    B = basis.evaluate(loc)
+    values_fit = values_fit.astype(B.dtype, copy=False)
+    D_prior = D_prior.astype(B.dtype, copy=False)
+    D_prior_std = D_prior_std.astype(B.dtype, copy=False)
+    shape = B[:, 0].copy()
+
+    fit = cutoff_idx > 10 if basis.n_pc > 0 else np.zeros(n, dtype=bool)
+    if fit.all():
+        _, c_fits = basis.fit(B, values_fit, obs, D_prior, D_prior_std)
+        shape += np.einsum('nk,nkt->nt', c_fits, B[:, 1:])
+    elif fit.any():
+        _, c_fits = basis.fit(B[fit], values_fit[fit], obs[fit],
+                              D_prior[fit], D_prior_std[fit])
+        shape[fit] += np.einsum('nk,nkt->nt', c_fits, B[fit, 1:])
+    shape = np.clip(shape, 0, 1.5)
+
+    # Refine D with the corrected shape on the observed values
+    shape_obs = np.where(obs, shape, 0.0)
+    v_obs = np.where(obs, values, 0.0)
+    ss = np.sum(shape_obs ** 2, axis=1)
+    ok = (ss > 1e-10) & (cutoff_idx > 5)
+    D_mle = np.where(ok, np.sum(v_obs * shape_obs, axis=1) / np.where(ok, ss, 1.0), D_prior)
+    res = v_obs - D_mle[:, np.newaxis] * shape_obs
+    nv = np.sum(res ** 2, axis=1) / np.maximum(cutoff_idx, 1)
+    D_mle_var = np.where(ok, nv / np.maximum(ss, 1e-10), D_prior_std ** 2 * 100)
+
+    # Bayesian D
+    pp = 1.0 / np.maximum(D_prior_std ** 2, 1e-10)
+    lp = 1.0 / np.maximum(D_mle_var, 1e-10)
+    D_post = (pp * D_prior + lp * D_mle) / (pp + lp)
+    return np.where(obs, values, D_post[:, np.newaxis] * shape)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Append-only SQLite store of sweep results.
+
+Every evaluated sweep point is written as soon as it finishes, keyed by
+
+    (algorithm, code_hash, params_hash, seed)
+
+where code_hash covers the source of the algorithm's module, the local
+modules it pulls in, and the evaluation / data-generation code, and
+params_hash is a hash of the SimParams without the seed. run_sweep(...,
+store=...) skips points already in the store, so an interrupted sweep
+resumes where it stopped and a repeated benchmark run only evaluates what
+changed. Rows are never updated or deleted: editing an algorithm gives it a
+new code_hash, and the old results stay available for comparison.
+
+Usage:
+    python result_store.py report [--db results.db] [--algorithms PATTERN ...]
+    python result_store.py compare v9/ultimate_v9 best/shape_selection_robust@3f2a
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import sys
+import types
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(SCRIPT_DIR, 'results.db')
+# Modules every result depends on, whatever the algorithm
+CORE_MODULES = ('data_model', 'evaluation')
+CODE_HASH_LEN = 12
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id          INTEGER PRIMARY KEY,
+    algorithm   TEXT NOT NULL,
+    code_hash   TEXT NOT NULL,
+    params_hash TEXT NOT NULL,
+    seed        INTEGER NOT NULL,
+    params      TEXT NOT NULL,
+    sweep_param TEXT,
+    sweep_value REAL,
+    rmse        REAL NOT NULL,
+    max_error   REAL NOT NULL,
+    r2          REAL NOT NULL,
+    di_error    REAL NOT NULL,
+    n           INTEGER NOT NULL,
+    created_at  TEXT NOT NULL,
+    UNIQUE (algorithm, code_hash, params_hash, seed)
+);
+CREATE INDEX IF NOT EXISTS results_algorithm ON results (algorithm, code_hash);
+"""
+
+
+def _local_modules(obj) -> List[types.ModuleType]:
+    """Modules of this directory reachable from obj's module through its globals."""
+    start = sys.modules.get(getattr(obj, '__module__', None)) or inspect.getmodule(obj)
+    seen = {}
+    stack = [start] + [sys.modules[name] for name in CORE_MODULES if name in sys.modules]
+    while stack:
+        module = stack.pop()
+        path = getattr(module, '__file__', None)
+        if (module is None or module.__name__ in seen or not path
+                or os.path.dirname(os.path.abspath(path)) != SCRIPT_DIR):
+            continue
+        seen[module.__name__] = module
+        for value in vars(module).values():
+            if isinstance(value, types.ModuleType):
+                stack.append(value)
+            elif getattr(value, '__module__', None) in sys.modules:
+                stack.append(sys.modules[value.__module__])
+    return [seen[name] for name in sorted(seen)]
+
+
+def code_hash(algo_factory) -> str:
+    """Hash of the source code that determines algo_factory's results."""
+    h = hashlib.sha256()
+    for module in _local_modules(algo_factory):
+        h.update(module.__name__.encode() + b'\0')
+        with open(module.__file__, 'rb') as f:
+            h.update(f.read())
+    h.update(getattr(algo_factory, '__qualname__', repr(algo_factory)).encode())
+    return h.hexdigest()[:CODE_HASH_LEN]
+
+
+def params_hash(params) -> str:
+    """Hash of a SimParams without its seed (stored in its own column)."""
+    fields = {k: v for k, v in asdict(params).items() if k != 'seed'}
+    blob = json.dumps(fields, sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+class ResultStore:
+    """Append-only SQLite table of evaluated (algorithm, code, params, seed) points."""
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, algorithm: str, code: str, params) -> Optional[Dict]:
+        """Stored metrics of one point, or None if it was never computed."""
+        row = self.conn.execute(
+            "SELECT rmse, max_error, r2, di_error, n FROM results "
+            "WHERE algorithm = ? AND code_hash = ? AND params_hash = ? AND seed = ?",
+            (algorithm, code, params_hash(params), params.seed)).fetchone()
+        return dict(row) if row is not None else None
+
+    def add(self, algorithm: str, code: str, params, metrics: Dict,
+            sweep_param: str = None, sweep_value: float = None):
+        """Append one point (committed immediately); existing keys are kept as is."""
+        self.conn.execute(
+            "INSERT OR IGNORE INTO results (algorithm, code_hash, params_hash, seed, "
+            "params, sweep_param, sweep_value, rmse, max_error, r2, di_error, n, "
+            "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (algorithm, code, params_hash(params), params.seed,
+             json.dumps(asdict(params), sort_keys=True), sweep_param, sweep_value,
+             float(metrics['rmse']), float(metrics['max_error']), float(metrics['r2']),
+             float(metrics['di_error']), int(metrics['n']),
+             datetime.now(timezone.utc).isoformat(timespec='seconds')))
+        self.conn.commit()
+
+    def versions(self, patterns: List[str] = None) -> List[Dict]:
+        """One summary row per (algorithm, code_hash), newest last."""
+        rows = self.conn.execute(
+            "SELECT algorithm, code_hash, COUNT(*) AS points, "
+            "MAX(rmse) AS worst_rmse, MAX(max_error) AS worst_max_error, "
+            "MAX(di_error) AS worst_di_error, AVG(rmse) AS mean_rmse, "
+            "MIN(created_at) AS first, MAX(created_at) AS last "
+            "FROM results GROUP BY algorithm, code_hash ORDER BY algorithm, last"
+        ).fetchall()
+        rows = [dict(r) for r in rows]
+        if patterns:
+            rows = [r for r in rows
+                    if any(fnmatch.fnmatchcase(r['algorithm'], p) for p in patterns)]
+        return rows
+
+    def points(self, algorithm: str, code: str = None) -> Dict[tuple, Dict]:
+        """{(params_hash, seed): row} of one algorithm version.
+
+        code may be a code_hash prefix; default is the most recent version.
+        """
+        versions = [v for v in self.versions() if v['algorithm'] == algorithm
+                    and (code is None or v['code_hash'].startswith(code))]
+        if not versions:
+            raise KeyError(f"no results for {algorithm}" + (f"@{code}" if code else ""))
+        rows = self.conn.execute(
+            "SELECT params_hash, seed, params, sweep_param, sweep_value, "
+            "rmse, max_error, r2, di_error, n FROM results "
+            "WHERE algorithm = ? AND code_hash = ?",
+            (algorithm, versions[-1]['code_hash'])).fetchall()
+        return {(r['params_hash'], r['seed']): dict(r) for r in rows}
+
+
+def _split_spec(spec: str):
+    """'name@hashprefix' -> (name, hashprefix or None)."""
+    name, _, code = spec.partition('@')
+    return name, code or None
+
+
+def print_report(store: ResultStore, patterns: List[str] = None):
+    print(f"{'Algorithm':<40} {'Code':<13} {'Points':>6} {'Worst RMSE':>11} "
+          f"{'Worst MaxErr':>13} {'Worst DI':>9} {'Mean RMSE':>10}  Last run")
+    print("-" * 124)
+    for v in store.versions(patterns):
+        print(f"{v['algorithm']:<40} {v['code_hash']:<13} {v['points']:>6} "
+              f"{v['worst_rmse']:>11.3f} {v['worst_max_error']:>13.3f} "
+              f"{v['worst_di_error']:>9.3f} {v['mean_rmse']:>10.3f}  {v['last']}")
+
+
+def _point_label(row: Dict) -> str:
+    """'noise=25 (seed 42)' for sweep points, the non-default params otherwise."""
+    if row['sweep_param'] is not None:
+        label = f"{row['sweep_param']}={row['sweep_value']:g}"
+    else:
+        label = ' '.join(f"{k}={v:g}" for k, v in json.loads(row['params']).items()
+                         if k != 'seed')
+    return f"{label} (seed {row['seed']})"
+
+
+def print_compare(store: ResultStore, specs: List[str], metric: str = 'rmse'):
+    """Side-by-side metric per stored point for several algorithm versions."""
+    tables = [store.points(*_split_spec(spec)) for spec in specs]
+    rows = {}
+    for table in tables:
+        for key, row in table.items():
+            rows.setdefault(key, row)
+    keys = sorted(rows, key=lambda k: (rows[k]['sweep_param'] or '',
+                                       rows[k]['sweep_value'] or 0.0, k))
+    width = max(12, *(len(s) for s in specs))
+    rule = "-" * (32 + (width + 1) * len(specs))
+    print(f"{'Point':<32}" + "".join(f" {s:>{width}}" for s in specs))
+    print(rule)
+    worst = [0.0] * len(specs)
+    for key in keys:
+        cells = []
+        for j, table in enumerate(tables):
+            if key in table:
+                worst[j] = max(worst[j], table[key][metric])
+                cells.append(f" {table[key][metric]:>{width}.3f}")
+            else:
+                cells.append(f" {'-':>{width}}")
+        print(f"{_point_label(rows[key]):<32}" + "".join(cells))
+    print(rule)
+    print(f"{'worst ' + metric:<32}" + "".join(f" {w:>{width}.3f}" for w in worst))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the sweep result store")
+    parser.add_argument('--db', default=DEFAULT_DB, help="Store path (default: results.db)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    report = sub.add_parser('report', help="Summary per algorithm version")
+    report.add_argument('--algorithms', nargs='+', metavar='PATTERN',
+                        help="Glob(s) on algorithm names")
+    compare = sub.add_parser('compare', help="Per-point comparison of algorithm versions")
+    compare.add_argument('specs', nargs='+', metavar='ALGORITHM[@CODE]',
+                         help="Algorithm name, optionally @code-hash prefix "
+                              "(default: latest version)")
+    compare.add_argument('--metric', choices=('rmse', 'max_error', 'di_error', 'r2'),
+                         default='rmse')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        sys.exit(f"{args.db}: no result store yet (run benchmark.py first)")
+    with ResultStore(args.db) as store:
+        try:
+            if args.command == 'report':
+                print_report(store, args.algorithms)
+            else:
+                print_compare(store, args.specs, args.metric)
+        except KeyError as e:
+            sys.exit(e.args[0])
+
+
+if __name__ == '__main__':
+    main()
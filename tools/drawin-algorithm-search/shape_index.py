@@ -0,0 +1,109 @@
+"""
+Precomputed interpolation index for a bank of training shapes.
+
+The shape-selection predictors evaluate every training shape at a test
+stroke's smoothed alpha. Doing that with one np.interp per shape repeats the
+same binary search n_shapes times per prediction, and again for the best and
+blended shapes. ShapeIndex tabulates the bank once as piecewise-linear
+segments (value, slope) on a uniform alpha grid, so evaluating all shapes at
+any alpha vector is one locate (a multiply and floor) plus one gather and
+fused multiply-add over the whole bank.
+
+Usage:
+    index = ShapeIndex(all_shapes, alpha_grid)
+    loc = index.locate(alpha_smooth)          # reuse for every lookup
+    shapes_at = index.evaluate(loc)           # (n_shapes, len(alpha))
+    shape_full = index.interp(blended, loc)   # any vector on the same grid
+"""
+
+import numpy as np
+
+
+class ShapeIndex:
+    """Shape bank as piecewise-linear segments on a uniform alpha grid."""
+
+    def __init__(self, shapes: np.ndarray, alpha_grid: np.ndarray,
+                 resolution: int = None):
+        """
+        Args:
+            shapes: (n_shapes, len(alpha_grid)) shape bank
+            alpha_grid: Increasing alpha grid the shapes are sampled on
+            resolution: Points of the uniform table grid. Defaults to the
+                input grid when it is already uniform (no resampling error),
+                otherwise 4x its length.
+
+        float32 shape banks keep float32 tables; anything else is stored
+        as float64.
+        """
+        shapes = np.atleast_2d(np.asarray(shapes))
+        if shapes.dtype != np.float32:
+            shapes = shapes.astype(float, copy=False)
+        alpha_grid = np.asarray(alpha_grid, dtype=float)
+        uniform = np.allclose(np.diff(alpha_grid), alpha_grid[1] - alpha_grid[0])
+        if resolution is None and uniform:
+            grid = alpha_grid
+        else:
+            grid = np.linspace(alpha_grid[0], alpha_grid[-1],
+                               resolution or 4 * len(alpha_grid))
+            shapes = np.array([np.interp(grid, alpha_grid, s) for s in shapes],
+                              dtype=shapes.dtype)
+
+        self._set_tables(grid, shapes, np.diff(shapes, axis=1))
+
+    @classmethod
+    def from_tables(cls, grid: np.ndarray, shapes: np.ndarray,
+                    slope: np.ndarray = None) -> 'ShapeIndex':
+        """Rebuild an index from stored tables without copying them.
+
+        grid must be uniform and shapes sampled on it (as saved from
+        .grid / .shapes / .slope); slope is recomputed when None.
+        """
+        index = cls.__new__(cls)
+        if slope is None:
+            slope = np.diff(shapes, axis=1)
+        index._set_tables(np.asarray(grid), np.asarray(shapes), np.asarray(slope))
+        return index
+
+    def _set_tables(self, grid, shapes, slope):
+        self.grid = grid
+        self.lo = float(grid[0])
+        self.hi = float(grid[-1])
+        self.scale = (len(grid) - 1) / (self.hi - self.lo)
+        self.n_seg = len(grid) - 1
+        # Segment tables: shape_i(alpha) = base[i, j] + frac * slope[i, j]
+        self.shapes = shapes
+        self.base = shapes[:, :-1]
+        self.slope = slope
+
+    @property
+    def n_shapes(self) -> int:
+        return self.base.shape[0]
+
+    def locate(self, alpha: np.ndarray):
+        """Segment index and in-segment fraction for each alpha (clamped to the grid).
+
+        The fraction keeps alpha's dtype (float32 alpha -> float32 lookups).
+        """
+        x = (np.clip(alpha, self.lo, self.hi) - self.lo) * self.scale
+        idx = np.minimum(x.astype(np.intp), self.n_seg - 1)
+        return idx, (x - idx).astype(x.dtype, copy=False)
+
+    def evaluate(self, loc) -> np.ndarray:
+        """All shapes at located alphas -> (n_shapes, *alpha.shape)."""
+        idx, frac = loc
+        return self.base[:, idx] + frac * self.slope[:, idx]
+
+    def interp(self, values: np.ndarray, loc) -> np.ndarray:
+        """Interpolate vector(s) sampled on the table grid at located alphas.
+
+        values is (len(grid),) or, for row-wise lookups with a 2-D loc,
+        (n_rows, len(grid)).
+        """
+        idx, frac = loc
+        if values.ndim == 1:
+            lo = values[idx]
+            hi = values[idx + 1]
+        else:
+            lo = np.take_along_axis(values, idx, axis=-1)
+            hi = np.take_along_axis(values, idx + 1, axis=-1)
+        return lo + frac * (hi - lo)
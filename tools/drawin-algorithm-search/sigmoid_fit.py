@@ -0,0 +1,169 @@
+"""
+Batched Levenberg-Marquardt fitting of the s_curve(alpha, D, k) model.
+
+The parametric algorithms fit D (amplitude) and k (steepness) per curve.
+Doing that with one scipy curve_fit / L-BFGS-B call per stroke costs
+thousands of tiny optimizer runs with finite-difference gradients.
+fit_s_curve fits a whole batch of curves at once: every iteration is a few
+(n_curves, n_points) array operations plus a closed-form 2x2 solve per row.
+
+Model per row i (offset is optional, e.g. a learned residual shape):
+
+    f_i(alpha) = D_i * (g(alpha, k_i) + offset_i(alpha))
+    g(alpha, k) = (sigmoid(k (alpha - 0.5)) - sigmoid(-k/2)) / (sigmoid(k/2) - sigmoid(-k/2))
+
+Cost per row (mask selects the valid points of ragged rows):
+
+    sum(mask * (f - y)^2) + w_D (D - mu_D)^2 + w_k (k - mu_k)^2
+
+The Gaussian prior terms are what the predictors' L-BFGS-B objectives add as
+regularization. Bounds are enforced by an active set (a parameter on a bound
+whose descent direction points outside is held there) plus projection of
+each step; rows stop iterating independently once converged.
+
+Usage:
+    D, k, converged = fit_s_curve(alpha, values, D0, k0,
+                                  bounds=([0, 1], [500, 50]))
+"""
+
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+MAX_ITER = 100
+TOL = 1e-8
+
+
+def s_curve_and_jacobian(alpha: np.ndarray, k: np.ndarray):
+    """Unit-amplitude s_curve g(alpha, k) and dg/dk, broadcast row-wise.
+
+    alpha: (n, m); k: (n,). Returns two (n, m) arrays.
+    """
+    k = np.asarray(k, dtype=float)[:, np.newaxis]
+    x = alpha - 0.5
+    u = 1.0 / (1.0 + np.exp(-k * x))
+    s1 = 1.0 / (1.0 + np.exp(-k * 0.5))
+    s0 = 1.0 - s1
+    den = s1 - s0
+    q = s1 * s0                        # sigmoid' at +-k/2 (equal by symmetry)
+    g = (u - s0) / den
+    # d/dk of (u - s0) / den, with du/dk = u(1-u)x, ds0/dk = -q/2, dden/dk = q
+    dg = (u * (1.0 - u) * x + 0.5 * q) / den - g * q / den
+    return g, dg
+
+
+def fit_s_curve(alpha: np.ndarray, values: np.ndarray,
+                D0, k0,
+                bounds: Tuple[Sequence, Sequence] = ((0.0, 1.0), (500.0, 50.0)),
+                prior_mean: Optional[Tuple] = None,
+                prior_weight: Optional[Tuple] = None,
+                mask: Optional[np.ndarray] = None,
+                offset: Optional[np.ndarray] = None,
+                fit_D: bool = True,
+                max_iter: int = MAX_ITER,
+                tol: float = TOL):
+    """Fit s_curve D, k to each row of a batch of curves.
+
+    Args:
+        alpha, values: (n, m) curves, or (m,) for a single curve
+        D0, k0: Initial guesses, scalars or (n,); clipped into bounds.
+            With fit_D=False, D stays at D0.
+        bounds: ((D_lo, k_lo), (D_hi, k_hi)), entries scalars or (n,)
+        prior_mean: (mu_D, mu_k), scalars or (n,); default the initial guess
+        prior_weight: (w_D, w_k) Gaussian prior precisions; default no prior
+        mask: (n, m) bool, points included in the cost (ragged rows)
+        offset: (m,) or (n, m) term added to the unit shape before scaling
+        max_iter: Iteration cap per row
+        tol: Relative parameter-step / cost-change tolerance
+
+    Returns:
+        D, k, converged -- (n,) arrays (scalars for 1-D input); converged is
+        False for rows that hit max_iter.
+    """
+    single = np.ndim(values) == 1
+    alpha = np.atleast_2d(np.asarray(alpha, dtype=float))
+    y = np.atleast_2d(np.asarray(values, dtype=float))
+    n = y.shape[0]
+    alpha = np.broadcast_to(alpha, y.shape)
+    w = np.ones(y.shape) if mask is None else np.atleast_2d(mask).astype(float)
+    y = np.where(w > 0, y, 0.0)
+
+    def per_row(v):
+        return np.broadcast_to(np.asarray(v, dtype=float), (n,)).copy()
+
+    lo = np.stack([per_row(bounds[0][0]), per_row(bounds[0][1])], axis=1)
+    hi = np.stack([per_row(bounds[1][0]), per_row(bounds[1][1])], axis=1)
+    theta = np.clip(np.stack([per_row(D0), per_row(k0)], axis=1), lo, hi)
+    if prior_weight is None:
+        prior_w = np.zeros((n, 2))
+        prior_mu = theta.copy()
+    else:
+        prior_w = np.stack([per_row(prior_weight[0]), per_row(prior_weight[1])], axis=1)
+        mu = prior_mean if prior_mean is not None else (theta[:, 0], theta[:, 1])
+        prior_mu = np.stack([per_row(mu[0]), per_row(mu[1])], axis=1)
+    free = np.array([float(fit_D), 1.0])
+
+    def evaluate(th):
+        g, dg = s_curve_and_jacobian(alpha, th[:, 1])
+        if offset is not None:
+            g = g + offset
+        r = th[:, :1] * g - y
+        cost = (np.sum(w * r * r, axis=1)
+                + np.sum(prior_w * (th - prior_mu) ** 2, axis=1))
+        return r, g, dg, cost
+
+    r, g, dg, cost = evaluate(theta)
+    lam = np.full(n, 1e-3)
+    active = np.ones(n, dtype=bool)
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        # Normal equations of the weighted, prior-augmented least squares
+        jD = g * free[0]
+        jk = theta[:, :1] * dg
+        a11 = np.sum(w * jD * jD, axis=1) + prior_w[:, 0] * free[0]
+        a12 = np.sum(w * jD * jk, axis=1)
+        a22 = np.sum(w * jk * jk, axis=1) + prior_w[:, 1]
+        b1 = -(np.sum(w * jD * r, axis=1) + prior_w[:, 0] * (theta[:, 0] - prior_mu[:, 0])) * free[0]
+        b2 = -(np.sum(w * jk * r, axis=1) + prior_w[:, 1] * (theta[:, 1] - prior_mu[:, 1]))
+
+        # Marquardt damping on the diagonal. Parameters that are fixed, or
+        # sit on a bound the descent direction points past, get a unit pivot
+        # and zero right-hand side so the other one is solved on its own
+        b = np.stack([b1, b2], axis=1)
+        pinned = ((theta <= lo) & (b < 0)) | ((theta >= hi) & (b > 0)) | (free == 0)
+        fD, fk = ~pinned[:, 0], ~pinned[:, 1]
+        d11 = np.where(fD, a11 * (1.0 + lam) + 1e-12, 1.0)
+        d22 = np.where(fk, a22 * (1.0 + lam) + 1e-12, 1.0)
+        a12 = a12 * (fD & fk)
+        b1, b2 = b1 * fD, b2 * fk
+        det = d11 * d22 - a12 * a12
+        det = np.where(np.abs(det) > 1e-300, det, 1e-300)
+        step = np.stack([(b1 * d22 - a12 * b2) / det,
+                         (d11 * b2 - a12 * b1) / det], axis=1)
+        step[~active] = 0.0
+
+        trial = np.clip(theta + step, lo, hi)
+        r_t, g_t, dg_t, cost_t = evaluate(trial)
+        better = active & np.isfinite(cost_t) & (cost_t <= cost)
+
+        moved = np.abs(trial - theta).max(axis=1)
+        scale = np.abs(theta).max(axis=1) + tol
+        small_step = moved <= tol * scale
+        small_gain = (cost - cost_t) <= tol * (cost + tol)
+
+        theta[better] = trial[better]
+        r[better], g[better], dg[better] = r_t[better], g_t[better], dg_t[better]
+        lam = np.where(better, np.maximum(lam / 10.0, 1e-12),
+                       np.minimum(lam * 10.0, 1e12))
+        # Converged: an accepted step that barely moves or barely helps, a
+        # projected step that goes nowhere (pinned at a bound), or damping
+        # saturated without finding a descent direction
+        done = (better & (small_step | small_gain)) | (active & small_step) | (lam >= 1e12)
+        cost = np.where(better, cost_t, cost)
+        active &= ~done
+
+    converged = ~active
+    if single:
+        return float(theta[0, 0]), float(theta[0, 1]), bool(converged[0])
+    return theta[:, 0], theta[:, 1], converged
@@ -0,0 +1,88 @@
+"""
+Shared Savitzky-Golay smoothing for stroke alpha and observed curves.
+
+The algorithm modules smooth alpha (and, for denoising, observed values)
+with scipy.signal.savgol_filter one vector at a time, for every training
+stroke and every prediction. savgol_filter(mode='interp') is linear in its
+input: for a length n, window w and polynomial order p it is an (n, n)
+matrix whose interior rows hold the centred SG coefficients and whose first
+and last w // 2 rows evaluate the polynomial fitted to the edge window.
+savgol_matrix builds that matrix once per (n, w, p) and caches it, so
+smoothing a whole (n_strokes, n) batch is a single matrix product.
+
+smooth_alpha adds what every _smooth_alpha copy does after the filter:
+running maximum (monotone alpha), clip to [0, 1] and renormalization to
+start at 0 and end at 1.
+
+Usage:
+    alpha_s = smooth_alpha(alpha)                  # (n,) or (n_strokes, n)
+    values_s = savgol(values_observed, window=21)
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import savgol_coeffs
+
+ALPHA_WINDOW = 31
+POLYORDER = 3
+
+
+def window_length(n: int, window: int) -> int:
+    """Odd window of at most `window` that fits n samples (at least 5)."""
+    w = max(min(window, n // 2 * 2 - 1), 5)
+    if w % 2 == 0:
+        w += 1
+    return w
+
+
+@lru_cache(maxsize=None)
+def savgol_matrix(n: int, window: int, polyorder: int = POLYORDER) -> np.ndarray:
+    """(n, n) matrix S with S @ x == savgol_filter(x, window, polyorder).
+
+    Cached per (n, window, polyorder) and returned read-only.
+    """
+    if window > n:
+        raise ValueError(f"window {window} is longer than the signal ({n} samples)")
+    h = window // 2
+    S = np.zeros((n, n))
+    centre = savgol_coeffs(window, polyorder, use='dot')
+    for i in range(h, n - h):
+        S[i, i - h:i + h + 1] = centre
+    # mode='interp': the first/last h outputs evaluate the polynomial fitted
+    # to the first/last window at their own position
+    for p in range(h):
+        S[p, :window] = savgol_coeffs(window, polyorder, pos=p, use='dot')
+        S[n - h + p, n - window:] = savgol_coeffs(window, polyorder, pos=window - h + p,
+                                                  use='dot')
+    S.setflags(write=False)
+    return S
+
+
+def savgol(x: np.ndarray, window: int = 21, polyorder: int = POLYORDER) -> np.ndarray:
+    """Savitzky-Golay smoothing along the last axis of x (one vector or a batch).
+
+    The window is shrunk to fit short signals as window_length does, and the
+    polynomial order to fit the window.
+    """
+    x = np.asarray(x, dtype=float)
+    n = x.shape[-1]
+    w = window_length(n, window)
+    return x @ savgol_matrix(n, w, min(polyorder, w - 1)).T
+
+
+def smooth_alpha(alpha: np.ndarray, window: int = ALPHA_WINDOW,
+                 polyorder: int = POLYORDER) -> np.ndarray:
+    """Smooth noisy alpha with Savitzky-Golay + monotonicity enforcement.
+
+    alpha is (n,) or (n_strokes, n); every row is smoothed, made monotone,
+    clipped to [0, 1] and rescaled to run from 0 to 1 (rows without a rise
+    are left unscaled).
+    """
+    s = savgol(alpha, window, polyorder)
+    s = np.maximum.accumulate(s, axis=-1)
+    s = np.clip(s, 0, 1)
+    lo = s[..., :1]
+    span = s[..., -1:] - lo
+    rising = span > 1e-10
+    return np.where(rising, (s - lo) / np.where(rising, span, 1.0), s)
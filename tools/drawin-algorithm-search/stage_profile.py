@@ -0,0 +1,196 @@
+"""
+Opt-in per-stage timers and counters for draw-in predictors.
+
+Predictors mark their stages with a context manager and count work items:
+
+    from stage_profile import stage, count
+
+    with stage('smooth_alpha'):
+        alpha_smooth = _smooth_alpha(alpha_full)
+    count('shapes_scored', n_shapes)
+
+Collection is off by default: stage() then returns one shared no-op
+context manager and count() returns immediately, so instrumented code pays
+a function call per stage and nothing else. When enabled, every stage is
+accumulated under its call path (stages nest, e.g. 'ultimate_v9;predict;
+rss_scoring'), which is what format_table prints as a flame-style tree with
+inclusive and self time. With trace=True each stage execution is also kept
+as a Chrome trace event (chrome://tracing, Perfetto).
+
+Usage:
+    stage_profile.enable(trace=True)
+    ...run predictors...
+    print(stage_profile.format_table())
+    stage_profile.write_chrome_trace('trace.json')
+    stage_profile.disable()
+
+State is per process and not thread-safe; worker processes collect their
+own profiles.
+"""
+
+import json
+import os
+import time
+from typing import Dict, List
+
+# Chrome trace events kept per collection (about 100 bytes each)
+MAX_TRACE_EVENTS = 1_000_000
+
+_enabled = False
+_trace = False
+_stack: List[str] = []
+_stats: Dict[tuple, list] = {}       # path -> [calls, total_ns, children_ns]
+_counters: Dict[str, int] = {}
+_events: List[tuple] = []            # (name, start_ns, duration_ns)
+_origin_ns = 0
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ('name', 't0')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        _stack.append(self.name)
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        dur = time.perf_counter_ns() - self.t0
+        path = tuple(_stack)
+        _stack.pop()
+        entry = _stats.get(path)
+        if entry is None:
+            entry = _stats[path] = [0, 0, 0]
+        entry[0] += 1
+        entry[1] += dur
+        if len(path) > 1:
+            _stats.setdefault(path[:-1], [0, 0, 0])[2] += dur
+        if _trace and len(_events) < MAX_TRACE_EVENTS:
+            _events.append((self.name, self.t0, dur))
+        return False
+
+
+def stage(name: str):
+    """Context manager timing one stage (a no-op unless profiling is enabled)."""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def count(name: str, n: int = 1):
+    """Add n to a named counter (a no-op unless profiling is enabled)."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable(trace: bool = False):
+    """Start collecting (clears previous results); trace keeps per-call events."""
+    global _enabled, _trace, _origin_ns
+    reset()
+    _enabled = True
+    _trace = trace
+    _origin_ns = time.perf_counter_ns()
+
+
+def disable():
+    global _enabled, _trace
+    _enabled = False
+    _trace = False
+
+
+def reset():
+    _stack.clear()
+    _stats.clear()
+    _counters.clear()
+    _events.clear()
+
+
+def snapshot() -> Dict:
+    """Collected stages (tree order) and counters as plain data."""
+    return {
+        'stages': [
+            {
+                'path': ';'.join(path),
+                'calls': calls,
+                'total_ms': total / 1e6,
+                'self_ms': (total - children) / 1e6,
+            }
+            for path, (calls, total, children) in _tree_order()
+        ],
+        'counters': dict(_counters),
+    }
+
+
+def _tree_order():
+    """(path, stats) depth-first, siblings by descending total time."""
+    children = {}
+    for path in _stats:
+        children.setdefault(path[:-1], []).append(path)
+    ordered = []
+
+    def visit(parent):
+        for path in sorted(children.get(parent, ()), key=lambda p: -_stats[p][1]):
+            ordered.append((path, _stats[path]))
+            visit(path)
+
+    visit(())
+    return ordered
+
+
+def format_table() -> str:
+    """Flame-style table: one indented row per call path, inclusive and self time."""
+    rows = _tree_order()
+    root_total = sum(s[1] for p, s in rows if len(p) == 1) or 1
+    lines = [f"{'Stage':<48} {'Calls':>8} {'Total ms':>10} {'Self ms':>10} "
+             f"{'%':>6} {'us/call':>9}",
+             "-" * 96]
+    for path, (calls, total, children) in rows:
+        label = '  ' * (len(path) - 1) + path[-1]
+        per_call = total / 1e3 / calls if calls else 0.0
+        lines.append(f"{label:<48} {calls:>8} {total / 1e6:>10.2f} "
+                     f"{(total - children) / 1e6:>10.2f} "
+                     f"{100.0 * total / root_total:>6.1f} {per_call:>9.1f}")
+    if _counters:
+        lines.append("")
+        lines.append(f"{'Counter':<48} {'Value':>8}")
+        lines.append("-" * 58)
+        for name in sorted(_counters):
+            lines.append(f"{name:<48} {_counters[name]:>8}")
+    return "\n".join(lines)
+
+
+def chrome_trace() -> Dict:
+    """Collected events in Chrome trace-event format (complete 'X' events, us)."""
+    pid = os.getpid()
+    events = [{'name': name, 'ph': 'X', 'pid': pid, 'tid': 0,
+               'ts': (t0 - _origin_ns) / 1e3, 'dur': dur / 1e3}
+              for name, t0, dur in _events]
+    if _counters:
+        end = max((e['ts'] + e['dur'] for e in events), default=0.0)
+        events.append({'name': 'counters', 'ph': 'C', 'pid': pid, 'tid': 0,
+                       'ts': end, 'args': dict(_counters)})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def write_chrome_trace(path: str):
+    with open(path, 'w') as f:
+        json.dump(chrome_trace(), f)
@@ -0,0 +1,216 @@
+"""
+Streaming draw-in prediction for strokes still in progress.
+
+Online variant of the shape-selection model in best_algorithm: instead of
+refitting every training shape against values_observed[:cutoff_idx] once the
+stroke has ended, it keeps running sufficient statistics per candidate shape
+
+    Svs_i = sum(v * s_i),  Sss_i = sum(s_i ** 2),  Svv = sum(v ** 2)
+
+so each new sample updates the shape weights and the D posterior without
+touching the whole stroke. The full-curve prediction (O(n_shapes * N_PTS))
+is only built when asked for.
+
+Alpha smoothing: best_algorithm smooths alpha with a centred Savitzky-Golay
+window over the whole stroke. Here a sample is committed to the running sums
+once the half-window after it has arrived, using exactly the coefficients
+savgol_filter(mode='interp') would use for it, so committed samples see the
+same smoothed alpha as the batch predictor. The last half-window of samples
+stays pending and is re-scored each update with the end-of-data coefficients:
+O(window * n_shapes) per sample, independent of stroke length.
+
+Differences from the batch predictor, forced by causality:
+- the end-of-stroke alpha used for normalization is taken as 1.0;
+- D is the weight-averaged per-shape least-squares fit; the IRLS step needs
+  the residual median, which has no running form.
+
+Usage:
+    predictor = build_predictor(train_data)
+    stream = StreamingPredictor.from_predictor(predictor, 'A2', corner_dis)
+    for alpha_t, value_t in samples:
+        D_now = stream.update(alpha_t, value_t)
+    curve = stream.predict()          # on the model alpha grid
+"""
+
+import numpy as np
+from collections import deque
+from scipy.signal import savgol_coeffs
+from typing import Dict, Optional
+
+
+ALPHA_WINDOW = 31
+ALPHA_POLYORDER = 3
+
+
+class StreamingPredictor:
+    """Per-stroke online predictor for one middle sensor."""
+
+    def __init__(self, model: Dict, avg_corner_di: float,
+                 alpha_window: int = ALPHA_WINDOW):
+        """
+        Args:
+            model: One entry of build_predictor(...).sensor_models
+            avg_corner_di: Mean total draw-in of the same-side corners
+            alpha_window: Savitzky-Golay window for alpha (odd, >= 5)
+        """
+        self.w = alpha_window
+        self.h = alpha_window // 2
+        # Row p: coefficients evaluating the cubic fit of a w-sample window at position p
+        self._coeffs = np.array([
+            savgol_coeffs(alpha_window, ALPHA_POLYORDER, pos=p, use='dot')
+            for p in range(alpha_window)
+        ])
+        self.shapes = model['all_shapes']
+        self.index = model['shape_index']
+        self.med_shape = model['med_shape']
+        self.alpha_grid = model['alpha_grid']
+        self.D_prior = model['D_ratio_mean'] * avg_corner_di
+        self.D_prior_std = model['D_ratio_std'] * avg_corner_di
+        self.reset()
+
+    @classmethod
+    def from_predictor(cls, predictor, ms_name: str,
+                       corner_dis: Dict[str, float]) -> 'StreamingPredictor':
+        """Start a stream for ms_name from a build_predictor() result."""
+        model = predictor.sensor_models[ms_name]
+        avg_di = float(np.mean([corner_dis[c] for c in model['corners']]))
+        return cls(model, avg_di)
+
+    def reset(self):
+        """Forget all samples (start of a new stroke)."""
+        n_shapes = len(self.shapes)
+        self.n = 0
+        self.raw_alpha = []
+        self.values = []
+        # Committed (final-alpha) samples
+        self.n_committed = 0
+        self.alpha_max = 0.0
+        self.alpha0 = None
+        self.Svs = np.zeros(n_shapes)
+        self.Sss = np.zeros(n_shapes)
+        self.Svv = 0.0
+        # Current view including pending samples
+        self.recent = deque(maxlen=10)
+        self.max_value = -np.inf
+        self.weights = np.full(n_shapes, 1.0 / n_shapes)
+        self.D_fits = np.full(n_shapes, self.D_prior)
+        self.rss = np.full(n_shapes, 1e10)
+        self.D_post = self.D_prior
+
+    def _shapes_at(self, alpha: np.ndarray) -> np.ndarray:
+        """All training shapes at alpha values -> (len(alpha), n_shapes)."""
+        return self.index.evaluate(self.index.locate(alpha)).T
+
+    def _normalize(self, s: np.ndarray) -> np.ndarray:
+        """Clip and rescale smoothed alpha so the stroke starts at 0 and ends at 1."""
+        s = np.clip(s, 0, 1)
+        s0 = self.alpha0 if self.alpha0 is not None else 0.0
+        if 1.0 > s0 + 1e-10:
+            s = (s - s0) / (1.0 - s0)
+        return s
+
+    def _commit(self):
+        """Move samples whose smoothing window is complete into the running sums."""
+        if self.n < self.w:
+            return
+        stop = self.n - self.h   # samples [n_committed, stop) now have h successors
+        ts = np.arange(self.n_committed, stop)
+        if len(ts) == 0:
+            return
+        starts = np.minimum(np.clip(ts - self.h, 0, None), self.n - self.w)
+        pos = ts - starts
+        base = int(starts[0])
+        ra = np.asarray(self.raw_alpha[base:])
+        windows = ra[(starts - base)[:, np.newaxis] + np.arange(self.w)]
+        smoothed = np.einsum('ij,ij->i', self._coeffs[pos], windows)
+        smoothed = np.maximum.accumulate(np.maximum(smoothed, self.alpha_max))
+        self.alpha_max = float(smoothed[-1])
+        if self.alpha0 is None:
+            self.alpha0 = float(np.clip(smoothed[0], 0, 1))
+
+        v = np.asarray(self.values[self.n_committed:stop])
+        s = self._shapes_at(self._normalize(smoothed))
+        self.Svs += v @ s
+        self.Sss += np.sum(s * s, axis=0)
+        self.Svv += float(v @ v)
+        self.n_committed = stop
+
+    def _pending(self):
+        """Smoothed alpha and values of samples not yet committed."""
+        ra = np.asarray(self.raw_alpha[-self.w:])
+        v = np.asarray(self.values[self.n_committed:])
+        k = len(v)
+        if self.n < self.w:
+            s = ra[-k:]
+        else:
+            s = self._coeffs[self.w - k:] @ ra
+        s = np.maximum.accumulate(np.maximum(s, self.alpha_max))
+        return self._normalize(s), v
+
+    def update(self, alpha: float, value: float) -> float:
+        """Add one sample; returns the current posterior total draw-in.
+
+        alpha is the raw stroke progress at this sample (mean of the
+        same-side corners normalized by their total draw-in).
+        """
+        self.n += 1
+        self.raw_alpha.append(alpha)
+        self.values.append(value)
+        self.recent.append(value)
+        self.max_value = max(self.max_value, value)
+        self._commit()
+
+        a_p, v_p = self._pending()
+        s_p = self._shapes_at(a_p)
+        Svs = self.Svs + v_p @ s_p
+        Sss = self.Sss + np.sum(s_p * s_p, axis=0)
+        Svv = self.Svv + float(v_p @ v_p)
+
+        # Per-shape least-squares D and RSS from the running sums
+        valid = Sss > 1e-10
+        safe_ss = np.where(valid, Sss, 1.0)
+        self.D_fits = np.where(valid, Svs / safe_ss, self.D_prior)
+        self.rss = np.where(valid, np.maximum(Svv - Svs ** 2 / safe_ss, 0.0), 1e10)
+
+        # Weights from RSS (lower RSS = better fit = higher weight)
+        rss_min = np.min(self.rss)
+        temp = max(rss_min * 0.3, 1.0) + 1e-10
+        log_w = np.clip(-(self.rss - rss_min) / temp, -50, 0)
+        w = np.exp(log_w)
+        self.weights = w / w.sum()
+
+        # Bayesian D posterior
+        D_mle = float(np.dot(self.weights, self.D_fits))
+        ss = float(np.dot(self.weights, Sss))
+        if ss > 1e-10 and self.n > 5:
+            noise_var = float(np.dot(self.weights, self.rss)) / max(self.n - 1, 1)
+            D_mle_var = noise_var / ss
+        else:
+            D_mle_var = self.D_prior_std ** 2 * 100
+
+        pp = 1.0 / max(self.D_prior_std ** 2, 1e-10)
+        lp = 1.0 / max(D_mle_var, 1e-10)
+        self.D_post = (pp * self.D_prior + lp * D_mle) / (pp + lp)
+        return self.D_post
+
+    def noise_ratio(self) -> float:
+        """Best-fit residual RMS relative to the signal level at the last sample."""
+        if self.n == 0:
+            return 0.0
+        noise_est = np.sqrt(np.min(self.rss) / self.n)
+        signal = np.mean(self.recent) if self.n > 10 else self.max_value
+        return float(noise_est / max(signal, 1.0))
+
+    def predict(self, alpha_full: Optional[np.ndarray] = None) -> np.ndarray:
+        """Full predicted curve from the current state.
+
+        Evaluated on the model alpha grid, or at alpha_full (smoothed stroke
+        progress) if given. High noise blends the selected shape toward the
+        median shape, as in best_algorithm.
+        """
+        median_weight = np.clip(self.noise_ratio() * 5.0, 0.0, 0.7)
+        shape = (1 - median_weight) * (self.weights @ self.shapes) + \
+                median_weight * self.med_shape
+        if alpha_full is not None:
+            shape = np.interp(alpha_full, self.alpha_grid, shape)
+        return self.D_post * shape
@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from consolidado import _parse_column, parse_consolidado
+
+
+def test_parse_column_equal_lengths():
+    out = _parse_column(["1,2,3", "4,5,6"], 2)
+    np.testing.assert_array_equal(out, [[1, 2, 3], [4, 5, 6]])
+
+
+def test_parse_column_ragged_divisible_total_raises():
+    # 3 + 1 values = 4, divisible by 2 stamps: must not be re-cut into 2 x 2
+    with pytest.raises(ValueError):
+        _parse_column(["1,2,3", "4"], 2)
+
+
+def test_parse_consolidado_ragged_csv_raises(tmp_path):
+    csv_path = tmp_path / "RelatorioDrawIn_Consolidado.csv"
+    csv_path.write_text(
+        "Simulacao,Tempo_s,STEP,DP01\n"
+        'Stamp_1,"0.1,0.2,0.3","1,2,3","0,1,2"\n'
+        'Stamp_2,"0.1,0.2,0.3","1,2,3","5"\n'
+    )
+    with pytest.raises(ValueError):
+        parse_consolidado(str(csv_path))
+
+
+def test_parse_consolidado_shapes(tmp_path):
+    csv_path = tmp_path / "RelatorioDrawIn_Consolidado.csv"
+    csv_path.write_text(
+        "Simulacao,Tempo_s,STEP,DP01,DP02\n"
+        'Stamp_1,"0.1,0.2","1,2","0,1","0,2"\n'
+        'Stamp_2,"0.1,0.2","1,2","0,3","0,4"\n'
+    )
+    data = parse_consolidado(str(csv_path))
+    assert data.curves.shape == (2, 2, 2)
+    assert data.curves[1, data.sensor_index("DP02"), -1] == 4.0
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from benchmark import FLOAT32_ALGORITHMS, FLOAT32_TOLERANCE_MM, load_algorithms
+from evaluation import aggregate_metrics, evaluate_algorithm, get_sweep_configs, sweep_params
+
+ALGORITHMS = load_algorithms(FLOAT32_ALGORITHMS)
+
+# Both ends of every sweep variable
+QUICK_POINTS = [(name, v) for name, values in get_sweep_configs()
+                for v in (values[0], values[-1])]
+ALL_POINTS = [(name, v) for name, values in get_sweep_configs() for v in values]
+
+
+def _max_metric_diff(factory, param_name, value):
+    params = sweep_params(param_name, value)
+    f64, f32 = (aggregate_metrics(evaluate_algorithm(factory, params, dtype=dt))
+                for dt in (np.float64, np.float32))
+    return max(abs(f32[k] - f64[k]) for k in ('rmse', 'max_error', 'di_error'))
+
+
+def test_all_float32_algorithms_registered():
+    assert sorted(ALGORITHMS) == sorted(FLOAT32_ALGORITHMS)
+
+
+@pytest.mark.parametrize("name", FLOAT32_ALGORITHMS)
+@pytest.mark.parametrize("param_name,value", QUICK_POINTS)
+def test_float32_parity(name, param_name, value):
+    assert _max_metric_diff(ALGORITHMS[name], param_name, value) <= FLOAT32_TOLERANCE_MM
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("name", FLOAT32_ALGORITHMS)
+@pytest.mark.parametrize("param_name,value", ALL_POINTS)
+def test_float32_parity_full_sweep(name, param_name, value):
+    assert _max_metric_diff(ALGORITHMS[name], param_name, value) <= FLOAT32_TOLERANCE_MM
@@ -17,6 +17,8 @@ class Settings(BaseSettings):
     GOOGLE_CREDENTIALS_PATH: str = ""
     HOST: str = "0.0.0.0"
     PORT: int = 8090
+    SYNC_POLL_SECONDS: int = 30
+    SYNC_INOTIFY: bool = True
 
     model_config = {"env_prefix": "", "case_sensitive": False}
 
@@ -33,8 +33,9 @@ async_session = async_sessionmaker(
 
 
 async def init_db() -> None:
-    """Create all tables and enable WAL mode + foreign keys."""
+    """Create all tables (ORM + search index) and enable WAL mode + foreign keys."""
     from app import models  # noqa: F401
+    from app.services.search import ensure_search_schema
 
     db_path = Path(settings.DB_PATH)
     db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -43,6 +44,7 @@ async def init_db() -> None:
         await conn.execute(text("PRAGMA journal_mode=WAL"))
         await conn.execute(text("PRAGMA foreign_keys=ON"))
         await conn.run_sync(Base.metadata.create_all)
+        await ensure_search_schema(conn)
 
 
 async def get_db():
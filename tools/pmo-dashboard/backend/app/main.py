@@ -1,6 +1,7 @@
 """FastAPI application entry point."""
 
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 
 from fastapi import FastAPI, Request
@@ -14,23 +15,22 @@ from app.database import init_db
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database and run initial sync on startup."""
+    """Initialize database and start the background filesystem sync.
+
+    The sync (suppliers, schedules, search index) only processes files that
+    changed since the last run and does not block startup; see
+    services/watcher.py and GET /api/sync/status.
+    """
     await init_db()
-    # Run initial supplier/schedule sync from PMO filesystem
-    try:
-        from app.database import async_session
-        from app.services.sync import run_initial_sync
-        async with async_session() as db:
-            await run_initial_sync(
-                db,
-                Path(settings.PMO_ROOT),
-                Path(settings.CONFIG_ROOT),
-            )
-            await db.commit()
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning(f"Initial sync failed: {e}")
+    from app.services.watcher import start_watcher
+    watcher_task = start_watcher(
+        Path(settings.PMO_ROOT),
+        Path(settings.CONFIG_ROOT),
+    )
     yield
+    watcher_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await watcher_task
 
 
 app = FastAPI(
@@ -80,6 +80,12 @@ try:
 except (ImportError, AttributeError):
     pass
 
+try:
+    from app.routers import sync_status
+    app.include_router(sync_status.router)
+except (ImportError, AttributeError):
+    pass
+
 try:
     from app.routers import sheet_sync
     app.include_router(sheet_sync.router)
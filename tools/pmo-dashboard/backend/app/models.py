@@ -4,7 +4,7 @@ from datetime import date, datetime
 from typing import Optional
 
 from sqlalchemy import (
-    Boolean, Date, DateTime, Float, ForeignKey, Integer,
+    Boolean, Date, DateTime, Float, ForeignKey, Index, Integer,
     String, Text, UniqueConstraint, func,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -163,3 +163,42 @@ class Alert(Base):
     is_read: Mapped[bool] = mapped_column(Boolean, default=False)
     dismissed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+class Email(Base):
+    """Entry of a project's emails/index.json, materialized by the sync."""
+
+    __tablename__ = "emails"
+
+    project_code: Mapped[str] = mapped_column(String, primary_key=True)
+    hash: Mapped[str] = mapped_column(String, primary_key=True)
+    date: Mapped[str] = mapped_column(String, nullable=False, default="")
+    category: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    subject: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    sender_name: Mapped[str] = mapped_column(String, nullable=False, default="")
+    sender_email: Mapped[str] = mapped_column(String, nullable=False, default="")
+    # Lowercased subject / sender name / sender email for ?search=
+    search_text: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    # The index entry as JSON (source of the API response)
+    data: Mapped[str] = mapped_column(Text, nullable=False)
+
+    __table_args__ = (
+        # Listing order is (date, hash) descending; hash breaks date ties
+        Index("ix_emails_project_date", "project_code", "date", "hash"),
+        Index("ix_emails_project_category", "project_code", "category", "date", "hash"),
+    )
+
+
+class SyncFile(Base):
+    """Signature of a PMO file as of its last sync (services/watcher.py)."""
+
+    __tablename__ = "sync_files"
+
+    path: Mapped[str] = mapped_column(String, primary_key=True)
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    project_code: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    mtime_ns: Mapped[int] = mapped_column(Integer, nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    synced_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(),
+    )
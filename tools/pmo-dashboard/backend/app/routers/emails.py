@@ -1,14 +1,22 @@
-"""Email listing, detail, and attachment endpoints (reads from filesystem)."""
+"""Email listing, detail, and attachment endpoints."""
 
+import base64
 import json
+import re
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import FileResponse
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import verify_token
 from app.config import settings
+from app.database import get_db
+from app.models import Email
 from app.schemas import EmailDetail, EmailSummary, PaginatedResponse
+from app.services.email_index import EmailIndex, index_path, load_project_email_index
+from app.services.watcher import is_synced
 
 router = APIRouter(
     prefix="/api/projects/{code}/emails",
@@ -21,55 +29,142 @@ def _project_dir(code: str) -> Path:
     return Path(settings.PMO_ROOT) / code
 
 
-def _load_email_index(code: str) -> list[dict]:
-    """Load the email index.json for a project."""
-    index_path = _project_dir(code) / "emails" / "index.json"
-    if not index_path.exists():
-        return []
-    with open(index_path, encoding="utf-8") as f:
-        return json.load(f)
+def _load_email_index(code: str) -> EmailIndex:
+    """Cached email index.json of a project (entries are shared; don't mutate)."""
+    return load_project_email_index(_project_dir(code))
 
 
-@router.get("", response_model=PaginatedResponse)
-async def list_emails(
+def _encode_cursor(entry: dict) -> str:
+    """Opaque keyset cursor for the (date, hash) of the last listed email."""
+    key = [str(entry.get("date") or ""), str(entry.get("hash") or "")]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        date, email_hash = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(date), str(email_hash)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def _list_from_catalog(
+    db: AsyncSession,
     code: str,
-    page: int = Query(1, ge=1),
-    per_page: int = Query(50, ge=1, le=200),
-    category: str | None = Query(None),
-    search: str | None = Query(None),
-    date_from: str | None = Query(None),
-    date_to: str | None = Query(None),
-) -> PaginatedResponse:
-    """List emails for a project with pagination and filters."""
-    emails = _load_email_index(code)
+    category: str | None,
+    search: str | None,
+    date_from: str | None,
+    date_to: str | None,
+    after: tuple[str, str] | None,
+    offset: int,
+    limit: int,
+) -> tuple[int, list[dict]]:
+    """(total, up to limit entries) from the emails table."""
+    filters = [Email.project_code == code]
+    if category:
+        filters.append(Email.category == category)
+    if search:
+        pattern = re.sub(r"([\\%_])", r"\\\1", search.lower())
+        filters.append(Email.search_text.like(f"%{pattern}%", escape="\\"))
+    if date_from:
+        filters.append(Email.date >= date_from)
+    if date_to:
+        filters.append(Email.date <= date_to)
+
+    total = await db.scalar(select(func.count()).select_from(Email).where(*filters))
+
+    query = select(Email.data).where(*filters)
+    if after is not None:
+        query = query.where(tuple_(Email.date, Email.hash) < after)
+    else:
+        query = query.offset(offset)
+    query = query.order_by(Email.date.desc(), Email.hash.desc()).limit(limit)
+    result = await db.execute(query)
+    return total, [json.loads(data) for data in result.scalars()]
+
+
+def _list_from_index(
+    code: str,
+    category: str | None,
+    search: str | None,
+    date_from: str | None,
+    date_to: str | None,
+    after: tuple[str, str] | None,
+    offset: int,
+    limit: int,
+) -> tuple[int, list[dict]]:
+    """(total, up to limit entries) filtered from the cached index.json."""
+    # Already sorted by (date, hash) descending; filters keep that order
+    emails = _load_email_index(code).by_date
 
-    # Apply filters
     if category:
         emails = [e for e in emails if e.get("category") == category]
     if search:
         q = search.lower()
         emails = [
             e for e in emails
-            if q in e.get("subject", "").lower()
-            or q in e.get("sender_name", "").lower()
-            or q in e.get("sender_email", "").lower()
+            if q in (e.get("subject") or "").lower()
+            or q in (e.get("sender_name") or "").lower()
+            or q in (e.get("sender_email") or "").lower()
         ]
     if date_from:
         emails = [e for e in emails if e.get("date", "") >= date_from]
     if date_to:
         emails = [e for e in emails if e.get("date", "") <= date_to]
 
-    # Sort by date descending
-    emails.sort(key=lambda e: e.get("date", ""), reverse=True)
-
     total = len(emails)
-    pages = max(1, (total + per_page - 1) // per_page)
-    start = (page - 1) * per_page
-    page_items = emails[start:start + per_page]
+    if after is not None:
+        emails = [
+            e for e in emails
+            if (str(e.get("date") or ""), str(e.get("hash") or "")) < after
+        ]
+        offset = 0
+    return total, list(emails[offset:offset + limit])
 
+
+@router.get("", response_model=PaginatedResponse)
+async def list_emails(
+    code: str,
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=200),
+    category: str | None = Query(None),
+    search: str | None = Query(None),
+    date_from: str | None = Query(None),
+    date_to: str | None = Query(None),
+    cursor: str | None = Query(
+        None, description="next_cursor of the previous page (keyset pagination)",
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> PaginatedResponse:
+    """List emails for a project with pagination and filters.
+
+    Newest first, by (date, hash). Pages are addressed by page number or,
+    for the next page, by the previous response's next_cursor, which does
+    not skip over earlier rows. Served from the indexed emails table once
+    the background sync has caught up with the project's index.json, from
+    the cached index file until then.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    args = (
+        code, category, search, date_from, date_to,
+        after, (page - 1) * per_page, per_page + 1,
+    )
+    index_file = index_path(_project_dir(code))
+    if await is_synced(db, index_file):
+        total, page_items = await _list_from_catalog(db, *args)
+    else:
+        total, page_items = _list_from_index(*args)
+
+    next_cursor = None
+    if len(page_items) > per_page:
+        page_items = page_items[:per_page]
+        next_cursor = _encode_cursor(page_items[-1])
+
+    pages = max(1, (total + per_page - 1) // per_page)
     items = [EmailSummary(**e) for e in page_items]
     return PaginatedResponse(
         items=items, total=total, page=page, per_page=per_page, pages=pages,
+        next_cursor=next_cursor,
     )
 
 
@@ -106,8 +201,7 @@ async def get_email(code: str, email_hash: str) -> EmailDetail:
         data = json.load(f)
 
     # Merge index data with parsed data for complete response
-    index = _load_email_index(code)
-    index_entry = next((e for e in index if e.get("hash") == email_hash), {})
+    index_entry = _load_email_index(code).by_hash.get(email_hash, {})
 
     # Parsed JSON may have different field structure; merge carefully
     merged = {**index_entry, **data}
@@ -8,6 +8,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from app.auth import verify_token
 from app.config import settings
 from app.schemas import ProjectDetail, ProjectSummary, TimelineEvent
+from app.services.email_index import load_project_email_index
 
 router = APIRouter(prefix="/api/projects", tags=["projects"], dependencies=[Depends(verify_token)])
 
@@ -44,16 +45,8 @@ def _project_dir(code: str) -> Path:
 
 def _count_emails(project_path: Path) -> tuple[int, int, str | None]:
     """Count total emails, uncategorized, and find latest date from index.json."""
-    index_path = project_path / "emails" / "index.json"
-    if not index_path.exists():
-        return 0, 0, None
-    with open(index_path, encoding="utf-8") as f:
-        emails = json.load(f)
-    total = len(emails)
-    unread = sum(1 for e in emails if not e.get("category"))
-    dates = [e.get("date", "") for e in emails if e.get("date")]
-    latest = max(dates) if dates else None
-    return total, unread, latest
+    index = load_project_email_index(project_path)
+    return index.total, index.uncategorized, index.latest_date
 
 
 def _count_documents(project_path: Path) -> int:
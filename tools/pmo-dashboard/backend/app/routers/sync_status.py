@@ -0,0 +1,17 @@
+"""Background filesystem sync progress."""
+
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends
+
+from app.auth import verify_token
+from app.schemas import SyncStatusResponse
+from app.services import watcher
+
+router = APIRouter(prefix="/api/sync", tags=["sync"], dependencies=[Depends(verify_token)])
+
+
+@router.get("/status", response_model=SyncStatusResponse)
+async def get_sync_status() -> SyncStatusResponse:
+    """Progress of the current sync pass and the result of the last one."""
+    return SyncStatusResponse(**asdict(watcher.status))
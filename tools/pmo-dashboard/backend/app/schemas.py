@@ -322,6 +322,7 @@ class SearchResult(BaseModel):
     project_code: str | None = None
     title: str
     snippet: str = ""
+    snippet_html: str = ""          # escaped snippet with <mark> highlights
     path: str | None = None
     score: float = 0.0
 
@@ -332,14 +333,30 @@ class PaginatedResponse(BaseModel):
     page: int = 1
     per_page: int = 50
     pages: int = 1
+    next_cursor: str | None = None  # keyset cursor of the next page, if any
 
 
 class SearchResponse(BaseModel):
     query: str
     total: int
+    page: int = 1
+    per_page: int = 20
     results: list[SearchResult] = []
 
 
+class SyncStatusResponse(BaseModel):
+    state: str                       # starting, syncing, idle, stopped
+    mode: str                        # inotify or polling
+    passes: int = 0
+    files_total: int = 0
+    files_done: int = 0
+    current: str | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    last_error: str | None = None
+    last_stats: dict[str, Any] = {}
+
+
 # ---- Aliases for backward compatibility ----
 
 ContactOut = Contact
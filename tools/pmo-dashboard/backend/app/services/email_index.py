@@ -0,0 +1,119 @@
+"""
+Email Index Cache
+
+Process-wide cache of parsed emails/index.json files. Routers and services
+that need a project's email index call load_email_index() instead of
+json.load-ing the file themselves, so a multi-megabyte index is parsed once
+per change rather than once per request (GET /api/projects used to parse
+every project's index just to count it).
+
+Each entry is keyed by the index path and validated on every lookup by the
+file's (st_mtime_ns, st_size): an index rewritten by the email pipeline is
+re-parsed on the next request, a deleted one drops out of the cache.
+Alongside the entries it keeps the aggregates the dashboard asks for:
+total, uncategorized count, latest date, the entries sorted newest first
+and a hash -> entry map.
+
+Cached entries are shared between requests; callers must not mutate them.
+"""
+
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class EmailIndex:
+    """Parsed email index of one project plus precomputed aggregates."""
+
+    entries: tuple[dict, ...] = ()          # file order
+    by_date: tuple[dict, ...] = ()          # (date, hash) descending
+    by_hash: dict[str, dict] = field(default_factory=dict)
+    total: int = 0
+    uncategorized: int = 0
+    latest_date: str | None = None
+
+
+EMPTY_INDEX = EmailIndex()
+
+# path -> ((st_mtime_ns, st_size), EmailIndex)
+_cache: dict[Path, tuple[tuple[int, int], EmailIndex]] = {}
+_lock = threading.Lock()
+
+
+def index_path(project_dir: Path) -> Path:
+    """Path of a project's email index.json."""
+    return Path(project_dir) / "emails" / "index.json"
+
+
+def _date_key(entry: dict) -> tuple[str, str]:
+    """Listing order key, the same as the emails table's (date, hash)."""
+    return str(entry.get("date") or ""), str(entry.get("hash") or "")
+
+
+def _parse(path: Path) -> EmailIndex:
+    """Read and aggregate one index file (empty index if unreadable)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, UnicodeDecodeError, OSError) as e:
+        logger.warning("Failed to read email index %s: %s", path, e)
+        return EMPTY_INDEX
+
+    # Older exports wrap the list: {"emails": [...]} or {"messages": [...]}
+    if isinstance(data, dict):
+        data = data.get("emails", data.get("messages", []))
+    if not isinstance(data, list):
+        return EMPTY_INDEX
+
+    entries = tuple(e for e in data if isinstance(e, dict))
+    by_hash: dict[str, dict] = {}
+    for e in entries:
+        if e.get("hash"):
+            by_hash.setdefault(e["hash"], e)  # first occurrence wins
+    dates = [e["date"] for e in entries if e.get("date")]
+    return EmailIndex(
+        entries=entries,
+        by_date=tuple(sorted(entries, key=_date_key, reverse=True)),
+        by_hash=by_hash,
+        total=len(entries),
+        uncategorized=sum(1 for e in entries if not e.get("category")),
+        latest_date=max(dates) if dates else None,
+    )
+
+
+def load_email_index(path: Path) -> EmailIndex:
+    """Cached EmailIndex for an index.json path (EMPTY_INDEX if missing)."""
+    path = Path(path)
+    try:
+        st = path.stat()
+    except OSError:
+        with _lock:
+            _cache.pop(path, None)
+        return EMPTY_INDEX
+
+    signature = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        cached = _cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    index = _parse(path)
+    with _lock:
+        _cache[path] = (signature, index)
+    return index
+
+
+def load_project_email_index(project_dir: Path) -> EmailIndex:
+    """Cached EmailIndex of a project directory."""
+    return load_email_index(index_path(project_dir))
+
+
+def clear_cache() -> None:
+    """Drop every cached index (tests, or after bulk rewrites)."""
+    with _lock:
+        _cache.clear()
@@ -1,254 +1,555 @@
 """
 Full-Text Search Service
 
-Provides search across email indexes and document directories in the
-PMO filesystem. Returns results with snippets for display in the
-dashboard search bar.
+SQLite FTS5 index over the PMO filesystem, kept in pmo.db next to the ORM
+tables. Searching used to re-read every project's email index and rglob
+every document directory per query, matching substrings with a constant
+score; now a query is one FTS5 MATCH ranked by BM25, with snippet()
+highlights and LIMIT/OFFSET pagination.
+
+Indexed content:
+    emails     subject (title), sender name + address (sender), body preview
+               from index.json and body text from emails/parsed/<hash>.json
+    documents  file name (title), readable name + extracted text (body) of
+               files under reference/, meetings/, reports/
+
+Tables (created by init_db):
+    search_docs     one row per indexed email/document: key, type,
+                    project_code, ref (hash or path), signature
+    search_fts      FTS5 table, rowid = search_docs.id
+    search_sources  signature of each project's email sources
+
+refresh_search_index() is incremental. Documents are stat-ed and only
+files whose (mtime_ns, size) changed are re-read. A project's emails are
+only re-examined when its index.json or parsed/ directory changed, and then
+only emails whose parsed file or index entry changed are re-indexed.
+Directory scans, stats and file reads run in worker threads
+(asyncio.to_thread) so a refresh never blocks the event loop.
+
+The background sync (services/watcher.py) refreshes the index on every
+pass (even one whose file sync failed); the search endpoint only refreshes
+it itself until a refresh has completed in this process.
 """
 
+import asyncio
+import html
 import json
 import logging
 import re
+import zipfile
+import zlib
 from pathlib import Path
 
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from .email_index import index_path, load_email_index
+
 logger = logging.getLogger(__name__)
 
-# Maximum snippet length in characters
-SNIPPET_MAX_LEN = 200
+# Maximum snippet length in tokens (FTS5 snippet() limit is 64)
+SNIPPET_TOKENS = 24
 
+# Column weights for bm25(): title, sender, body
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
 
-def _make_snippet(text: str, query: str, max_len: int = SNIPPET_MAX_LEN) -> str:
-    """
-    Extract a snippet from text around the first occurrence of query.
-    Highlights are not added here (frontend handles that).
-    """
-    if not text:
-        return ""
+DOCUMENT_DIRS = ("reference", "meetings", "reports")
 
-    lower_text = text.lower()
-    lower_query = query.lower()
-    idx = lower_text.find(lower_query)
+# Files whose content is indexed as text (others by name only)
+TEXT_SUFFIXES = {
+    ".md", ".txt", ".csv", ".json", ".log", ".yaml", ".yml",
+    ".html", ".htm", ".xml", ".eml",
+}
 
-    if idx == -1:
-        # No exact match found, return the beginning of the text
-        return text[:max_len] + ("..." if len(text) > max_len else "")
+# Extracted text kept per document
+MAX_DOCUMENT_TEXT = 1_000_000
 
-    # Center the snippet around the match
-    start = max(0, idx - max_len // 3)
-    end = min(len(text), start + max_len)
+# snippet() markers, replaced after escaping (never appear in indexed text)
+_MARK_OPEN = "\x02"
+_MARK_CLOSE = "\x03"
 
-    snippet = text[start:end]
-    if start > 0:
-        snippet = "..." + snippet
-    if end < len(text):
-        snippet = snippet + "..."
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS search_docs (
+        id INTEGER PRIMARY KEY,
+        key TEXT NOT NULL UNIQUE,
+        type TEXT NOT NULL,
+        project_code TEXT NOT NULL,
+        ref TEXT NOT NULL,
+        signature TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_search_docs_project "
+    "ON search_docs (project_code, type)",
+    """
+    CREATE TABLE IF NOT EXISTS search_sources (
+        path TEXT PRIMARY KEY,
+        signature TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        title, sender, body,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+)
 
-    return snippet
+_TAG_RE = re.compile(r"<[^>]+>")
 
+_refresh_lock = asyncio.Lock()
+_refreshed = False
 
-def _matches_query(text: str, query: str) -> bool:
-    """Case-insensitive substring match."""
-    if not text or not query:
-        return False
-    return query.lower() in text.lower()
+
+def _signature(path: Path) -> str | None:
+    """'mtime_ns:size' of a file or directory (None if missing)."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
 
 
-def _get_project_dirs(pmo_root: Path, project_code: str | None) -> list[tuple[str, Path]]:
+def _get_project_dirs(pmo_root: Path) -> list[tuple[str, Path]]:
     """
-    Return list of (project_code, project_dir) tuples to search.
-    If project_code is given, return only that project.
-    Otherwise, return all project directories found under pmo_root.
+    Return list of (project_code, project_dir) tuples to index.
+    Projects live in pmo_root/pmo/ when that exists, else in pmo_root.
     """
-    pmo_root = Path(pmo_root)
-    if project_code:
-        project_dir = pmo_root / project_code
-        if project_dir.is_dir():
-            return [(project_code, project_dir)]
-        return []
-
+    base = pmo_root / "pmo" if (pmo_root / "pmo").is_dir() else pmo_root
     results = []
-    if pmo_root.is_dir():
-        for child in sorted(pmo_root.iterdir()):
-            if child.is_dir() and not child.name.startswith("."):
+    if base.is_dir():
+        for child in sorted(base.iterdir()):
+            if (
+                child.is_dir()
+                and not child.name.startswith(".")
+                and child.name != "config"
+            ):
                 results.append((child.name, child))
     return results
 
 
-# ── Email search ──────────────────────────────────────────────────────────
-
-async def search_emails(
-    pmo_root: Path,
-    query: str,
-    project_code: str | None = None,
-) -> list[dict]:
-    """
-    Search email index.json files for matching subjects/senders.
-
-    Returns list of dicts with keys:
-        type, project_code, title, snippet, hash
-    """
-    if not query or not query.strip():
-        return []
+# ── Text extraction ───────────────────────────────────────────────────────
 
-    query = query.strip()
-    pmo_root = Path(pmo_root)
-    results: list[dict] = []
+def _clean(value: str) -> str:
+    """Strip the snippet markers from indexed text."""
+    return value.replace(_MARK_OPEN, "").replace(_MARK_CLOSE, "")
 
-    project_dirs = _get_project_dirs(pmo_root, project_code)
 
-    for code, project_dir in project_dirs:
-        index_path = project_dir / "emails" / "index.json"
-        if not index_path.exists():
+def _read_parsed_email(path: Path) -> dict:
+    """Parsed email JSON (empty dict if missing or unreadable)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, UnicodeDecodeError, OSError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _email_fields(entry: dict, parsed: dict) -> tuple[str, str, str]:
+    """(title, sender, body) of one email."""
+    subject = entry.get("subject") or parsed.get("subject") or ""
+    sender_name = entry.get("sender_name") or entry.get("from_name") or ""
+    sender_email = (
+        entry.get("sender_email")
+        or entry.get("from_email")
+        or entry.get("from")
+        or ""
+    )
+    preview = entry.get("body_preview") or entry.get("snippet") or ""
+    body = parsed.get("body_text") or ""
+    if not body and parsed.get("body_html"):
+        body = _TAG_RE.sub(" ", parsed["body_html"])
+    return (
+        _clean(str(subject)),
+        _clean(f"{sender_name} {sender_email}".strip()),
+        _clean(f"{preview}\n{body}".strip()),
+    )
+
+
+def _document_text(path: Path) -> str:
+    """Extracted text of a document ('' for formats without an extractor)."""
+    suffix = path.suffix.lower()
+    try:
+        if suffix in TEXT_SUFFIXES:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                content = f.read(MAX_DOCUMENT_TEXT)
+            if suffix in (".html", ".htm", ".xml"):
+                content = _TAG_RE.sub(" ", content)
+            return _clean(content)
+        if suffix == ".docx":
+            with zipfile.ZipFile(path) as z:
+                xml = z.read("word/document.xml").decode("utf-8", errors="replace")
+            xml = xml.replace("</w:p>", "\n")
+            return _clean(html.unescape(_TAG_RE.sub("", xml))[:MAX_DOCUMENT_TEXT])
+    except (OSError, KeyError, zipfile.BadZipFile) as e:
+        logger.warning("Failed to extract text from %s: %s", path, e)
+    return ""
+
+
+def _document_fields(subdir_name: str, path: Path) -> tuple[str, str, str]:
+    """(title, sender, body) of one document."""
+    readable_name = path.stem.replace("_", " ").replace("-", " ").strip()
+    return (
+        _clean(path.name),
+        "",
+        _clean(f"{subdir_name} {readable_name}\n") + _document_text(path),
+    )
+
+
+def _scan_documents(
+    project_code: str, project_dir: Path
+) -> list[tuple[str, Path, str | None]]:
+    """(subdir name, path, signature) of every document file of a project."""
+    found = []
+    for subdir_name in DOCUMENT_DIRS:
+        subdir = project_dir / subdir_name
+        if not subdir.is_dir():
             continue
-
         try:
-            with open(index_path, "r", encoding="utf-8") as f:
-                emails = json.load(f)
-        except (json.JSONDecodeError, OSError):
+            files = [
+                f for f in subdir.rglob("*")
+                if f.is_file() and not f.name.startswith(".")
+            ]
+        except OSError as e:
+            logger.warning("Error scanning %s/%s: %s", project_code, subdir_name, e)
             continue
+        found.extend((subdir_name, f, _signature(f)) for f in files)
+    return found
 
-        if not isinstance(emails, list):
+
+def _scan_emails(
+    index_file: Path, parsed_dir: Path
+) -> list[tuple[str, dict, Path, str]]:
+    """(hash, index entry, parsed file, signature) of a project's emails.
+
+    The signature combines the parsed file's stat with a CRC of the index
+    entry; duplicate hashes keep their first entry.
+    """
+    found = []
+    seen: set[str] = set()
+    for entry in load_email_index(index_file).entries:
+        email_hash = str(
+            entry.get("hash") or entry.get("message_id") or entry.get("id") or ""
+        )
+        if not email_hash or email_hash in seen:
+            continue
+        seen.add(email_hash)
+        parsed_file = parsed_dir / f"{email_hash[:16]}.json"
+        entry_crc = zlib.crc32(
+            json.dumps(entry, sort_keys=True, default=str).encode()
+        )
+        signature = f"{_signature(parsed_file)}|{entry_crc:08x}"
+        found.append((email_hash, entry, parsed_file, signature))
+    return found
+
+
+def _read_email_fields(entry: dict, parsed_file: Path) -> tuple[str, str, str]:
+    """(title, sender, body) of one email, reading its parsed file."""
+    return _email_fields(entry, _read_parsed_email(parsed_file))
+
+
+# ── Index maintenance ─────────────────────────────────────────────────────
+
+async def ensure_search_schema(db: AsyncSession | AsyncConnection) -> None:
+    """Create the search tables if missing (also run by init_db)."""
+    for statement in _SCHEMA:
+        await db.execute(text(statement))
+
+
+async def _existing_docs(
+    db: AsyncSession, project_code: str, doc_type: str
+) -> dict[str, tuple[int, str]]:
+    """{key: (id, signature)} of one project's indexed emails or documents."""
+    result = await db.execute(
+        text(
+            "SELECT key, id, signature FROM search_docs "
+            "WHERE project_code = :code AND type = :type"
+        ),
+        {"code": project_code, "type": doc_type},
+    )
+    return {key: (doc_id, sig) for key, doc_id, sig in result.all()}
+
+
+async def _upsert_doc(
+    db: AsyncSession,
+    existing: tuple[int, str] | None,
+    key: str,
+    doc_type: str,
+    project_code: str,
+    ref: str,
+    signature: str,
+    fields: tuple[str, str, str],
+) -> None:
+    """Insert or replace one indexed email/document."""
+    if existing is not None:
+        doc_id = existing[0]
+        await db.execute(
+            text("DELETE FROM search_fts WHERE rowid = :id"), {"id": doc_id}
+        )
+        await db.execute(
+            text("UPDATE search_docs SET ref = :ref, signature = :sig WHERE id = :id"),
+            {"ref": ref, "sig": signature, "id": doc_id},
+        )
+    else:
+        result = await db.execute(
+            text(
+                "INSERT INTO search_docs (key, type, project_code, ref, signature) "
+                "VALUES (:key, :type, :code, :ref, :sig)"
+            ),
+            {"key": key, "type": doc_type, "code": project_code, "ref": ref,
+             "sig": signature},
+        )
+        doc_id = result.lastrowid
+    title, sender, body = fields
+    await db.execute(
+        text(
+            "INSERT INTO search_fts (rowid, title, sender, body) "
+            "VALUES (:id, :title, :sender, :body)"
+        ),
+        {"id": doc_id, "title": title, "sender": sender, "body": body},
+    )
+
+
+async def _delete_docs(db: AsyncSession, ids: list[int]) -> None:
+    for doc_id in ids:
+        await db.execute(
+            text("DELETE FROM search_fts WHERE rowid = :id"), {"id": doc_id}
+        )
+        await db.execute(
+            text("DELETE FROM search_docs WHERE id = :id"), {"id": doc_id}
+        )
+
+
+async def _index_project_emails(
+    db: AsyncSession,
+    pmo_root: Path,
+    project_code: str,
+    project_dir: Path,
+    stats: dict,
+) -> None:
+    """Re-index the emails of one project whose sources changed."""
+    index_file = index_path(project_dir)
+    parsed_dir = project_dir / "emails" / "parsed"
+    source = str(index_file.relative_to(pmo_root))
+    source_sig = f"{_signature(index_file)}|{_signature(parsed_dir)}"
+
+    result = await db.execute(
+        text("SELECT signature FROM search_sources WHERE path = :path"),
+        {"path": source},
+    )
+    if result.scalar() == source_sig:
+        return
+
+    existing = await _existing_docs(db, project_code, "email")
+    seen: set[str] = set()
+    emails = await asyncio.to_thread(_scan_emails, index_file, parsed_dir)
+    for email_hash, entry, parsed_file, signature in emails:
+        key = f"email:{project_code}:{email_hash}"
+        seen.add(key)
+        old = existing.get(key)
+        if old is not None and old[1] == signature:
             continue
 
-        for email_entry in emails:
-            if not isinstance(email_entry, dict):
-                continue
-
-            subject = email_entry.get("subject", "")
-            sender_name = (
-                email_entry.get("sender_name")
-                or email_entry.get("from_name")
-                or ""
-            )
-            sender_email = (
-                email_entry.get("sender_email")
-                or email_entry.get("from_email")
-                or email_entry.get("from")
-                or ""
-            )
-            body_preview = email_entry.get("body_preview", "")
-            email_hash = (
-                email_entry.get("hash")
-                or email_entry.get("message_id")
-                or email_entry.get("id")
-                or ""
-            )
-
-            # Check if query matches subject, sender, or body preview
-            matched = False
-            snippet = ""
-
-            if _matches_query(subject, query):
-                matched = True
-                snippet = _make_snippet(subject, query)
-            elif _matches_query(sender_name, query) or _matches_query(
-                sender_email, query
-            ):
-                matched = True
-                snippet = f"From: {sender_name} <{sender_email}>"
-                if subject:
-                    snippet += f" | {subject}"
-                snippet = snippet[:SNIPPET_MAX_LEN]
-            elif _matches_query(body_preview, query):
-                matched = True
-                snippet = _make_snippet(body_preview, query)
-
-            if matched:
-                results.append({
-                    "type": "email",
-                    "project_code": code,
-                    "title": subject or "(No Subject)",
-                    "snippet": snippet,
-                    "hash": str(email_hash),
-                })
+        fields = await asyncio.to_thread(_read_email_fields, entry, parsed_file)
+        await _upsert_doc(
+            db, old, key, "email", project_code, email_hash, signature, fields,
+        )
+        stats["emails_indexed"] += 1
 
-    return results
+    stale = [doc_id for key, (doc_id, _) in existing.items() if key not in seen]
+    await _delete_docs(db, stale)
+    stats["removed"] += len(stale)
 
+    await db.execute(
+        text(
+            "INSERT INTO search_sources (path, signature) VALUES (:path, :sig) "
+            "ON CONFLICT (path) DO UPDATE SET signature = excluded.signature"
+        ),
+        {"path": source, "sig": source_sig},
+    )
 
-# ── Document search ───────────────────────────────────────────────────────
 
-async def search_documents(
+async def _index_project_documents(
+    db: AsyncSession,
     pmo_root: Path,
-    query: str,
-    project_code: str | None = None,
-) -> list[dict]:
+    project_code: str,
+    project_dir: Path,
+    stats: dict,
+) -> None:
+    """Re-index the documents of one project whose files changed."""
+    existing = await _existing_docs(db, project_code, "document")
+    seen: set[str] = set()
+    documents = await asyncio.to_thread(_scan_documents, project_code, project_dir)
+    for subdir_name, file_path, signature in documents:
+        rel_path = str(file_path.relative_to(pmo_root))
+        key = f"document:{rel_path}"
+        seen.add(key)
+        if signature is None:
+            continue
+        old = existing.get(key)
+        if old is not None and old[1] == signature:
+            continue
+
+        fields = await asyncio.to_thread(_document_fields, subdir_name, file_path)
+        await _upsert_doc(
+            db, old, key, "document", project_code, rel_path, signature,
+            fields,
+        )
+        stats["documents_indexed"] += 1
+
+    stale = [doc_id for key, (doc_id, _) in existing.items() if key not in seen]
+    await _delete_docs(db, stale)
+    stats["removed"] += len(stale)
+
+
+async def refresh_search_index(
+    db: AsyncSession,
+    pmo_root: Path,
+    once: bool = False,
+) -> dict | None:
     """
-    Search document filenames in reference/, meetings/, reports/ directories.
+    Bring the FTS5 index up to date with the PMO filesystem.
+
+    With once=True the refresh is skipped (returns None) if one already
+    completed in this process. Commits after each project, so concurrent
+    requests never hold a long write transaction.
 
-    Returns list of dicts with keys:
-        type, project_code, title, snippet, path
+    Returns stats: projects, emails_indexed, documents_indexed, removed.
     """
-    if not query or not query.strip():
-        return []
-
-    query = query.strip()
-    pmo_root = Path(pmo_root)
-    results: list[dict] = []
-
-    # Directories to scan for documents
-    doc_subdirs = ["reference", "meetings", "reports"]
-
-    project_dirs = _get_project_dirs(pmo_root, project_code)
-
-    for code, project_dir in project_dirs:
-        for subdir_name in doc_subdirs:
-            subdir = project_dir / subdir_name
-            if not subdir.is_dir():
-                continue
-
-            try:
-                for file_path in subdir.rglob("*"):
-                    if not file_path.is_file():
-                        continue
-                    if file_path.name.startswith("."):
-                        continue
-
-                    filename = file_path.name
-                    # Also build a readable name from the filename
-                    readable_name = (
-                        file_path.stem.replace("_", " ")
-                        .replace("-", " ")
-                        .strip()
-                    )
-
-                    if _matches_query(filename, query) or _matches_query(
-                        readable_name, query
-                    ):
-                        # Build relative path from pmo_root
-                        try:
-                            rel_path = str(
-                                file_path.relative_to(pmo_root)
-                            )
-                        except ValueError:
-                            rel_path = str(file_path)
-
-                        results.append({
-                            "type": "document",
-                            "project_code": code,
-                            "title": filename,
-                            "snippet": (
-                                f"{subdir_name}/{filename} "
-                                f"({_human_file_size(file_path)})"
-                            ),
-                            "path": rel_path,
-                        })
-            except OSError as e:
-                logger.warning(
-                    "Error scanning %s/%s: %s", code, subdir_name, e
+    global _refreshed
+
+    if once and _refreshed:
+        return None
+
+    async with _refresh_lock:
+        if once and _refreshed:
+            return None
+
+        pmo_root = Path(pmo_root)
+        stats = {
+            "projects": 0,
+            "emails_indexed": 0,
+            "documents_indexed": 0,
+            "removed": 0,
+        }
+        await ensure_search_schema(db)
+
+        projects = await asyncio.to_thread(_get_project_dirs, pmo_root)
+        for code, project_dir in projects:
+            await _index_project_emails(db, pmo_root, code, project_dir, stats)
+            await _index_project_documents(db, pmo_root, code, project_dir, stats)
+            await db.commit()
+            stats["projects"] += 1
+
+        # Projects that disappeared from the filesystem
+        codes = {code for code, _ in projects}
+        result = await db.execute(
+            text("SELECT id, project_code FROM search_docs")
+        )
+        gone = [doc_id for doc_id, code in result.all() if code not in codes]
+        await _delete_docs(db, gone)
+        stats["removed"] += len(gone)
+        sources = {str(index_path(d).relative_to(pmo_root)) for _, d in projects}
+        result = await db.execute(text("SELECT path FROM search_sources"))
+        for (path,) in result.all():
+            if path not in sources:
+                await db.execute(
+                    text("DELETE FROM search_sources WHERE path = :path"),
+                    {"path": path},
                 )
+        await db.commit()
 
-    return results
+        _refreshed = True
+        if any(stats[k] for k in ("emails_indexed", "documents_indexed", "removed")):
+            logger.info("Search index refreshed: %s", stats)
+        return stats
 
 
-def _human_file_size(path: Path) -> str:
-    """Return human-readable file size."""
-    try:
-        size = path.stat().st_size
-    except OSError:
-        return "unknown size"
+# ── Queries ───────────────────────────────────────────────────────────────
 
-    for unit in ("B", "KB", "MB", "GB"):
-        if size < 1024:
-            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
-        size /= 1024
-    return f"{size:.1f} TB"
+def _match_expression(query: str) -> str:
+    """
+    FTS5 MATCH expression for free-text input: every word must occur,
+    as a prefix ('quot' finds 'quote', 'quotation').
+    """
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def _snippet_text(raw: str) -> tuple[str, str]:
+    """(plain snippet, HTML snippet with <mark> highlights) from snippet()."""
+    plain = raw.replace(_MARK_OPEN, "").replace(_MARK_CLOSE, "")
+    marked = (
+        html.escape(raw)
+        .replace(_MARK_OPEN, "<mark>")
+        .replace(_MARK_CLOSE, "</mark>")
+    )
+    return plain, marked
+
+
+async def search(
+    db: AsyncSession,
+    query: str,
+    project_code: str | None = None,
+    doc_type: str | None = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> tuple[int, list[dict]]:
+    """
+    Ranked full-text search over the index (refresh it first).
+
+    doc_type restricts results to 'email' or 'document'.
+
+    Returns (total matches, one page of result dicts) with keys:
+        type, project_code, title, snippet, snippet_html, path, score
+    The score is -bm25(), so higher is better.
+    """
+    match = _match_expression(query or "")
+    if not match:
+        return 0, []
+
+    where = "search_fts MATCH :match"
+    params: dict = {"match": match}
+    if project_code:
+        where += " AND d.project_code = :code"
+        params["code"] = project_code
+    if doc_type:
+        where += " AND d.type = :type"
+        params["type"] = doc_type
+    # CROSS JOIN keeps the FTS scan as the outer loop; with a project filter
+    # the planner otherwise drives from search_docs and re-runs the MATCH
+    # per row (~1000x slower)
+    joined = "FROM search_fts CROSS JOIN search_docs d ON d.id = search_fts.rowid"
+
+    total = (
+        await db.execute(text(f"SELECT COUNT(*) {joined} WHERE {where}"), params)
+    ).scalar()
+    if not total:
+        return 0, []
+
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    result = await db.execute(
+        text(
+            f"SELECT d.type, d.project_code, d.ref, search_fts.title, "
+            f"snippet(search_fts, -1, :mark_open, :mark_close, '...', "
+            f"{SNIPPET_TOKENS}), bm25(search_fts, {weights}) AS rank "
+            f"{joined} WHERE {where} ORDER BY rank LIMIT :limit OFFSET :offset"
+        ),
+        {**params, "mark_open": _MARK_OPEN, "mark_close": _MARK_CLOSE,
+         "limit": limit, "offset": offset},
+    )
+
+    results = []
+    for doc_type_, code, ref, title, raw_snippet, rank in result.all():
+        plain, marked = _snippet_text(raw_snippet or "")
+        results.append({
+            "type": doc_type_,
+            "project_code": code,
+            "title": title or "(No Subject)",
+            "snippet": plain,
+            "snippet_html": marked,
+            "path": ref,
+            "score": -rank,
+        })
+    return total, results
@@ -13,10 +13,12 @@ import re
 from datetime import date, datetime
 from pathlib import Path
 
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from .email_index import load_email_index
 from ..models import (
+    Email,
     Supplier,
     SupplierContact,
     SupplierProject,
@@ -163,11 +165,14 @@ async def sync_suppliers_from_emails(
     db: AsyncSession,
     pmo_root: Path,
     config_root: Path,
+    only: set[str] | None = None,
 ) -> dict:
     """
     Scan all project email indexes, extract unique sender domains,
     create/update supplier entries and contacts.
 
+    If only is given, scan just those (registered) project codes.
+
     Returns a summary dict with counts.
     """
     stats = {
@@ -206,6 +211,8 @@ async def sync_suppliers_from_emails(
         return stats
 
     project_codes = [c for c in project_codes if c]
+    if only is not None:
+        project_codes = [c for c in project_codes if c in only]
 
     # Build caches of existing suppliers (by domain) and contacts (by email)
     existing_suppliers_result = await db.execute(select(Supplier))
@@ -237,25 +244,13 @@ async def sync_suppliers_from_emails(
 
         stats["projects_scanned"] += 1
 
-        try:
-            with open(email_index_path, "r", encoding="utf-8") as f:
-                emails = json.load(f)
-        except (json.JSONDecodeError, OSError) as e:
-            logger.warning(
-                "Failed to read email index for %s: %s", project_code, e
-            )
-            continue
-
-        if not isinstance(emails, list):
-            continue
+        # Shared cache; unreadable indexes are logged there and come back empty
+        emails = load_email_index(email_index_path).entries
 
         # Step c-d: Extract sender_email and sender_name, group by domain
         domain_senders: dict[str, list[tuple[str, str]]] = {}
 
         for email_entry in emails:
-            if not isinstance(email_entry, dict):
-                continue
-
             sender_email = (
                 email_entry.get("sender_email")
                 or email_entry.get("from_email")
@@ -344,6 +339,105 @@ async def sync_suppliers_from_emails(
     return stats
 
 
+# ── Email catalog sync ────────────────────────────────────────────────────
+
+def _email_row(entry: dict, data: str) -> dict:
+    """Column values of an emails row for one index entry."""
+    subject = str(entry.get("subject") or "")
+    sender_name = str(entry.get("sender_name") or "")
+    sender_email = str(entry.get("sender_email") or "")
+    return {
+        "date": str(entry.get("date") or ""),
+        "category": entry.get("category"),
+        "subject": subject,
+        "sender_name": sender_name,
+        "sender_email": sender_email,
+        "search_text": f"{subject}\n{sender_name}\n{sender_email}".lower(),
+        "data": data,
+    }
+
+
+async def sync_email_catalog(
+    db: AsyncSession,
+    pmo_root: Path,
+    project_code: str,
+) -> dict:
+    """
+    Materialize a project's emails/index.json into the emails table.
+
+    Only entries whose JSON changed are written; entries no longer in the
+    index (or the whole project, if the index is gone) are deleted.
+
+    Returns a summary dict with counts.
+    """
+    stats = {
+        "emails_created": 0,
+        "emails_updated": 0,
+        "emails_deleted": 0,
+    }
+
+    index = load_email_index(pmo_root / project_code / "emails" / "index.json")
+    result = await db.execute(
+        select(Email.hash, Email.data).where(Email.project_code == project_code)
+    )
+    existing: dict[str, str] = dict(result.all())
+
+    seen: set[str] = set()
+    new_rows: list[dict] = []
+    for entry in index.entries:
+        email_hash = entry.get("hash")
+        if not email_hash or email_hash in seen:
+            continue
+        seen.add(email_hash)
+
+        data = json.dumps(entry, sort_keys=True, ensure_ascii=False, default=str)
+        if existing.get(email_hash) == data:
+            continue
+        row = _email_row(entry, data)
+        if email_hash in existing:
+            await db.execute(
+                update(Email)
+                .where(Email.project_code == project_code, Email.hash == email_hash)
+                .values(**row)
+            )
+            stats["emails_updated"] += 1
+        else:
+            new_rows.append({"project_code": project_code, "hash": email_hash, **row})
+
+    if new_rows:
+        await db.execute(insert(Email), new_rows)
+        stats["emails_created"] = len(new_rows)
+
+    gone = [h for h in existing if h not in seen]
+    for start in range(0, len(gone), 500):
+        await db.execute(
+            delete(Email).where(
+                Email.project_code == project_code,
+                Email.hash.in_(gone[start:start + 500]),
+            )
+        )
+    stats["emails_deleted"] = len(gone)
+
+    await db.commit()
+    if any(stats.values()):
+        logger.info("Email catalog sync for %s complete: %s", project_code, stats)
+    return stats
+
+
+async def delete_email_catalog(db: AsyncSession, project_code: str) -> int:
+    """
+    Delete a project's rows from the emails table (its index.json is gone
+    or the project is no longer registered).
+
+    Returns the number of rows deleted.
+    """
+    result = await db.execute(delete(Email).where(Email.project_code == project_code))
+    await db.commit()
+    if result.rowcount:
+        logger.info("Email catalog of %s removed: %s emails", project_code, result.rowcount)
+    return result.rowcount
+
+
 # ── Schedule sync from filesystem ─────────────────────────────────────────
 
 async def sync_schedule_from_filesystem(
@@ -500,6 +594,31 @@ def _parse_date(value) -> date | None:
 
 # ── Full initial sync ─────────────────────────────────────────────────────
 
+def load_project_codes(config_root: Path) -> list[str]:
+    """Project codes registered in config/project-codes.json ([] if unreadable)."""
+    project_codes_path = Path(config_root) / "project-codes.json"
+    if not project_codes_path.exists():
+        return []
+    try:
+        with open(project_codes_path, "r", encoding="utf-8") as f:
+            project_codes_data = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        logger.error("Failed to load project codes: %s", e)
+        return []
+
+    if isinstance(project_codes_data, list):
+        project_codes = [
+            p.get("code") or p.get("project_code")
+            for p in project_codes_data
+            if isinstance(p, dict)
+        ]
+    elif isinstance(project_codes_data, dict):
+        project_codes = list(project_codes_data.keys())
+    else:
+        project_codes = []
+    return [c for c in project_codes if c]
+
+
 async def run_initial_sync(
     db: AsyncSession,
     pmo_root: Path,
@@ -523,35 +642,10 @@ async def run_initial_sync(
 
     # Sync schedules for all projects
     schedule_stats: dict[str, dict] = {}
-    project_codes_path = config_root / "project-codes.json"
-    if project_codes_path.exists():
-        try:
-            with open(project_codes_path, "r", encoding="utf-8") as f:
-                project_codes_data = json.load(f)
-
-            if isinstance(project_codes_data, list):
-                project_codes = [
-                    p.get("code") or p.get("project_code")
-                    for p in project_codes_data
-                    if isinstance(p, dict)
-                ]
-            elif isinstance(project_codes_data, dict):
-                project_codes = list(project_codes_data.keys())
-            else:
-                project_codes = []
-
-            for code in project_codes:
-                if code:
-                    s = await sync_schedule_from_filesystem(
-                        db, pmo_root, code
-                    )
-                    if any(v > 0 for v in s.values()):
-                        schedule_stats[code] = s
-
-        except (json.JSONDecodeError, OSError) as e:
-            logger.error(
-                "Failed to load project codes for schedule sync: %s", e
-            )
+    for code in load_project_codes(config_root):
+        s = await sync_schedule_from_filesystem(db, pmo_root, code)
+        if any(v > 0 for v in s.values()):
+            schedule_stats[code] = s
 
     combined = {
         "suppliers": supplier_stats,
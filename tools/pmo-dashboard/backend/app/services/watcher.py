@@ -0,0 +1,296 @@
+"""
+Filesystem Change Tracking
+
+Background task that keeps the database in step with the PMO filesystem,
+replacing the blocking full resync on startup. Each sync pass stats the
+files the database is derived from and compares them with the signature
+(mtime_ns, size) recorded in the sync_files table when each was last
+processed:
+
+    config/project-codes.json    registry; a change re-processes every project
+    {code}/emails/index.json     emails table, suppliers and contacts from senders
+                                 (emails rows dropped when the index disappears
+                                 or the project is unregistered)
+    {code}/schedule.json         schedule tasks and milestones
+
+Only changed files are processed (one project at a time, signature recorded
+right after), then the full-text search index catches up with its own
+signatures. A file that fails to process is logged and left unrecorded, so
+it is retried on the next pass without holding up the others; the search
+index is refreshed even if the pass fails. The first pass runs in the
+background after startup, so the API is served immediately; later passes
+are triggered by inotify events (watchfiles, when available and
+SYNC_INOTIFY is on) or every SYNC_POLL_SECONDS.
+
+Progress of the current/last pass is kept in `status` and exposed by
+GET /api/sync/status. Readers of derived tables can compare a file's
+sync_files signature with the file itself (is_synced) to tell
+whether the table reflects it yet.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .search import refresh_search_index
+from .sync import (
+    delete_email_catalog,
+    load_project_codes,
+    sync_email_catalog,
+    sync_schedule_from_filesystem,
+    sync_suppliers_from_emails,
+)
+from ..config import settings
+from ..database import async_session
+from ..models import SyncFile
+
+try:
+    from watchfiles import awatch
+except ImportError:  # optional: fall back to polling
+    awatch = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SyncStatus:
+    """Progress of the background sync (one instance per process)."""
+
+    state: str = "starting"          # starting, syncing, idle, stopped
+    mode: str = "polling"            # inotify or polling
+    passes: int = 0
+    files_total: int = 0             # changed files in the current/last pass
+    files_done: int = 0
+    current: str | None = None       # file being processed
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    last_error: str | None = None
+    last_stats: dict = field(default_factory=dict)
+
+
+status = SyncStatus()
+
+
+@dataclass(frozen=True)
+class _Tracked:
+    path: Path
+    kind: str                        # project_codes, email_index, schedule
+    project_code: str | None = None
+
+
+def _stat(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _tracked_files(pmo_root: Path, config_root: Path) -> list[_Tracked]:
+    """Files the database is derived from, registry first."""
+    tracked = [_Tracked(config_root / "project-codes.json", "project_codes")]
+    for code in load_project_codes(config_root):
+        project_dir = pmo_root / code
+        tracked.append(_Tracked(project_dir / "emails" / "index.json", "email_index", code))
+        tracked.append(_Tracked(project_dir / "schedule.json", "schedule", code))
+    return tracked
+
+
+async def is_synced(db: AsyncSession, path: Path) -> bool:
+    """Whether the tables derived from path reflect its current contents."""
+    signature = _stat(path)
+    if signature is None:
+        return False
+    row = await db.get(SyncFile, str(path))
+    return row is not None and (row.mtime_ns, row.size) == signature
+
+
+async def _record(db: AsyncSession, item: _Tracked, signature: tuple[int, int]) -> None:
+    """Store the signature of a processed file."""
+    row = await db.get(SyncFile, str(item.path))
+    if row is None:
+        row = SyncFile(path=str(item.path), kind=item.kind)
+        db.add(row)
+    row.project_code = item.project_code
+    row.mtime_ns, row.size = signature
+    await db.commit()
+
+
+async def _sync_file(
+    db: AsyncSession,
+    pmo_root: Path,
+    config_root: Path,
+    item: _Tracked,
+    stats: dict,
+) -> None:
+    """Re-derive the tables built from one tracked file."""
+    if item.kind == "email_index":
+        s = await sync_email_catalog(db, pmo_root, item.project_code)
+        if any(v > 0 for v in s.values()):
+            stats["emails"][item.project_code] = s
+        s = await sync_suppliers_from_emails(
+            db, pmo_root, config_root, only={item.project_code},
+        )
+        if s.get("suppliers_created") or s.get("contacts_created") or s.get("links_created"):
+            stats["suppliers"][item.project_code] = s
+    elif item.kind == "schedule":
+        s = await sync_schedule_from_filesystem(db, pmo_root, item.project_code)
+        if any(v > 0 for v in s.values()):
+            stats["schedules"][item.project_code] = s
+
+
+async def _sync_files(
+    db: AsyncSession,
+    pmo_root: Path,
+    config_root: Path,
+    stats: dict,
+) -> None:
+    """Process the changed tracked files (the file part of a sync pass)."""
+    result = await db.execute(select(SyncFile))
+    known = {row.path: row for row in result.scalars()}
+
+    tracked = _tracked_files(pmo_root, config_root)
+    stats["files_checked"] = len(tracked)
+    changed: list[tuple[_Tracked, tuple[int, int]]] = []
+    present: set[str] = set()
+    for item in tracked:
+        signature = _stat(item.path)
+        if signature is None:
+            continue
+        present.add(str(item.path))
+        row = known.get(str(item.path))
+        if row is None or (row.mtime_ns, row.size) != signature:
+            changed.append((item, signature))
+
+    # A registry change can add projects whose files are unchanged
+    if any(item.kind == "project_codes" for item, _ in changed):
+        changed = [
+            (item, _stat(item.path)) for item in tracked
+            if str(item.path) in present
+        ]
+
+    status.files_total = len(changed)
+    status.files_done = 0
+    stats["files_changed"] = len(changed)
+
+    for item, signature in changed:
+        status.current = str(item.path)
+        try:
+            await _sync_file(db, pmo_root, config_root, item, stats)
+            await _record(db, item, signature)
+        except Exception as e:
+            # Left unrecorded: retried on the next pass
+            await db.rollback()
+            logger.exception("Failed to sync %s", item.path)
+            stats["errors"][str(item.path)] = str(e)
+        status.files_done += 1
+
+    # Forget files that disappeared or whose project was unregistered
+    # (re-synced if they come back), with the email rows derived from them
+    gone = [row for path, row in known.items() if path not in present]
+    for row in gone:
+        if row.kind == "email_index" and row.project_code:
+            deleted = await delete_email_catalog(db, row.project_code)
+            if deleted:
+                stats["emails"][row.project_code] = {
+                    "emails_created": 0,
+                    "emails_updated": 0,
+                    "emails_deleted": deleted,
+                }
+    if gone:
+        await db.execute(
+            delete(SyncFile).where(SyncFile.path.in_([row.path for row in gone]))
+        )
+        await db.commit()
+        stats["files_removed"] = len(gone)
+
+
+async def sync_changed_files(
+    db: AsyncSession,
+    pmo_root: Path,
+    config_root: Path,
+) -> dict:
+    """
+    One sync pass: process the tracked files whose signature changed since
+    they were last synced, then refresh the search index.
+
+    Returns a summary dict with counts; files that failed are listed under
+    "errors" (path -> message) and retried on the next pass.
+    """
+    pmo_root = Path(pmo_root)
+    config_root = Path(config_root)
+    stats = {
+        "files_checked": 0,
+        "files_changed": 0,
+        "files_removed": 0,
+        "emails": {},
+        "suppliers": {},
+        "schedules": {},
+        "search": {},
+        "errors": {},
+    }
+
+    try:
+        await _sync_files(db, pmo_root, config_root, stats)
+    finally:
+        await db.rollback()  # no-op unless the file part failed mid-transaction
+        status.current = "search index"
+        stats["search"] = await refresh_search_index(db, pmo_root) or {}
+        status.current = None
+    return stats
+
+
+async def _run_pass(pmo_root: Path, config_root: Path) -> None:
+    status.state = "syncing"
+    status.started_at = datetime.now(timezone.utc)
+    try:
+        async with async_session() as db:
+            stats = await sync_changed_files(db, pmo_root, config_root)
+        status.last_stats = stats
+        status.last_error = "; ".join(
+            f"{path}: {error}" for path, error in stats["errors"].items()
+        ) or None
+        if stats["files_changed"] or stats["files_removed"]:
+            logger.info("Sync pass complete: %s", stats)
+    except Exception as e:
+        logger.exception("Sync pass failed")
+        status.last_error = str(e)
+    status.passes += 1
+    status.current = None
+    status.finished_at = datetime.now(timezone.utc)
+    status.state = "idle"
+
+
+async def watch(pmo_root: Path, config_root: Path) -> None:
+    """Sync now, then again on every filesystem change or poll interval."""
+    interval = max(settings.SYNC_POLL_SECONDS, 1)
+    try:
+        await _run_pass(pmo_root, config_root)
+
+        roots = [str(p) for p in (pmo_root, config_root) if p.is_dir()]
+        if awatch is not None and settings.SYNC_INOTIFY and roots:
+            try:
+                status.mode = "inotify"
+                async for _ in awatch(
+                    *roots, rust_timeout=interval * 1000, yield_on_timeout=True,
+                ):
+                    await _run_pass(pmo_root, config_root)
+            except (OSError, RuntimeError) as e:
+                logger.warning("File watching unavailable, polling instead: %s", e)
+
+        status.mode = "polling"
+        while True:
+            await asyncio.sleep(interval)
+            await _run_pass(pmo_root, config_root)
+    finally:
+        status.state = "stopped"
+
+
+def start_watcher(pmo_root: Path, config_root: Path) -> asyncio.Task:
+    """Start the background sync task (cancel it on shutdown)."""
+    return asyncio.create_task(watch(Path(pmo_root), Path(config_root)))
@@ -0,0 +1,33 @@
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Settings and the engine are read at import time: point them at a scratch
+# database before the app is imported
+_TMP = Path(tempfile.mkdtemp(prefix="pmo-tests-"))
+os.environ["DB_PATH"] = str(_TMP / "pmo.db")
+os.environ["PMO_ROOT"] = str(_TMP / "pmo")
+os.environ["CONFIG_ROOT"] = str(_TMP / "config")
+os.environ["AUTH_TOKEN"] = ""
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from app.database import Base, engine, init_db  # noqa: E402
+from app.services import email_index  # noqa: E402
+
+
+@pytest.fixture
+def db_reset():
+    """Empty ORM tables and a cold email index cache."""
+    async def reset():
+        await init_db()
+        async with engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                await conn.execute(table.delete())
+    asyncio.run(reset())
+    email_index.clear_cache()
+    yield
+    asyncio.run(engine.dispose())
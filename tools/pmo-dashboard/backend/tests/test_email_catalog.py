@@ -0,0 +1,123 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.database import async_session
+from app.models import Email
+from app.routers.emails import list_emails
+from app.services.watcher import sync_changed_files
+
+PMO_ROOT = Path(settings.PMO_ROOT)
+CONFIG_ROOT = Path(settings.CONFIG_ROOT)
+
+
+def _write_registry(*codes):
+    CONFIG_ROOT.mkdir(parents=True, exist_ok=True)
+    (CONFIG_ROOT / "project-codes.json").write_text(json.dumps({c: {} for c in codes}))
+
+
+def _write_index(code, emails):
+    path = PMO_ROOT / code / "emails" / "index.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(emails))
+    return path
+
+
+def _emails(code, n):
+    # Several emails per date, so hash has to break the ties
+    return [
+        {"hash": f"{code}-{i:03d}", "date": f"2025-01-{1 + i // 3:02d}",
+         "subject": f"Subject {i}", "sender_name": "Ana",
+         "sender_email": "ana@supplier.com", "project_code": code}
+        for i in range(n)
+    ]
+
+
+async def _sync():
+    async with async_session() as db:
+        return await sync_changed_files(db, PMO_ROOT, CONFIG_ROOT)
+
+
+async def _count(code):
+    async with async_session() as db:
+        return await db.scalar(
+            select(func.count()).select_from(Email).where(Email.project_code == code)
+        )
+
+
+async def _list(code, **kwargs):
+    async with async_session() as db:
+        kwargs = {"page": 1, "per_page": 50, "category": None, "search": None,
+                  "date_from": None, "date_to": None, "cursor": None, **kwargs}
+        return await list_emails(code, db=db, **kwargs)
+
+
+async def _walk(code, per_page):
+    """Hashes of every page followed by next_cursor."""
+    hashes, cursor = [], None
+    while True:
+        page = await _list(code, per_page=per_page, cursor=cursor)
+        hashes += [item.hash for item in page.items]
+        cursor = page.next_cursor
+        if cursor is None:
+            return hashes
+
+
+def test_removed_index_drops_email_rows(db_reset):
+    _write_registry("P1", "P2")
+    index_file = _write_index("P1", _emails("P1", 5))
+    _write_index("P2", _emails("P2", 4))
+
+    async def run():
+        await _sync()
+        assert await _count("P1") == 5
+
+        index_file.unlink()
+        stats = await _sync()
+        assert stats["emails"]["P1"]["emails_deleted"] == 5
+        assert await _count("P1") == 0
+        assert await _count("P2") == 4
+
+    asyncio.run(run())
+
+
+def test_unregistered_project_drops_email_rows(db_reset):
+    _write_registry("P1", "P2")
+    _write_index("P1", _emails("P1", 5))
+    _write_index("P2", _emails("P2", 4))
+
+    async def run():
+        await _sync()
+        _write_registry("P1")
+        await _sync()
+        assert await _count("P1") == 5
+        assert await _count("P2") == 0
+
+    asyncio.run(run())
+
+
+def test_keyset_cursor_walks_every_email_once(db_reset):
+    _write_registry("P1")
+    emails = _emails("P1", 10)
+    _write_index("P1", emails)
+    expected = [e["hash"] for e in sorted(
+        emails, key=lambda e: (e["date"], e["hash"]), reverse=True)]
+
+    async def run():
+        # Index file (not synced yet), then the emails table
+        from_index = await _walk("P1", per_page=3)
+        await _sync()
+        from_catalog = await _walk("P1", per_page=3)
+        assert from_index == expected
+        assert from_catalog == expected
+
+        with pytest.raises(HTTPException) as exc:
+            await _list("P1", cursor="not-a-cursor")
+        assert exc.value.status_code == 400
+
+    asyncio.run(run())